@@ -2,17 +2,38 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import model_validator
 from typing import Optional, Literal
 from functools import lru_cache
-import keyring
 
 # Define allowed providers
-ProviderType = Literal["openai", "xai", "gemini", "custom", "auto"]
+ProviderType = Literal["openai", "xai", "gemini", "custom", "fake", "auto"]
+
+# Where each provider's key lives in the system keyring (service, username)
+KEYRING_ENTRIES = {
+    "openai": ("openai", "OPENAI_API_KEY"),
+    "xai": ("xai", "XAI_API_KEY"),
+    "gemini": ("google", "GEMINI_API_KEY"),
+}
+
+
+@lru_cache()
+def keyring_key(provider: str) -> Optional[str]:
+    """
+    Looks a provider's key up in the system keyring, only when it's needed:
+    on headless Linux without a Secret Service a lookup can block for seconds.
+    """
+    try:
+        import keyring
+
+        return keyring.get_password(*KEYRING_ENTRIES[provider])
+    except Exception:
+        # Keyring not available (e.g. in Docker), rely on env vars
+        return None
 
 
 class Settings(BaseSettings):
     APP_NAME: str = "Infinite Wiki"
 
     # --- Provider Configuration ---
-    # "auto" checks keyring priorities (OpenAI -> xAI -> Gemini)
+    # "auto" checks keyring priorities (OpenAI -> xAI -> Gemini) on first use
     AI_PROVIDER: ProviderType = "auto"
 
     # We initialize these as None so the validator can populate them dynamically
@@ -41,6 +62,136 @@ class Settings(BaseSettings):
         "You are an expert art director. Create detailed visual descriptions for sci-fi concept art."
     )
 
+    # --- World Residency ---
+    # How many worlds may keep engines, Chroma clients and graphs in memory at once.
+    # 0 disables the limit.
+    MAX_RESIDENT_WORLDS: int = 16
+    # Evict idle worlds while the process RSS exceeds this budget (MB). 0 disables it.
+    RESIDENT_MEMORY_BUDGET_MB: int = 0
+    # Worlds used within this window are never evicted (they are likely mid-request).
+    RESIDENT_MIN_IDLE_SECONDS: float = 30.0
+
+    # --- Startup Warm-up ---
+    # Loads the embedding model and opens the most recently used worlds in the
+    # background after startup (0 worlds = only the model). /ready reports when done.
+    WARMUP_ENABLED: bool = True
+    WARMUP_WORLDS: int = 2
+
+    # --- Chroma Storage ---
+    # "per_world": a Chroma client per world in <world>/chroma_db.
+    # "shared": one client over WORLD_DATA_DIR/_chroma with a collection per world
+    # (migrate with scripts/migrate_chroma_store.py).
+    CHROMA_STORAGE: Literal["per_world", "shared"] = "per_world"
+
+    # --- RAG Backend ---
+    # "chroma", or "numpy": a memory-mapped vector file per world next to its
+    # database (copy existing worlds with scripts/migrate_vector_store.py)
+    RAG_BACKEND: Literal["chroma", "numpy"] = "chroma"
+    # Storage of the unit vectors: float16, or int8 (half the size, slightly lower recall)
+    VECTOR_STORE_DTYPE: Literal["float16", "int8"] = "float16"
+    # Exact search up to this many vectors per world, IVF clustering above (0 = never)
+    VECTOR_STORE_ANN_THRESHOLD: int = 10000
+    # IVF clusters scanned per query
+    VECTOR_STORE_ANN_PROBES: int = 16
+
+    # --- Embeddings (shared by all worlds) ---
+    # Concurrent embedding requests are collected for up to this many ms, or
+    # until EMBEDDING_MAX_BATCH texts are waiting, and embedded in one batch
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_MAX_BATCH: int = 32
+    # ONNX inference threads (0 = onnxruntime's default, one per core)
+    EMBEDDING_THREADS: int = 0
+
+    # --- Index Rebuilds (scripts/rebuild_indexes.py, /api/world/<world>/indexes) ---
+    # Articles embedded per batch, and worlds rebuilt in parallel by the script
+    INDEX_REBUILD_BATCH: int = 64
+    INDEX_REBUILD_WORKERS: int = 2
+
+    # --- Reindexing After Edits ---
+    # Edited articles are reindexed (RAG entry, graph relations) in the background
+    # once their world has seen no edit for this long...
+    REINDEX_DEBOUNCE_SECONDS: float = 2.0
+    # ...or at the latest this long after the first pending edit
+    REINDEX_MAX_DELAY_SECONDS: float = 10.0
+
+    # --- SQLite Tuning (applied to every world database connection) ---
+    # Set a value to an empty string (or 0 for sizes) to keep SQLite's default.
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE: int = -16000  # negative = KiB, i.e. ~16 MB page cache
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_TEMP_STORE: str = "MEMORY"
+
+    # --- Article Revisions ---
+    # Every Nth revision stores a full snapshot instead of a delta, which bounds
+    # how many deltas have to be applied to reconstruct an old version.
+    REVISION_SNAPSHOT_INTERVAL: int = 10
+
+    # --- LLM Rate Limiting ---
+    # Maximum number of concurrent requests to the LLM/image provider. 0 = unlimited.
+    # scripts/seed_wiki.py uses its own limits (--llm-concurrency).
+    LLM_MAX_CONCURRENCY: int = 0
+    # Requests started per minute (spread evenly). 0 = unlimited.
+    LLM_REQUESTS_PER_MINUTE: int = 0
+
+    # --- Speculative Prefetch ---
+    # Generate likely-next articles (unresolved related entities) in the background.
+    PREFETCH_ENABLED: bool = False
+    # How many related entities of a viewed article to prefetch, best connected first.
+    PREFETCH_TOP_K: int = 3
+    # Maximum speculative generations per world per hour.
+    PREFETCH_BUDGET_PER_HOUR: int = 20
+
+    # --- Fake Provider (AI_PROVIDER="fake", offline tests and benchmarks) ---
+    # Latency spec in ms: "50", "uniform:20:200", "normal:800:200", "lognormal:800:0.5"
+    FAKE_LATENCY_MS: str = "0"
+    FAKE_IMAGE_LATENCY_MS: str = "0"
+    # Changes every generated text/plan/image while keeping runs reproducible
+    FAKE_SEED: int = 0
+
+    # --- Provider HTTP Client (shared by the LLM and image clients) ---
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    # Idle pooled connections are closed after this many seconds
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    # Used when the optional "h2" package is installed
+    HTTP2_ENABLED: bool = True
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    # Read timeouts: chat completions, quick checks (dedup, validation), images
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    LLM_FAST_TIMEOUT_SECONDS: float = 30.0
+    IMAGE_TIMEOUT_SECONDS: float = 300.0
+    # Connections per provider host opened at startup (0 = off)
+    HTTP_PREWARM_CONNECTIONS: int = 2
+
+    # --- Image Generation Queue ---
+    # Concurrent image jobs in the web process (0 = no pool: background tasks / inline)
+    IMAGE_WORKERS: int = 2
+    IMAGE_MAX_ATTEMPTS: int = 3
+    # Delay before the first retry; doubles with every further attempt
+    IMAGE_RETRY_BACKOFF_SECONDS: float = 10.0
+
+    # Largest accepted generated image (decoded base64 or downloaded URL)
+    IMAGE_MAX_BYTES: int = 20 * 1024 * 1024
+    # Total time allowed to download an image URL returned by the provider
+    IMAGE_DOWNLOAD_TIMEOUT_SECONDS: float = 60.0
+
+    # --- Image Derivatives ---
+    # Resized variants offered to browsers through srcset (comma-separated)
+    IMAGE_DERIVATIVE_WIDTHS: str = "320,640,1024"
+    # "webp" and/or "avif" (AVIF needs a Pillow build with AVIF support)
+    IMAGE_DERIVATIVE_FORMATS: str = "webp"
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+
+    # --- Telemetry ---
+    # Request latency and query counting for /metrics (span metrics are always on)
+    METRICS_ENABLED: bool = True
+    # OTLP/gRPC collector for generation traces (e.g. "http://localhost:4317").
+    # Metrics are always available at /metrics.
+    OTEL_EXPORTER_OTLP_ENDPOINT: Optional[str] = None
+    OTEL_SERVICE_NAME: str = "infinite-wiki"
+
     # Auth
     AUTH_USERNAME: Optional[str] = None
     AUTH_PASSWORD: Optional[str] = None
@@ -62,35 +213,33 @@ class Settings(BaseSettings):
         """
         Configures Keys, URLs, and Default Models based on the selected AI_PROVIDER.
         """
-        # 1. Lazy load keys from system keyring
-        try:
-            key_openai = keyring.get_password("openai", "OPENAI_API_KEY")
-            key_xai = keyring.get_password("xai", "XAI_API_KEY")
-            key_gemini = keyring.get_password("google", "GEMINI_API_KEY")
-        except Exception:
-            # Keyring not available (e.g. in Docker), rely on env vars
-            key_openai = None
-            key_xai = None
-            key_gemini = None
-
-        # 2. Auto-detect provider if set to 'auto'
+        # An env var key settles "auto" right away. Otherwise "auto" means
+        # checking the keyring, which is left to resolve_provider() on first use
+        if self.AI_PROVIDER == "auto" and self.OPENAI_API_KEY:
+            self.AI_PROVIDER = "openai"
+        if self.AI_PROVIDER != "auto":
+            self.apply_provider_defaults()
+        return self
+
+    def resolve_provider(self) -> "Settings":
+        """
+        Picks the provider for AI_PROVIDER="auto" from the keyring, in priority
+        order (OpenAI -> xAI -> Gemini), and fills in its URL and default
+        models. Called by the clients on first use, not at import: on headless
+        Linux loading the keyring backend alone can take seconds.
+        """
         if self.AI_PROVIDER == "auto":
-            if self.OPENAI_API_KEY:  # Env var takes priority
-                self.AI_PROVIDER = "openai"
-            elif key_openai:
-                self.AI_PROVIDER = "openai"
-            elif key_xai:
-                self.AI_PROVIDER = "xai"
-            elif key_gemini:
-                self.AI_PROVIDER = "gemini"
-            else:
-                self.AI_PROVIDER = "openai"  # Fallback
-
-        # 3. Apply Provider Settings
+            self.AI_PROVIDER = next(
+                (p for p in ("openai", "xai", "gemini") if keyring_key(p)),
+                "openai",  # Fallback
+            )
+            self.apply_provider_defaults()
+        return self
+
+    def apply_provider_defaults(self):
+        """The selected provider's URL and default models, unless set in the env."""
         match self.AI_PROVIDER:
             case "openai":
-                self.OPENAI_API_KEY = self.OPENAI_API_KEY or key_openai
-
                 if not self.OPENAI_BASE_URL:
                     self.OPENAI_BASE_URL = "https://api.openai.com/v1"
 
@@ -101,8 +250,6 @@ class Settings(BaseSettings):
                     self.IMAGE_GEN_MODEL = "gpt-image-1-mini"
 
             case "xai":
-                self.OPENAI_API_KEY = self.OPENAI_API_KEY or key_xai
-
                 if not self.OPENAI_BASE_URL:
                     self.OPENAI_BASE_URL = "https://api.x.ai/v1"
 
@@ -112,8 +259,6 @@ class Settings(BaseSettings):
                     self.IMAGE_GEN_MODEL = "grok-2-image-latest"
 
             case "gemini":
-                self.OPENAI_API_KEY = self.OPENAI_API_KEY or key_gemini
-
                 if not self.OPENAI_BASE_URL:
                     # Google's OpenAI-compatible endpoint
                     self.OPENAI_BASE_URL = (
@@ -127,12 +272,22 @@ class Settings(BaseSettings):
                     # falling back or using a placeholder
                     self.IMAGE_GEN_MODEL = "gemini-2.5-flash-latest"
 
+            case "fake":
+                # Served in-process by app/core/fake_provider.py, no key needed
+                self.OPENAI_API_KEY = self.OPENAI_API_KEY or "fake"
+                if not self.OPENAI_BASE_URL:
+                    self.OPENAI_BASE_URL = "http://fake-provider.local/v1"
+                if not self.LLM_MODEL:
+                    self.LLM_MODEL = "fake-llm"
+                if not self.IMAGE_GEN_MODEL:
+                    self.IMAGE_GEN_MODEL = "fake-image"
+
             case "custom":
                 # For custom (local LLMs), we assume user sets URL/Key in .env
                 if not self.LLM_MODEL:
                     self.LLM_MODEL = "local-model"
 
-        # 4. Final Fallback for Image Gen Key
+        # Final Fallback for Image Gen Key
         # If no specific image key is provided, reuse the text generation key
         if not self.IMAGE_GEN_API_KEY:
             self.IMAGE_GEN_API_KEY = self.OPENAI_API_KEY
@@ -140,7 +295,12 @@ class Settings(BaseSettings):
         if not self.IMAGE_GEN_BASE_URL:
             self.IMAGE_GEN_BASE_URL = self.OPENAI_BASE_URL
 
-        return self
+    def provider_api_key(self) -> Optional[str]:
+        """The key from the env, else the provider's key from the keyring."""
+        self.resolve_provider()
+        if not self.OPENAI_API_KEY and self.AI_PROVIDER in KEYRING_ENTRIES:
+            self.OPENAI_API_KEY = keyring_key(self.AI_PROVIDER)
+        return self.OPENAI_API_KEY
 
 
 @lru_cache()
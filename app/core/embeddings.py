@@ -0,0 +1,219 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from functools import cached_property
+from typing import Any, Dict, List, Optional
+
+from chromadb.utils.embedding_functions import register_embedding_function
+from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+from app.config import get_settings
+from app.core.metrics import metrics_registry
+
+settings = get_settings()
+
+embedding_batch_size = metrics_registry.histogram(
+    "wiki_embedding_batch_size",
+    "Texts embedded per model call, across all worlds and requests.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 512),
+)
+embedding_batch_seconds = metrics_registry.histogram(
+    "wiki_embedding_batch_seconds", "Time to embed one batch."
+)
+
+
+class OnnxEmbeddingFunction(ONNXMiniLM_L6_V2):
+    """
+    Chroma's default model (all-MiniLM-L6-v2) with a configurable number of
+    inference threads. Chroma's DefaultEmbeddingFunction creates a fresh
+    instance, and so loads a fresh ONNX session, for every call.
+
+    Overrides the `model` property of Chroma's ONNX function, which isn't a
+    public API: chromadb is pinned to a minor version in pyproject.toml and
+    tests/verify_embeddings.py checks the attributes relied on here.
+    """
+
+    def __init__(self, threads: int = 0):
+        super().__init__()
+        self.threads = threads
+
+    # The same model as Chroma's DefaultEmbeddingFunction, and recorded in
+    # collections under its name: existing collections open without conflict
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {}
+
+    @cached_property
+    def model(self) -> Any:
+        options = self.ort.SessionOptions()
+        options.log_severity_level = 3
+        options.graph_optimization_level = (
+            self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        # CoreML is slower than the CPU provider for this model
+        providers = [
+            p
+            for p in self.ort.get_available_providers()
+            if p != "CoreMLExecutionProvider"
+        ]
+        return self.ort.InferenceSession(
+            os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+            providers=providers,
+            sess_options=options,
+        )
+
+
+class EmbeddingBatcher:
+    """
+    A Chroma embedding function that batches across requests: texts from
+    concurrent calls (any thread, any world) are collected for up to
+    `window_ms`, or until `max_batch` texts are waiting, and embedded with a
+    single call of `function` on a dedicated thread. Callers block until
+    their part of the batch is done, so the RAG calls should run in worker
+    threads (asyncio.to_thread) for requests to overlap.
+
+    Collections record the wrapped function's name and config, so Chroma's
+    conflict check keeps embedding spaces apart (e.g. the fake provider's
+    vectors from the real model's).
+    """
+
+    def __init__(self, function, window_ms: float = None, max_batch: int = None):
+        self.function = function
+        # Chroma registers embedding functions by class (see name() below),
+        # but reads the name of a collection's function from the instance
+        self.name = function.name
+        self.window = (
+            settings.EMBEDDING_BATCH_WINDOW_MS if window_ms is None else window_ms
+        ) / 1000
+        self.max_batch = (
+            settings.EMBEDDING_MAX_BATCH if max_batch is None else max_batch
+        )
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+
+    def __call__(self, input: List[str]) -> List[Any]:
+        if not input:
+            return []
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((list(input), future))
+        return future.result()
+
+    def embed_query(self, input: List[str]) -> List[Any]:
+        return self(input)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.window
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._embed(batch)
+
+    def _embed(self, batch: List[tuple]):
+        texts = [text for texts, _ in batch for text in texts]
+        started = time.perf_counter()
+        try:
+            embeddings = self.function(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        embedding_batch_seconds.observe(time.perf_counter() - started)
+        embedding_batch_size.observe(len(texts))
+        self.batches += 1
+        self.texts += len(texts)
+
+        offset = 0
+        for texts, future in batch:
+            future.set_result(embeddings[offset : offset + len(texts)])
+            offset += len(texts)
+
+    # --- Chroma embedding function interface ---
+
+    @staticmethod
+    def name() -> str:
+        # The class is registered with Chroma in place of its default function
+        return "default"
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.function.get_config()
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "EmbeddingBatcher":
+        return embedding_service()
+
+    @staticmethod
+    def validate_config(config: Dict[str, Any]) -> None:
+        return
+
+    def validate_config_update(
+        self, old_config: Dict[str, Any], new_config: Dict[str, Any]
+    ) -> None:
+        return
+
+    def is_legacy(self) -> bool:
+        return False
+
+    def default_space(self) -> str:
+        return "l2"
+
+    def supported_spaces(self) -> List[str]:
+        return ["cosine", "l2", "ip"]
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "average_batch": round(self.texts / self.batches, 2) if self.batches else 0,
+        }
+
+
+_embedding_service: Optional[EmbeddingBatcher] = None
+_embedding_service_lock = threading.Lock()
+
+
+def embedding_service() -> EmbeddingBatcher:
+    """The process-wide batcher around the configured embedding model."""
+    global _embedding_service
+    with _embedding_service_lock:
+        if _embedding_service is None:
+            if settings.AI_PROVIDER == "fake":
+                # Offline: hashed bag-of-words instead of downloading the ONNX model
+                from app.core.fake_provider import FakeEmbeddingFunction
+
+                # Chroma rebuilds a collection's function from its name
+                register_embedding_function(FakeEmbeddingFunction)
+                function = FakeEmbeddingFunction()
+            else:
+                function = OnnxEmbeddingFunction(threads=settings.EMBEDDING_THREADS)
+            _embedding_service = EmbeddingBatcher(function)
+        return _embedding_service
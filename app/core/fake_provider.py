@@ -0,0 +1,434 @@
+"""
+Deterministic, offline stand-in for an OpenAI-compatible provider.
+
+With AI_PROVIDER="fake" the LLM and image clients talk to this app in-process
+(via httpx.ASGITransport) and Chroma embeds with FakeEmbeddingFunction, so the
+whole generation pipeline runs without network access or API keys. Outputs
+depend only on the request and FAKE_SEED; latency follows FAKE_LATENCY_MS /
+FAKE_IMAGE_LATENCY_MS.
+
+It can also be served over HTTP for other clients:
+    uvicorn app.core.fake_provider:app --port 9000
+"""
+
+import time
+import json
+import math
+import base64
+import random
+import struct
+import asyncio
+import hashlib
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from app.config import get_settings
+
+settings = get_settings()
+
+FAKE_BASE_URL = "http://fake-provider.local/v1"
+EMBEDDING_DIMENSIONS = 384
+
+ADJECTIVES = [
+    "Amber",
+    "Ashen",
+    "Broken",
+    "Crimson",
+    "Drowned",
+    "Eternal",
+    "Forgotten",
+    "Gilded",
+    "Hollow",
+    "Iron",
+    "Jade",
+    "Last",
+    "Lunar",
+    "Molten",
+    "Northern",
+    "Obsidian",
+    "Pale",
+    "Quiet",
+    "Radiant",
+    "Silent",
+    "Sunken",
+    "Twin",
+    "Umbral",
+    "Veiled",
+    "Whispering",
+]
+NOUNS = [
+    "Archive",
+    "Bastion",
+    "Canal",
+    "Citadel",
+    "Compact",
+    "Concord",
+    "Engine",
+    "Forge",
+    "Garden",
+    "Guild",
+    "Harbor",
+    "Lantern",
+    "Library",
+    "Market",
+    "Order",
+    "Orchard",
+    "Pact",
+    "Relay",
+    "Sanctum",
+    "Spire",
+    "Tide",
+    "Tower",
+    "Vault",
+    "Wardens",
+    "Well",
+]
+VERBS = [
+    "guards",
+    "records",
+    "trades with",
+    "was founded near",
+    "rivals",
+    "supplies",
+    "remembers",
+    "shelters",
+    "watches over",
+    "depends on",
+]
+ENTITY_TYPES = [
+    "Person",
+    "Location",
+    "Organization",
+    "Event",
+    "Object",
+    "Concept",
+    "Technology",
+]
+RELATIONS = ["related to", "part of", "located in", "founded by", "opposes"]
+
+# Fields whose value decides control flow: always take the "happy path"
+FIXED_VALUES = {
+    "is_duplicate": False,
+    "existing_title": None,
+    "is_valid": True,
+    "issues": [],
+    "generate_images": False,
+}
+
+
+class LatencyDistribution:
+    """
+    Parses a latency spec (milliseconds) and samples delays in seconds:
+    "0" or "50" (fixed), "uniform:20:200", "normal:100:30" (mean, stddev),
+    "lognormal:100:0.5" (median, sigma).
+    """
+
+    def __init__(self, spec: str, seed: int = 0):
+        self.spec = str(spec or "0")
+        self._random = random.Random(seed)
+        kind, _, params = self.spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        self.kind = kind
+        self.params = [float(p) for p in params.split(":")]
+        if self.kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution '{self.spec}'")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = self._random.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = self._random.gauss(p[0], p[1])
+        else:
+            ms = self._random.lognormvariate(math.log(max(p[0], 1e-3)), p[1])
+        return max(ms, 0.0) / 1000.0
+
+
+def _rng(*parts) -> random.Random:
+    digest = hashlib.sha256(
+        json.dumps([settings.FAKE_SEED, *parts], default=str).encode("utf-8")
+    ).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _count_tokens(text: str) -> int:
+    # Roughly what real tokenizers produce for English prose
+    return max(1, len(text) // 4)
+
+
+def fake_name(rng: random.Random) -> str:
+    return f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+
+
+def fake_sentence(rng: random.Random) -> str:
+    return f"{fake_name(rng)} {rng.choice(VERBS)} {fake_name(rng)}."
+
+
+def fake_paragraph(rng: random.Random, sentences: int = 4) -> str:
+    return " ".join(fake_sentence(rng) for _ in range(sentences))
+
+
+def fake_article(rng: random.Random, title: str = None) -> str:
+    title = title or fake_name(rng)
+    sections = [f"# {title}", "", fake_paragraph(rng)]
+    for _ in range(rng.randint(2, 4)):
+        sections += ["", f"## {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}", ""]
+        sections.append(fake_paragraph(rng, rng.randint(3, 6)))
+    return "\n".join(sections) + "\n"
+
+
+# --- Schema-driven structured outputs ---
+
+
+def _resolve(schema: Dict, root: Dict) -> Dict:
+    while "$ref" in schema:
+        path = schema["$ref"].lstrip("#/").split("/")
+        target = root
+        for part in path:
+            target = target[part]
+        schema = target
+    return schema
+
+
+def fake_value(
+    schema: Dict, rng: random.Random, root: Dict, key: str = "", parent=None
+) -> Any:
+    """Generates a value valid against `schema` (the JSON Schema subset pydantic emits)."""
+    if key in FIXED_VALUES:
+        return FIXED_VALUES[key]
+    schema = _resolve(schema, root)
+
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "const" in schema:
+        return schema["const"]
+    for combinator in ("anyOf", "oneOf"):
+        if combinator in schema:
+            options = [o for o in schema[combinator] if o.get("type") != "null"]
+            return fake_value((options or schema[combinator])[0], rng, root, key)
+
+    kind = schema.get("type", "string")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+
+    if kind == "object":
+        obj = {}
+        for name, prop in schema.get("properties", {}).items():
+            obj[name] = fake_value(prop, rng, root, name, obj)
+        return obj
+    if kind == "array":
+        count = max(schema.get("minItems", 0), 3 if key != "entities" else 4)
+        if "maxItems" in schema:
+            count = min(count, schema["maxItems"])
+        return [
+            fake_value(schema.get("items", {}), rng, root, key) for _ in range(count)
+        ]
+    if kind == "boolean":
+        return False
+    if kind == "integer":
+        return rng.randint(0, 100)
+    if kind == "number":
+        if "year" in key:
+            return float(rng.randint(-2000, 4000))
+        return round(rng.uniform(0, 100), 2)
+    if kind == "null":
+        return None
+    return _fake_string(key, rng, parent)
+
+
+def _fake_string(key: str, rng: random.Random, parent: Optional[Dict]) -> str:
+    if key in ("name", "title", "seed_article_title"):
+        return fake_name(rng)
+    if key == "type":
+        return rng.choice(ENTITY_TYPES)
+    if key == "relation":
+        return rng.choice(RELATIONS)
+    if key == "display_date":
+        year = (parent or {}).get("year_numeric")
+        year = int(year) if year is not None else rng.randint(1, 4000)
+        return f"{abs(year)} {'AE' if year >= 0 else 'BE'}"
+    if key == "outline":
+        return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+    return fake_sentence(rng)
+
+
+def _json_schema(response_format: Optional[Dict]) -> Optional[Dict]:
+    if not response_format:
+        return None
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"].get("schema", {})
+    if response_format.get("type") == "json_object":
+        return {"type": "object", "properties": {}}
+    return None
+
+
+# --- Images ---
+
+
+def tiny_png(rgb, size: int = 8) -> bytes:
+    """A solid-color PNG of size x size pixels."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    row = b"\x00" + bytes(rgb) * size
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _image_for(prompt: str) -> bytes:
+    digest = hashlib.sha256(f"{settings.FAKE_SEED}:{prompt}".encode("utf-8")).digest()
+    return tiny_png(digest[:3])
+
+
+# --- Embeddings ---
+
+
+class FakeEmbeddingFunction:
+    """
+    Hashes words into a fixed-size normalized vector: texts sharing words end
+    up close together, which is enough for RAG lookups to return sensible
+    neighbours, and needs no model download.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in input]
+
+    def embed_query(self, input: List[str]) -> List[List[float]]:
+        return self(input)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+    @staticmethod
+    def name() -> str:
+        return "infinite-wiki-fake"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "FakeEmbeddingFunction":
+        return FakeEmbeddingFunction(config.get("dimensions", EMBEDDING_DIMENSIONS))
+
+    def default_space(self) -> str:
+        return "l2"
+
+    def supported_spaces(self) -> List[str]:
+        return ["cosine", "l2", "ip"]
+
+    def is_legacy(self) -> bool:
+        return False
+
+
+# --- OpenAI-compatible API ---
+
+app = FastAPI(title="Infinite Wiki Fake Provider")
+chat_latency = LatencyDistribution(settings.FAKE_LATENCY_MS, settings.FAKE_SEED)
+image_latency = LatencyDistribution(settings.FAKE_IMAGE_LATENCY_MS, settings.FAKE_SEED)
+_images: Dict[str, bytes] = {}
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {
+        "object": "list",
+        "data": [
+            {"id": settings.LLM_MODEL, "object": "model", "owned_by": "fake"},
+            {"id": settings.IMAGE_GEN_MODEL, "object": "model", "owned_by": "fake"},
+        ],
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    rng = _rng(body.get("model"), prompt)
+
+    await asyncio.sleep(chat_latency.sample())
+
+    schema = _json_schema(body.get("response_format"))
+    if schema is not None:
+        content = json.dumps(fake_value(schema, rng, schema))
+    else:
+        content = fake_article(rng)
+
+    prompt_tokens = _count_tokens(prompt)
+    completion_tokens = _count_tokens(content)
+    return {
+        "id": f"chatcmpl-fake-{rng.getrandbits(48):012x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model") or settings.LLM_MODEL,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.post("/v1/images/generations")
+async def images_generations(request: Request):
+    body = await request.json()
+    prompt = body.get("prompt", "")
+
+    await asyncio.sleep(image_latency.sample())
+
+    png = _image_for(prompt)
+    if body.get("response_format") == "b64_json":
+        item = {"b64_json": base64.b64encode(png).decode("ascii")}
+    else:
+        image_id = hashlib.sha256(png).hexdigest()[:16]
+        _images[image_id] = png
+        item = {"url": f"{FAKE_BASE_URL}/images/{image_id}.png"}
+    return {
+        "created": int(time.time()),
+        "data": [item for _ in range(body.get("n") or 1)],
+        "usage": {
+            "input_tokens": _count_tokens(prompt),
+            "output_tokens": 0,
+            "total_tokens": _count_tokens(prompt),
+        },
+    }
+
+
+@app.get("/v1/images/{image_id}.png")
+async def get_image(image_id: str):
+    png = _images.get(image_id)
+    if png is None:
+        return Response(status_code=404)
+    return Response(content=png, media_type="image/png")
@@ -0,0 +1,23 @@
+import os
+import tempfile
+from contextlib import suppress
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    Writes through a hidden temp file next to `path` (so the final rename
+    stays on one filesystem), so readers never see a partial file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates the file owner-only; keep the usual 0644
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
@@ -1,4 +1,5 @@
 import json
+import asyncio
 from sqlmodel import Session, select
 from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
@@ -10,7 +11,11 @@ from app.core.graph import graph_service
 from app.core.image_gen import image_gen_service
 from app.core.timeline import timeline_service
 from app.core.validator import validator_service
+from app.core.image_queue import image_queue
+from app.core.images import image_derivatives, ingest_base64, ingest_url
+from app.core.telemetry import span, traced
 from app.models.article import Article
+from app.models.image_job import ImageJob
 from app.config import get_settings
 
 settings = get_settings()
@@ -57,6 +62,7 @@ class DeduplicationResult(BaseModel):
 
 
 class GeneratorService:
+    @traced()
     async def generate_article(
         self,
         world_name: str,
@@ -137,8 +143,11 @@ class GeneratorService:
                 )
 
         # 5. Gather Context
-        rag_context = rag_service.query_context(world_name, title)
-        graph_context = graph_service.get_context_subgraph(world_name, [title])
+        with span("context"):
+            rag_context = await asyncio.to_thread(
+                rag_service.query_context, world_name, title
+            )
+            graph_context = graph_service.get_context_subgraph(world_name, [title])
 
         # Get World Config
         from app.core.world import world_manager
@@ -157,12 +166,14 @@ class GeneratorService:
             If it is a new, distinct entity, return false.
             """
 
-            dedup_response = await llm_service.generate_json(
-                dedup_prompt,
-                schema=DeduplicationResult,
-                model=world_config.llm_model,
-                system_prompt="You are a helpful assistant that prevents duplicate wiki entries.",
-            )
+            with span("dedup"):
+                dedup_response = await llm_service.generate_json(
+                    dedup_prompt,
+                    schema=DeduplicationResult,
+                    model=world_config.llm_model,
+                    system_prompt="You are a helpful assistant that prevents duplicate wiki entries.",
+                    timeout_seconds=settings.LLM_FAST_TIMEOUT_SECONDS,
+                )
 
             if dedup_response.is_duplicate and dedup_response.existing_title:
                 print(
@@ -220,13 +231,14 @@ class GeneratorService:
             f"Using Config: Planner='{world_config.system_prompt_planner[:20]}...', Writer='{world_config.system_prompt_writer[:20]}...', Model='{world_config.llm_model}'"
         )
 
-        plan_response = await llm_service.generate_json(
-            plan_prompt,
-            schema=ArticlePlan,
-            model=world_config.llm_model,
-            system_prompt=world_config.system_prompt_planner,
-        )
-        plan = ArticlePlan.model_validate(plan_response)
+        with span("plan"):
+            plan_response = await llm_service.generate_json(
+                plan_prompt,
+                schema=ArticlePlan,
+                model=world_config.llm_model,
+                system_prompt=world_config.system_prompt_planner,
+            )
+            plan = ArticlePlan.model_validate(plan_response)
 
         # 4. Stage 2: WRITE
         write_prompt = f"""
@@ -245,11 +257,12 @@ class GeneratorService:
         Style: Create an article that is both interesting and consistent with the world description and your system prompt. Write from an in-universe perspective. Use Markdown for formatting.
         """
 
-        content = await llm_service.generate_text(
-            write_prompt,
-            model=world_config.llm_model,
-            system_prompt=world_config.system_prompt_writer,
-        )
+        with span("write"):
+            content = await llm_service.generate_text(
+                write_prompt,
+                model=world_config.llm_model,
+                system_prompt=world_config.system_prompt_writer,
+            )
 
         # 4.5. Validation & Rewrite Loop
         if not skip_validation:
@@ -258,9 +271,11 @@ class GeneratorService:
                 print(
                     f"Validating generated content (Attempt {attempt + 1}/{max_retries})..."
                 )
-                is_valid, issues = await validator_service.validate_article_update(
-                    world_name, "", content
-                )
+                with span("validate", attempt=attempt + 1) as validate_span:
+                    is_valid, issues = await validator_service.validate_article_update(
+                        world_name, "", content
+                    )
+                    validate_span.set_attribute("valid", bool(is_valid))
 
                 if is_valid:
                     print("Content validation passed.")
@@ -283,11 +298,12 @@ class GeneratorService:
                 Ensure the new content is consistent with the world context.
                 """
 
-                content = await llm_service.generate_text(
-                    rewrite_prompt,
-                    model=world_config.llm_model,
-                    system_prompt=world_config.system_prompt_writer,
-                )
+                with span("rewrite", attempt=attempt + 1):
+                    content = await llm_service.generate_text(
+                        rewrite_prompt,
+                        model=world_config.llm_model,
+                        system_prompt=world_config.system_prompt_writer,
+                    )
             else:
                 print("Max validation retries reached. Saving best effort.")
 
@@ -301,59 +317,63 @@ class GeneratorService:
             year=plan.display_date,
             related_entities_json=json.dumps([e.model_dump() for e in plan.entities]),
         )
-        session.add(article)
-        session.commit()
-        session.refresh(article)
-
-        # 6. Handle Image Generation
-        if world_config.generate_images:
-            if background_tasks:
-                background_tasks.add_task(
-                    self.generate_and_save_image,
-                    world_name,
-                    article.id,
-                    plan.image_prompt,
-                    world_config,
-                )
-            else:
-                # Fallback to sync if no background tasks provided (e.g. in tests or scripts)
-                await self.generate_and_save_image(
-                    world_name, article.id, plan.image_prompt, world_config
-                )
+        with span("save"):
+            session.add(article)
+            image_job = None
+            if world_config.generate_images:
+                # Same transaction: a crash can't leave the article without its job
+                session.flush()
+                image_job = ImageJob(article_id=article.id, prompt=plan.image_prompt)
+                session.add(image_job)
+            session.commit()
+            session.refresh(article)
+
+        # 6. Handle Image Generation (worker pool in the app; inline in scripts)
+        if image_job is not None:
+            await image_queue.submit(world_name, image_job.id, background_tasks)
 
         # 7. Update Systems
-        rag_service.add_article(world_name, article.title, article.content, article.id)
-
-        # Update Graph
-        graph_service.add_entity(world_name, title, "Article")
-        for entity in plan.entities:
-            graph_service.add_entity(world_name, entity.name, entity.type)
-            graph_service.add_relationship(
-                world_name, title, entity.name, entity.relation
-            )
-
-        # Update Timeline (Store on Article Node)
-        if plan.year_numeric is not None and plan.timeline_event:
-            print(
-                "Adding timeline data to Article:",
-                plan.timeline_event,
-                "for year:",
-                plan.display_date,
-            )
-            # Update the existing Article node with timeline data
-            graph_service.add_entity(
+        with span("rag_index"):
+            await asyncio.to_thread(
+                rag_service.add_article,
                 world_name,
-                title,
-                "Article",
-                attributes={
-                    "year_numeric": plan.year_numeric,
-                    "display_date": plan.display_date,
-                    "description": plan.timeline_event,
-                },
+                article.title,
+                article.content,
+                article.id,
             )
 
+        with span("graph_update", entities=len(plan.entities)):
+            # Update Graph
+            graph_service.add_entity(world_name, title, "Article")
+            for entity in plan.entities:
+                graph_service.add_entity(world_name, entity.name, entity.type)
+                graph_service.add_relationship(
+                    world_name, title, entity.name, entity.relation
+                )
+
+            # Update Timeline (Store on Article Node)
+            if plan.year_numeric is not None and plan.timeline_event:
+                print(
+                    "Adding timeline data to Article:",
+                    plan.timeline_event,
+                    "for year:",
+                    plan.display_date,
+                )
+                # Update the existing Article node with timeline data
+                graph_service.add_entity(
+                    world_name,
+                    title,
+                    "Article",
+                    attributes={
+                        "year_numeric": plan.year_numeric,
+                        "display_date": plan.display_date,
+                        "description": plan.timeline_event,
+                    },
+                )
+
         return article
 
+    @traced()
     async def integrate_information(
         self, world_name: str, title: str, session: Session
     ) -> Article:
@@ -364,7 +384,9 @@ class GeneratorService:
             raise ValueError(f"Article '{title}' not found.")
 
         # 2. Gather Context (RAG + Graph)
-        rag_context = rag_service.query_context(world_name, title)
+        rag_context = await asyncio.to_thread(
+            rag_service.query_context, world_name, title
+        )
         graph_neighbors = graph_service.get_neighbors(world_name, title)
 
         # Get World Config
@@ -414,18 +436,27 @@ class GeneratorService:
             system_prompt="You are a helpful wiki editor.",
         )
 
-        # 4. Update Article
-        article.content = response.updated_content
-        article.summary = response.updated_summary
-        session.add(article)
+        # 4. Update Article (previous version is kept as a revision)
+        from app.core.revisions import revision_service
+
+        revision_service.record_update(
+            session,
+            article,
+            response.updated_content,
+            source="integrate",
+            new_summary=response.updated_summary,
+        )
         session.commit()
         session.refresh(article)
 
-        # 5. Update RAG (Re-index)
-        rag_service.add_article(world_name, article.title, article.content, article.id)
+        # 5. Update RAG and graph in the background
+        from app.core.reindex import reindex_queue
+
+        reindex_queue.enqueue(world_name, article.id)
 
         return article, response.delta_description
 
+    @traced()
     async def extract_timeline_events(
         self, world_name: str, title: str, session: Session
     ) -> List[Dict]:
@@ -501,80 +532,78 @@ class GeneratorService:
 
         return added_events
 
+    @traced()
     async def generate_and_save_image(
         self, world_name: str, article_id: int, image_prompt: str, world_config
-    ):
+    ) -> Optional[str]:
+        """Generates and stores an article's image. Returns its URL, None on failure."""
         print(f"Starting background image generation for article {article_id}...")
         from app.database import get_session
 
         # Optimize prompt
-        optimized_prompt = await image_gen_service.optimize_image_prompt(
-            image_prompt, world_config.system_prompt_image, model=world_config.llm_model
-        )
+        with span("image_optimize"):
+            optimized_prompt = await image_gen_service.optimize_image_prompt(
+                image_prompt,
+                world_config.system_prompt_image,
+                model=world_config.llm_model,
+            )
 
         # Generate
         print("optimized_image_prompt: ", optimized_prompt)
-        image_b64 = await image_gen_service.generate_image(
-            optimized_prompt,
-            model=world_config.image_gen_model,
-            response_format="b64_json",
-        )
+        with span("image_generate"):
+            image_data = await image_gen_service.generate_image(
+                optimized_prompt,
+                model=world_config.image_gen_model,
+                response_format="b64_json",
+            )
+        if not image_data:
+            print("Image generation failed.")
+            return None
 
-        image_url = None
-        if image_b64 and not image_b64.startswith("http"):
-            # Decode and save locally
-            import base64
-            import os
-            from app.core.world import world_manager
-
-            # We need to get the title again to make the filename, or just use ID?
-            # Let's fetch the article to be safe and get the title
-            session_gen = get_session(world_name)
-            session = next(session_gen)
-            try:
-                article = session.get(Article, article_id)
-                if not article:
-                    print(f"Article {article_id} not found for image update.")
-                    return
-
-                # Create safe filename
-                safe_title = (
-                    "".join(
-                        [
-                            c
-                            for c in article.title
-                            if c.isalnum() or c in (" ", "-", "_")
-                        ]
+        from app.core.world import world_manager
+
+        images_dir = world_manager.get_images_path(world_name)
+        try:
+            # Streamed into a temp file, then renamed to its content hash: titles
+            # can't collide, URLs never change and readers never see partial files
+            with span("image_ingest"):
+                if image_data.startswith(("http://", "https://")):
+                    image_hash, filename = await ingest_url(images_dir, image_data)
+                else:
+                    image_hash, filename = await asyncio.to_thread(
+                        ingest_base64, images_dir, image_data
                     )
-                    .strip()
-                    .replace(" ", "_")
-                )
-                filename = f"{safe_title}.png"
-
-                images_dir = world_manager.get_images_path(world_name)
-                filepath = os.path.join(images_dir, filename)
-
-                try:
-                    with open(filepath, "wb") as f:
-                        f.write(base64.b64decode(image_b64))
-
-                    # Store relative path
-                    image_url = f"/world/{world_name}/images/{filename}"
-
-                    # Update Article
-                    article.image_url = image_url
-                    session.add(article)
-                    session.commit()
-                    print(f"Image saved and article updated for {article.title}")
-
-                except Exception as e:
-                    print(f"Failed to save image: {e}")
-            finally:
-                session.close()
-        else:
-            print(
-                "Image generation failed or returned URL (not supported for local save yet)."
-            )
+        except Exception as e:
+            print(f"Failed to save image: {e}")
+            return None
+
+        # Resized variants for srcset; missing ones are made on request
+        with span("image_derivatives"):
+            try:
+                await asyncio.to_thread(image_derivatives.create, images_dir, filename)
+            except Exception as e:
+                print(f"Failed to create image variants: {e}")
+
+        # Store relative path
+        image_url = f"/world/{world_name}/images/{filename}"
+
+        session_gen = get_session(world_name)
+        session = next(session_gen)
+        try:
+            article = session.get(Article, article_id)
+            if not article:
+                print(f"Article {article_id} not found for image update.")
+                return None
+
+            # Update Article
+            article.image_url = image_url
+            article.image_hash = image_hash
+            session.add(article)
+            session.commit()
+            print(f"Image saved and article updated for {article.title}")
+        finally:
+            session.close()
+        return image_url
 
 
 generator_service = GeneratorService()
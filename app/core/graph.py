@@ -1,20 +1,45 @@
-import networkx as nx
 import json
 import os
-from typing import List, Dict
+import time
+from typing import TYPE_CHECKING, List, Dict
 from app.core.world import world_manager
+from app.core.residency import residency_manager
+from app.core.metrics import metrics_registry
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+graph_flush_seconds = metrics_registry.histogram(
+    "wiki_graph_flush_seconds", "Time to serialize and write a world graph to disk."
+)
+graph_flush_bytes = metrics_registry.histogram(
+    "wiki_graph_flush_bytes",
+    "Size of each world graph written to disk.",
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+)
 
 
 class GraphService:
     def __init__(self):
         self._graphs = {}
+        residency_manager.register("graph", self.unload_graph)
 
-    def get_graph(self, world_name: str) -> nx.Graph:
+    def get_graph(self, world_name: str) -> "nx.Graph":
         if world_name not in self._graphs:
             self.load_graph(world_name)
+        residency_manager.touch(world_name)
         return self._graphs[world_name]
 
+    def unload_graph(self, world_name: str):
+        """Flushes a world's graph to disk and drops it from memory."""
+        graph = self._graphs.pop(world_name, None)
+        if graph is not None:
+            self._write_graph(world_name, graph)
+
     def load_graph(self, world_name: str):
+        # networkx is imported on first use to keep startup fast
+        import networkx as nx
+
         path = world_manager.get_paths(world_name)["graph"]
         if os.path.exists(path):
             with open(path, "r") as f:
@@ -24,11 +49,19 @@ class GraphService:
             self._graphs[world_name] = nx.Graph()
 
     def save_graph(self, world_name: str):
+        self._write_graph(world_name, self.get_graph(world_name))
+
+    def _write_graph(self, world_name: str, graph: "nx.Graph"):
+        import networkx as nx
+
+        started = time.perf_counter()
         path = world_manager.get_paths(world_name)["graph"]
-        graph = self.get_graph(world_name)
-        data = nx.node_link_data(graph, edges="links")
+        # ASCII-only JSON, so its length is the number of bytes written
+        payload = json.dumps(nx.node_link_data(graph, edges="links"))
         with open(path, "w") as f:
-            json.dump(data, f)
+            f.write(payload)
+        graph_flush_seconds.observe(time.perf_counter() - started)
+        graph_flush_bytes.observe(len(payload))
 
     def add_entity(
         self, world_name: str, name: str, type: str, attributes: Dict = None
@@ -63,6 +96,8 @@ class GraphService:
     def get_context_subgraph(
         self, world_name: str, entities: List[str], depth: int = 1
     ) -> str:
+        import networkx as nx
+
         graph = self.get_graph(world_name)
         relevant_nodes = set(entities)
         for entity in entities:
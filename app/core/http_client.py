@@ -0,0 +1,171 @@
+import time
+import asyncio
+import importlib.util
+from typing import Callable, List, Optional
+
+import httpx
+
+from app.config import get_settings
+from app.core.metrics import metrics_registry
+
+settings = get_settings()
+
+client_requests = metrics_registry.counter(
+    "wiki_http_client_requests",
+    "Outgoing HTTP requests, by client and whether they opened a new connection.",
+    ("client", "connection"),
+)
+client_connect_seconds = metrics_registry.histogram(
+    "wiki_http_client_connect_seconds",
+    "Time to open an outgoing connection (TCP and TLS handshake), by client.",
+    ("client",),
+)
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install 'httpx[http2]')."""
+    return settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Counts requests by whether they reused a pooled connection, using the
+    connection events httpcore reports through the "trace" request extension.
+
+    Keeps one transport (connection pool) per event loop: connections opened
+    under one loop can't be used from another, e.g. across asyncio.run calls
+    in scripts.
+    """
+
+    def __init__(self, factory: Callable[[], httpx.AsyncBaseTransport], name: str):
+        self.factory = factory
+        self.name = name
+        self._transport = None
+        self._loop = None
+
+    @property
+    def transport(self) -> httpx.AsyncBaseTransport:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # The previous pool's connections died with their loop
+            self._transport = self.factory()
+            self._loop = loop
+        return self._transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state = {"connect_started": None, "connected": None}
+        previous_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.started":
+                state["connect_started"] = time.perf_counter()
+            elif event_name in (
+                "connection.connect_tcp.complete",
+                "connection.start_tls.complete",
+            ):
+                state["connected"] = time.perf_counter()
+            if previous_trace is not None:
+                await previous_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            if state["connect_started"] is not None:
+                client_requests.inc(client=self.name, connection="new")
+                if state["connected"] is not None:
+                    client_connect_seconds.observe(
+                        state["connected"] - state["connect_started"], client=self.name
+                    )
+            else:
+                client_requests.inc(client=self.name, connection="reused")
+
+    async def aclose(self):
+        if self._transport is not None and self._loop is asyncio.get_running_loop():
+            await self._transport.aclose()
+
+
+def default_transport() -> httpx.AsyncBaseTransport:
+    """
+    The in-process fake provider for AI_PROVIDER="fake", otherwise a pooled
+    transport with the configured limits and keep-alive expiry.
+    """
+    if settings.AI_PROVIDER == "fake":
+        from app.core.fake_provider import app as fake_app
+
+        return httpx.ASGITransport(app=fake_app)
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS or None,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS or None,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=http2_available(),
+    )
+
+
+def timeout(seconds: float) -> httpx.Timeout:
+    """`seconds` per read/write/pool wait, with the shared connect timeout."""
+    return httpx.Timeout(seconds, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def create_http_client(
+    name: str, timeout_seconds: float = None, **kwargs
+) -> httpx.AsyncClient:
+    """A tuned AsyncClient whose connection reuse is reported under `name`."""
+    return httpx.AsyncClient(
+        transport=InstrumentedTransport(default_transport, name),
+        timeout=timeout(timeout_seconds or settings.LLM_TIMEOUT_SECONDS),
+        **kwargs,
+    )
+
+
+_provider_client: Optional[httpx.AsyncClient] = None
+
+
+def provider_http_client() -> httpx.AsyncClient:
+    """
+    The client shared by the LLM and image SDK clients, so they draw from one
+    connection pool. Their timeouts are set per SDK client or per request.
+    """
+    global _provider_client
+    if _provider_client is None:
+        _provider_client = create_http_client("provider")
+    return _provider_client
+
+
+def provider_base_urls() -> List[str]:
+    settings.resolve_provider()
+    llm_url = settings.OPENAI_BASE_URL or "https://api.openai.com/v1"
+    return sorted({llm_url, settings.IMAGE_GEN_BASE_URL or llm_url})
+
+
+async def prewarm(connections: int = None) -> int:
+    """
+    Opens connections to the provider hosts (TCP and TLS handshakes) so the
+    first generation doesn't pay for them; they stay pooled for the keep-alive
+    expiry. Any response, even an error status, counts. Returns the number of
+    successful requests.
+    """
+    if settings.AI_PROVIDER == "fake":
+        return 0
+    # May check the keyring (AI_PROVIDER="auto"), off the event loop
+    await asyncio.to_thread(settings.resolve_provider)
+    connections = (
+        settings.HTTP_PREWARM_CONNECTIONS if connections is None else connections
+    )
+    client = provider_http_client()
+
+    async def touch(url: str) -> bool:
+        try:
+            await client.head(url, timeout=timeout(settings.LLM_FAST_TIMEOUT_SECONDS))
+            return True
+        except httpx.HTTPError as e:
+            print(f"Could not prewarm a connection to {url}: {e}")
+            return False
+
+    # Concurrent requests to the same host open separate connections
+    results = await asyncio.gather(
+        *(touch(url) for url in provider_base_urls() for _ in range(connections))
+    )
+    return sum(results)
@@ -1,41 +1,64 @@
-from openai import AsyncOpenAI
 from app.config import get_settings
+from app.core.http_client import provider_http_client, timeout
 from app.core.llm import llm_service
+from app.core.telemetry import span
 
 settings = get_settings()
 
 class ImageGenService:
     def __init__(self):
-        # Use specific image gen config if available, otherwise fall back to main OpenAI config
-        api_key = settings.IMAGE_GEN_API_KEY or settings.OPENAI_API_KEY
-        base_url = settings.IMAGE_GEN_BASE_URL or settings.OPENAI_BASE_URL
-        
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        self._client = None
+
+    @property
+    def client(self):
+        """Created on first use, like LLMService.client."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            settings.resolve_provider()
+            # Use specific image gen config if available, otherwise fall back to main OpenAI config
+            api_key = settings.IMAGE_GEN_API_KEY or settings.provider_api_key()
+            base_url = settings.IMAGE_GEN_BASE_URL or settings.OPENAI_BASE_URL
+
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=provider_http_client(),
+                # Image generation routinely takes far longer than a chat completion
+                timeout=timeout(settings.IMAGE_TIMEOUT_SECONDS),
+            )
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
 
     async def generate_image(self, prompt: str, model: str = None, response_format: str = "url") -> str:
-        model = model or settings.IMAGE_GEN_MODEL
+        model = model or settings.resolve_provider().IMAGE_GEN_MODEL
         try:
-            response = await self.client.images.generate(
-                model=model,
-                prompt=prompt,
-                n=1,
-                response_format="b64_json" if response_format == "b64_json" else "url"
-            )
+            with span("llm.generate_image", model=model):
+                async with llm_service.limiter.slot():
+                    response = await self.client.images.generate(
+                        model=model,
+                        prompt=prompt,
+                        n=1,
+                        response_format="b64_json" if response_format == "b64_json" else "url"
+                    )
+                llm_service.record_usage(response, model)
             
+            # Some providers only return URLs, whatever format was asked for
+            item = response.data[0]
             if response_format == "b64_json":
-                return response.data[0].b64_json
+                return item.b64_json or item.url
             else:
-                return response.data[0].url
+                return item.url or item.b64_json
         except Exception as e:
             print(f"Image generation failed: {e}")
-            return "https://via.placeholder.com/1024x1024?text=Image+Generation+Failed"
+            return None
 
     
     def optimize_image_prompt(self, image_prompt: str, context: str, model: str = None) -> str:
-        model = model or settings.LLM_MODEL
+        model = model or settings.resolve_provider().LLM_MODEL
         system_prompt = "You are an expert art director, you optimize a given image prompt with a style context for better results."
 
         prompt = f"""
@@ -0,0 +1,268 @@
+import os
+import asyncio
+import sqlite3
+from typing import Dict, List, Optional
+
+from fastapi import BackgroundTasks
+from sqlmodel import select
+
+from app.config import get_settings
+from app.core.metrics import metrics_registry
+from app.core.telemetry import track_background
+from app.models.article import Article
+from app.models.image_job import ImageJob, utcnow
+
+settings = get_settings()
+
+
+class ImageJobQueue:
+    """
+    Runs the image generations recorded as ImageJob rows in each world's
+    database.
+
+    In the web process `start()` launches a fixed number of workers; jobs are
+    handed to them through an in-memory queue, retried with exponential
+    backoff, and jobs left pending or running by a crash are picked up again
+    on the next start. Without a running pool (scripts, tests) `submit` falls
+    back to FastAPI background tasks or runs the job inline.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        max_attempts: int = None,
+        retry_backoff: float = None,
+    ):
+        self.workers = settings.IMAGE_WORKERS if workers is None else workers
+        self.max_attempts = (
+            settings.IMAGE_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        )
+        self.retry_backoff = (
+            settings.IMAGE_RETRY_BACKOFF_SECONDS
+            if retry_backoff is None
+            else retry_backoff
+        )
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retry_handles = set()
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # --- Lifecycle ---
+
+    async def start(self) -> int:
+        """Starts the workers and re-enqueues unfinished jobs. Returns their count."""
+        if self.running or self.workers <= 0:
+            return 0
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        recovered = self.recover()
+        if recovered:
+            print(f"Re-enqueued {recovered} unfinished image job(s).")
+        return recovered
+
+    async def stop(self):
+        """Stops the workers. Running jobs stay 'running' and resume on next start."""
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    @staticmethod
+    def has_unfinished_jobs(world_name: str) -> bool:
+        """
+        Checks the world's database directly, without opening its engine:
+        opening every world at startup would evict worlds beyond the
+        residency limits.
+        """
+        from app.core.world import world_manager
+
+        path = os.path.join(world_manager.get_world_path(world_name), "database.db")
+        if not os.path.exists(path):
+            return False
+        try:
+            connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                row = connection.execute(
+                    "SELECT 1 FROM imagejob WHERE status IN ('pending', 'running') "
+                    "LIMIT 1"
+                ).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            # No imagejob table yet (a world created before image jobs)
+            return False
+        return row is not None
+
+    def recover(self) -> int:
+        from app.core.world import world_manager
+        from app.database import get_session
+
+        count = 0
+        for world_name in world_manager.list_worlds():
+            if not self.has_unfinished_jobs(world_name):
+                continue
+            session = next(get_session(world_name))
+            try:
+                statement = select(ImageJob).where(
+                    ImageJob.status.in_(["pending", "running"])
+                )
+                for job in session.exec(statement).all():
+                    job.status = "pending"
+                    session.add(job)
+                    self._queue.put_nowait((world_name, job.id))
+                    count += 1
+                session.commit()
+            finally:
+                session.close()
+        return count
+
+    # --- Submitting ---
+
+    async def submit(
+        self,
+        world_name: str,
+        job_id: int,
+        background_tasks: Optional[BackgroundTasks] = None,
+    ):
+        """Schedules a committed ImageJob on the pool, or runs it without one."""
+        if self.running:
+            self._queue.put_nowait((world_name, job_id))
+        elif background_tasks is not None:
+            background_tasks.add_task(
+                track_background("image", self.run_inline), world_name, job_id
+            )
+        else:
+            await self.run_inline(world_name, job_id)
+
+    async def run_inline(self, world_name: str, job_id: int):
+        """Runs a job to completion in the caller, retries included."""
+        while True:
+            delay = await self._attempt(world_name, job_id)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    # --- Processing ---
+
+    async def _worker(self):
+        while True:
+            world_name, job_id = await self._queue.get()
+            try:
+                delay = await track_background("image", self._attempt)(
+                    world_name, job_id
+                )
+                if delay is not None:
+                    self._schedule_retry(world_name, job_id, delay)
+            except Exception as e:
+                print(f"Image worker error for job {job_id} in '{world_name}': {e}")
+            finally:
+                self._queue.task_done()
+
+    def _schedule_retry(self, world_name: str, job_id: int, delay: float):
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            if self._queue is not None:
+                self._queue.put_nowait((world_name, job_id))
+
+        handle = loop.call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def _attempt(self, world_name: str, job_id: int) -> Optional[float]:
+        """
+        Runs one attempt of a pending job. Returns the delay before the next
+        attempt, or None if the job is finished (done, failed or not pending).
+        """
+        from app.core.generator import generator_service
+        from app.core.world import world_manager
+        from app.database import get_session
+
+        session = next(get_session(world_name))
+        try:
+            job = session.get(ImageJob, job_id)
+            if job is None or job.status != "pending":
+                return None
+            if session.get(Article, job.article_id) is None:
+                # Retrying can't bring a deleted article back
+                job.status = "failed"
+                job.last_error = "Article deleted"
+                job.updated_at = utcnow()
+                session.add(job)
+                session.commit()
+                self.failed += 1
+                return None
+            job.status = "running"
+            job.attempts += 1
+            job.updated_at = utcnow()
+            session.add(job)
+            session.commit()
+            article_id, prompt, attempt = job.article_id, job.prompt, job.attempts
+        finally:
+            session.close()
+
+        error = None
+        try:
+            image_url = await generator_service.generate_and_save_image(
+                world_name, article_id, prompt, world_manager.get_config(world_name)
+            )
+            if not image_url:
+                error = "Image generation returned no image"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        session = next(get_session(world_name))
+        try:
+            job = session.get(ImageJob, job_id)
+            job.updated_at = utcnow()
+            job.last_error = error
+            delay = None
+            if error is None:
+                job.status = "done"
+                self.completed += 1
+            elif attempt < self.max_attempts:
+                job.status = "pending"
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                self.retried += 1
+                print(
+                    f"Image job {job_id} failed (attempt {attempt}/{self.max_attempts}), "
+                    f"retrying in {delay:.0f}s: {error}"
+                )
+            else:
+                job.status = "failed"
+                self.failed += 1
+                print(f"Image job {job_id} failed permanently: {error}")
+            session.add(job)
+            session.commit()
+            return delay
+        finally:
+            session.close()
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "retry_scheduled": len(self._retry_handles),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+image_queue = ImageJobQueue()
+
+metrics_registry.gauge(
+    "wiki_image_queue_length", "Image jobs waiting for a worker."
+).set_function(lambda: image_queue.stats()["queued"])
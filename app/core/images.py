@@ -0,0 +1,357 @@
+import io
+import os
+import re
+import base64
+import asyncio
+import hashlib
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import get_settings
+from app.core.fs import write_atomic
+from app.core.http_client import create_http_client
+from app.core.metrics import metrics_registry
+
+settings = get_settings()
+
+DERIVED_DIR = "derived"
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+# Read/decode/download granularity when streaming images to disk
+CHUNK_SIZE = 64 * 1024
+
+derivatives_created = metrics_registry.counter(
+    "wiki_image_derivatives_created",
+    "Resized image variants written, by format.",
+    ("format",),
+)
+
+
+# Stored images are named "<sha256 of the content>.<ext>"
+CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+
+
+def _parse_list(value: str) -> List[str]:
+    return [v.strip().lower() for v in value.split(",") if v.strip()]
+
+
+def image_extension(data: bytes) -> str:
+    """File extension matching the image format, from its magic bytes."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return "png"
+
+
+def content_hash(filename: str) -> Optional[str]:
+    """The hash of a content-addressed image filename, None for legacy names."""
+    match = CONTENT_ADDRESSED.match(filename)
+    return match.group(1) if match else None
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class AtomicWriter:
+    """
+    Streams bytes into a hidden temp file in `directory` (so the final rename
+    stays on one filesystem) while hashing them. commit() moves the file into
+    place; leaving the block without committing deletes it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b""
+        self._hash = hashlib.sha256()
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise ImageTooLarge(f"Image exceeds {self.max_bytes} bytes")
+        if len(self.head) < 16:
+            self.head += chunk[: 16 - len(self.head)]
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def commit(self, path: str):
+        self._file.close()
+        # mkstemp creates the file owner-only; images are public
+        os.chmod(self._tmp_path, 0o644)
+        os.replace(self._tmp_path, path)
+        self._tmp_path = None
+
+    def discard(self):
+        self._file.close()
+        if self._tmp_path is not None:
+            os.unlink(self._tmp_path)
+            self._tmp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.discard()
+
+
+def _commit_image(writer: AtomicWriter) -> Tuple[str, str]:
+    """
+    Names a fully written image by its SHA-256, so a filename always refers to
+    the same content and can be cached forever. Identical images are stored
+    once. Returns (hash, filename).
+    """
+    if writer.size == 0:
+        raise ValueError("Empty image")
+    digest = writer.hexdigest()
+    filename = f"{digest}.{image_extension(writer.head)}"
+    path = os.path.join(writer.directory, filename)
+    if not os.path.exists(path):
+        writer.commit(path)
+    return digest, filename
+
+
+def ingest_base64(images_dir: str, data: str, max_bytes: int = None) -> Tuple[str, str]:
+    """
+    Decodes a base64 image payload into the image store chunk by chunk, so
+    the decoded image never has to be held in memory as a whole.
+    """
+    if any(ws in data for ws in ("\n", "\r", " ")):
+        # Chunks must stay aligned to whole 4-character groups
+        data = "".join(data.split())
+    step = CHUNK_SIZE // 3 * 4
+    with AtomicWriter(images_dir, max_bytes or settings.IMAGE_MAX_BYTES) as writer:
+        for start in range(0, len(data), step):
+            writer.write(base64.b64decode(data[start : start + step]))
+        return _commit_image(writer)
+
+
+def ingest_file(images_dir: str, path: str) -> Tuple[str, str]:
+    """Copies a local image file into the image store."""
+    with AtomicWriter(images_dir) as writer, open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            writer.write(chunk)
+        return _commit_image(writer)
+
+
+_download_client = None
+
+
+def download_client() -> httpx.AsyncClient:
+    """Pooled client for image URLs returned by the provider."""
+    global _download_client
+    if _download_client is None:
+        # Per read; ingest_url bounds the whole download separately
+        _download_client = create_http_client(
+            "image_download", timeout_seconds=30.0, follow_redirects=True
+        )
+    return _download_client
+
+
+async def ingest_url(
+    images_dir: str, url: str, max_bytes: int = None
+) -> Tuple[str, str]:
+    """Streams an image URL returned by the provider into the image store."""
+    max_bytes = max_bytes or settings.IMAGE_MAX_BYTES
+    async with asyncio.timeout(settings.IMAGE_DOWNLOAD_TIMEOUT_SECONDS):
+        async with download_client().stream("GET", url) as response:
+            response.raise_for_status()
+            length = response.headers.get("content-length")
+            if length and int(length) > max_bytes:
+                raise ImageTooLarge(f"Image is {length} bytes, limit is {max_bytes}")
+            with AtomicWriter(images_dir, max_bytes) as writer:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    writer.write(chunk)
+                return _commit_image(writer)
+
+
+class ImageDerivativeService:
+    """
+    Resized WebP/AVIF copies of article images for `srcset`. They live next to
+    the originals as images/derived/<encoding>/<width>/<original filename>.<format>,
+    so the image route and the static export serve them like any other file.
+    They are written when an image is saved and, for older images, on first
+    request. <encoding> names the encoder settings ("q80"): the variants are
+    cached as immutable, so new settings have to mean new URLs.
+    """
+
+    def __init__(
+        self, widths: List[int] = None, formats: List[str] = None, quality: int = None
+    ):
+        self.widths = sorted(
+            widths or [int(w) for w in _parse_list(settings.IMAGE_DERIVATIVE_WIDTHS)]
+        )
+        self.formats = [
+            f
+            for f in (formats or _parse_list(settings.IMAGE_DERIVATIVE_FORMATS))
+            if self._supported(f)
+        ]
+        self.quality = quality or settings.IMAGE_DERIVATIVE_QUALITY
+        self.encoding = f"q{self.quality}"
+
+    @staticmethod
+    def _supported(fmt: str) -> bool:
+        if fmt not in MIME_TYPES:
+            print(f"Unknown image derivative format '{fmt}', skipping it.")
+            return False
+        from PIL import features
+
+        if not features.check(fmt):
+            print(f"Pillow was built without {fmt.upper()} support, skipping it.")
+            return False
+        return True
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.widths and self.formats)
+
+    def derivative_path(
+        self, images_dir: str, filename: str, width: int, fmt: str
+    ) -> str:
+        return os.path.join(
+            images_dir, DERIVED_DIR, self.encoding, str(width), f"{filename}.{fmt}"
+        )
+
+    def is_derivative(self, encoding: str, width: int, fmt: str) -> bool:
+        return (
+            encoding == self.encoding and width in self.widths and fmt in self.formats
+        )
+
+    def _is_fresh(self, path: str, source: str) -> bool:
+        return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(
+            source
+        )
+
+    def create(
+        self, images_dir: str, filename: str, only=None, dest_dir: str = None
+    ) -> int:
+        """
+        Writes the missing or outdated variants of one image, decoding it once.
+        `only` restricts this to one (width, format); `dest_dir` is the images
+        directory they're written under, by default `images_dir`. Returns the
+        number written.
+        """
+        source = os.path.join(images_dir, filename)
+        dest_dir = dest_dir or images_dir
+        targets = [
+            (width, fmt)
+            for width in self.widths
+            for fmt in self.formats
+            if (only is None or (width, fmt) == only)
+            and not self._is_fresh(
+                self.derivative_path(dest_dir, filename, width, fmt), source
+            )
+        ]
+        if not targets:
+            return 0
+
+        from PIL import Image
+
+        with Image.open(source) as image:
+            image.load()
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            for width, fmt in targets:
+                resized = image.copy()
+                # Bounded by width only; never upscales, keeps the aspect ratio
+                resized.thumbnail((width, image.height))
+                self._save(
+                    resized, self.derivative_path(dest_dir, filename, width, fmt), fmt
+                )
+                derivatives_created.inc(format=fmt)
+        return len(targets)
+
+    def _save(self, image, path: str, fmt: str):
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt.upper(), quality=self.quality)
+        # Concurrent requests for the same variant never see half a file
+        write_atomic(path, buffer.getvalue())
+
+    def get_or_create(
+        self, images_dir: str, filename: str, encoding: str, width: int, fmt: str
+    ) -> Optional[str]:
+        """Path of a variant, created on demand. None if there is no such image."""
+        if (
+            not self.is_derivative(encoding, width, fmt)
+            or os.path.basename(filename) != filename
+        ):
+            return None
+        if not os.path.isfile(os.path.join(images_dir, filename)):
+            return None
+        self.create(images_dir, filename, only=(width, fmt))
+        return self.derivative_path(images_dir, filename, width, fmt)
+
+    @staticmethod
+    def originals(images_dir: str) -> List[str]:
+        """Filenames of the images in a world's images directory."""
+        if not os.path.isdir(images_dir):
+            return []
+        return sorted(
+            entry.name
+            for entry in os.scandir(images_dir)
+            # Skips in-progress writes (hidden temp files)
+            if entry.is_file() and not entry.name.startswith(".")
+        )
+
+    def variant_paths(self, images_dir: str, filename: str) -> List[str]:
+        """Paths of every configured variant of one image under `images_dir`."""
+        return [
+            self.derivative_path(images_dir, filename, width, fmt)
+            for width in self.widths
+            for fmt in self.formats
+        ]
+
+    def backfill(self, images_dir: str, dest_dir: str = None) -> Dict[str, int]:
+        """
+        Creates the variants of every image in a world's images directory,
+        under `dest_dir` if given.
+        """
+        stats = {"images": 0, "created": 0, "failed": 0}
+        if not self.enabled:
+            return stats
+        for filename in self.originals(images_dir):
+            stats["images"] += 1
+            try:
+                stats["created"] += self.create(images_dir, filename, dest_dir=dest_dir)
+            except Exception as e:
+                stats["failed"] += 1
+                print(
+                    f"Could not create variants of {os.path.join(images_dir, filename)}: {e}"
+                )
+        return stats
+
+    def sources(self, image_url: Optional[str]) -> List[Dict]:
+        """
+        <source> entries for an article image, best format first. Empty for
+        remote images, which have no local variants.
+        """
+        if not self.enabled or not image_url or not image_url.startswith("/world/"):
+            return []
+        base, filename = image_url.rsplit("/", 1)
+        return [
+            {
+                "type": MIME_TYPES[fmt],
+                "srcset": [
+                    (
+                        width,
+                        f"{base}/{DERIVED_DIR}/{self.encoding}/{width}/{filename}.{fmt}",
+                    )
+                    for width in self.widths
+                ],
+            }
+            for fmt in sorted(self.formats, key=lambda f: f != "avif")
+        ]
+
+
+image_derivatives = ImageDerivativeService()
@@ -0,0 +1,292 @@
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlmodel import select
+
+from app.config import get_settings
+from app.core.graph import graph_service
+from app.core.rag import rag_service
+from app.core.telemetry import track_background
+from app.models.article import Article
+
+settings = get_settings()
+
+INDEXES = ("rag", "graph")
+
+
+def related_entities(article: Article) -> List[Dict]:
+    try:
+        return [e for e in json.loads(article.related_entities_json) if e.get("name")]
+    except (TypeError, ValueError, AttributeError):
+        return []
+
+
+class IndexService:
+    """
+    Checks and repairs what is derived from a world's Article rows, the
+    source of truth:
+
+    - "rag": one entry per article in the RAG index (Chroma or the NumPy
+      store), holding its current content. Missing and stale entries are
+      re-embedded in batches and upserted, orphans are removed.
+    - "graph": a node per article, plus the related entities and relations
+      stored with it. Repairs only add what's missing: aliases, events and
+      timeline data live only in the graph, so it is never rebuilt from
+      scratch.
+
+    Rebuild progress is kept per world in `jobs` (see `stats()`).
+    """
+
+    def __init__(self, batch_size: int = None, workers: int = None):
+        self.batch_size = batch_size or settings.INDEX_REBUILD_BATCH
+        self.workers = workers or settings.INDEX_REBUILD_WORKERS
+        self.jobs: Dict[str, Dict] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def load_articles(self, world_name: str) -> List[Article]:
+        from app.database import get_session
+
+        session = next(get_session(world_name))
+        try:
+            return list(session.exec(select(Article)).all())
+        finally:
+            session.close()
+
+    # --- Verification ---
+
+    def verify_rag(self, world_name: str, articles: List[Article]) -> Dict:
+        indexed = rag_service.indexed_documents(world_name)
+        ids = {str(a.id) for a in articles}
+        missing = [a.id for a in articles if str(a.id) not in indexed]
+        stale = [
+            a.id
+            for a in articles
+            if str(a.id) in indexed and indexed[str(a.id)] != a.content
+        ]
+        orphaned = sorted(id for id in indexed if id not in ids)
+        return {
+            "backend": rag_service.backend,
+            "indexed": len(indexed),
+            "missing": missing,
+            "stale": stale,
+            "orphaned": orphaned,
+            "consistent": not (missing or stale or orphaned),
+        }
+
+    def verify_graph(self, world_name: str, articles: List[Article]) -> Dict:
+        graph = graph_service.get_graph(world_name)
+        titles = {a.title for a in articles}
+        missing_nodes = [a.title for a in articles if not graph.has_node(a.title)]
+        missing_edges = [
+            [a.title, e["name"]]
+            for a in articles
+            for e in related_entities(a)
+            if not graph.has_edge(a.title, e["name"])
+        ]
+        # Reported only: they may carry timeline data worth keeping
+        orphaned = sorted(
+            node
+            for node, data in graph.nodes(data=True)
+            if data.get("type") == "Article" and node not in titles
+        )
+        return {
+            "nodes": graph.number_of_nodes(),
+            "edges": graph.number_of_edges(),
+            "missing_nodes": missing_nodes,
+            "missing_edges": missing_edges,
+            "orphaned": orphaned,
+            "consistent": not (missing_nodes or missing_edges),
+        }
+
+    def _report(self, world_name: str, articles, rag: Dict, graph: Dict) -> Dict:
+        return {
+            "world": world_name,
+            "articles": len(articles),
+            "consistent": rag["consistent"] and graph["consistent"],
+            "rag": rag,
+            "graph": graph,
+        }
+
+    def verify(self, world_name: str) -> Dict:
+        articles = self.load_articles(world_name)
+        return self._report(
+            world_name,
+            articles,
+            self.verify_rag(world_name, articles),
+            self.verify_graph(world_name, articles),
+        )
+
+    async def verify_async(self, world_name: str) -> Dict:
+        """verify() for the event loop: database and RAG reads run in a worker thread."""
+        articles = await asyncio.to_thread(self.load_articles, world_name)
+        rag = await asyncio.to_thread(self.verify_rag, world_name, articles)
+        return self._report(
+            world_name, articles, rag, self.verify_graph(world_name, articles)
+        )
+
+    # --- Rebuilding ---
+
+    def _progress(self, world_name: str, index: str, done: int, total: int):
+        job = self.jobs[world_name]
+        job.update(index=index, done=done, total=total)
+        if job.get("on_progress"):
+            job["on_progress"](world_name, index, done, total)
+
+    def rebuild_rag(
+        self, world_name: str, articles: List[Article], full: bool = False
+    ) -> Dict:
+        """Re-embeds missing and stale articles (all of them with `full`) in batches."""
+        indexed = rag_service.indexed_documents(world_name)
+        todo = [a for a in articles if full or indexed.get(str(a.id)) != a.content]
+        ids = {str(a.id) for a in articles}
+        orphaned = sorted(id for id in indexed if id not in ids)
+
+        self._progress(world_name, "rag", 0, len(todo))
+        for start in range(0, len(todo), self.batch_size):
+            batch = todo[start : start + self.batch_size]
+            rag_service.upsert_articles(
+                world_name, [(a.id, a.title, a.content) for a in batch]
+            )
+            self._progress(world_name, "rag", start + len(batch), len(todo))
+        rag_service.delete_articles(world_name, orphaned)
+        return {"embedded": len(todo), "removed": len(orphaned)}
+
+    def repair_graph(self, world_name: str, articles: List[Article]) -> Dict:
+        """Adds missing article nodes, related entities and relations, saving once."""
+        graph = graph_service.get_graph(world_name)
+        nodes = edges = 0
+        for article in articles:
+            if not graph.has_node(article.title):
+                graph.add_node(article.title, type="Article")
+                nodes += 1
+            for entity in related_entities(article):
+                if not graph.has_node(entity["name"]):
+                    graph.add_node(entity["name"], type=entity.get("type", "Concept"))
+                    nodes += 1
+                if not graph.has_edge(article.title, entity["name"]):
+                    graph.add_edge(
+                        article.title,
+                        entity["name"],
+                        relation=entity.get("relation", "related to"),
+                    )
+                    edges += 1
+        if nodes or edges:
+            graph_service.save_graph(world_name)
+        return {"nodes_added": nodes, "edges_added": edges}
+
+    def rebuild_graph(self, world_name: str, articles: List[Article]) -> Dict:
+        self._progress(world_name, "graph", 0, len(articles))
+        result = self.repair_graph(world_name, articles)
+        self._progress(world_name, "graph", len(articles), len(articles))
+        return result
+
+    def _start_job(self, world_name: str, indexes, full: bool, on_progress=None):
+        self.jobs[world_name] = {
+            "status": "running",
+            "indexes": list(indexes),
+            "full": full,
+            "index": None,
+            "done": 0,
+            "total": 0,
+            "started": time.time(),
+            "seconds": None,
+            "result": {},
+            "error": None,
+            "on_progress": on_progress,
+        }
+        return self.jobs[world_name]
+
+    def _finish_job(self, job: Dict, error: Optional[Exception] = None):
+        job["seconds"] = round(time.time() - job["started"], 3)
+        job["status"] = "failed" if error else "done"
+        job["error"] = str(error) if error else None
+        job["on_progress"] = None
+
+    def rebuild(
+        self,
+        world_name: str,
+        indexes=INDEXES,
+        full: bool = False,
+        on_progress: Callable = None,
+    ) -> Dict:
+        """Repairs the given indexes of a world in the calling thread."""
+        job = self._start_job(world_name, indexes, full, on_progress)
+        try:
+            articles = self.load_articles(world_name)
+            if "rag" in indexes:
+                job["result"]["rag"] = self.rebuild_rag(world_name, articles, full)
+            if "graph" in indexes:
+                job["result"]["graph"] = self.rebuild_graph(world_name, articles)
+        except Exception as e:
+            self._finish_job(job, e)
+            raise
+        self._finish_job(job)
+        return job["result"]
+
+    def rebuild_worlds(
+        self,
+        worlds: List[str],
+        indexes=INDEXES,
+        full: bool = False,
+        on_progress: Callable = None,
+        workers: int = None,
+    ) -> Dict[str, Dict]:
+        """
+        Rebuilds several worlds in parallel threads. Their embedding requests
+        meet in the shared batcher, so the model runs on larger batches.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers or self.workers) as pool:
+            futures = {
+                world: pool.submit(self.rebuild, world, indexes, full, on_progress)
+                for world in worlds
+            }
+            for world, future in futures.items():
+                try:
+                    results[world] = future.result()
+                except Exception as e:
+                    results[world] = {"error": str(e)}
+        return results
+
+    async def _run(self, world_name: str, indexes, full: bool):
+        job = self.jobs[world_name]
+        try:
+            articles = await asyncio.to_thread(self.load_articles, world_name)
+            if "rag" in indexes:
+                job["result"]["rag"] = await asyncio.to_thread(
+                    self.rebuild_rag, world_name, articles, full
+                )
+            if "graph" in indexes:
+                # On the event loop, where every other graph change happens
+                job["result"]["graph"] = self.rebuild_graph(world_name, articles)
+        except Exception as e:
+            print(f"Index rebuild of '{world_name}' failed: {e}")
+            self._finish_job(job, e)
+        else:
+            self._finish_job(job)
+        finally:
+            self._tasks.pop(world_name, None)
+
+    def start_rebuild(self, world_name: str, indexes=INDEXES, full: bool = False):
+        """Starts a background rebuild, unless one is already running for the world."""
+        if world_name not in self._tasks:
+            self._start_job(world_name, indexes, full)
+            self._tasks[world_name] = asyncio.create_task(
+                track_background("index_rebuild", self._run)(world_name, indexes, full)
+            )
+        return self.job_stats(world_name)
+
+    def job_stats(self, world_name: str) -> Optional[Dict]:
+        job = self.jobs.get(world_name)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if k != "on_progress"}
+
+    def stats(self) -> Dict:
+        return {world: self.job_stats(world) for world in list(self.jobs)}
+
+
+index_service = IndexService()
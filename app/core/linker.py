@@ -1,11 +1,30 @@
 import re
+from typing import List, Optional, Set
 from app.core.graph import graph_service
 
 
 class LinkerService:
-    def autolink_content(self, world_name: str, content: str, session) -> str:
+    def find_entities(self, world_name: str, content: str) -> List[str]:
+        """
+        Returns the graph entities that appear in the unlinked parts of `content`,
+        i.e. the titles autolink_content would need existence information for.
+        """
+        graph = graph_service.get_graph(world_name)
+        # Same split as autolink_content: even parts are text, odd parts existing links
+        text = "".join(re.compile(r"(\[.*?\]\(.*?\))").split(content)[::2])
+        return [e for e in graph.nodes() if e in text]
+
+    def autolink_content(
+        self,
+        world_name: str,
+        content: str,
+        session=None,
+        existing_titles: Optional[Set[str]] = None,
+    ) -> str:
         """
         Scans the content and replaces occurrences of known entity names with Markdown links.
+        If `existing_titles` is given it's used for the blue/red link decision instead
+        of querying `session` once per entity.
         """
         graph = graph_service.get_graph(world_name)
         # Get all entity names
@@ -47,7 +66,9 @@ class LinkerService:
             if i % 2 == 0:  # It's text
                 # Apply linking
                 processed_parts.append(
-                    self._link_text_chunk(part, entities, world_name, session)
+                    self._link_text_chunk(
+                        part, entities, world_name, session, existing_titles
+                    )
                 )
             else:  # It's a link, keep as is
                 processed_parts.append(part)
@@ -55,7 +76,12 @@ class LinkerService:
         return "".join(processed_parts)
 
     def _link_text_chunk(
-        self, text: str, entities: list, world_name: str, session
+        self,
+        text: str,
+        entities: list,
+        world_name: str,
+        session,
+        existing_titles: Optional[Set[str]] = None,
     ) -> str:
         # We need to be careful not to double link.
         # And we want to match whole words?
@@ -94,7 +120,9 @@ class LinkerService:
         def replace_func(match):
             entity_name = match.group(1)
 
-            if entity_name not in existence_cache:
+            if entity_name not in existence_cache and existing_titles is not None:
+                existence_cache[entity_name] = entity_name in existing_titles
+            elif entity_name not in existence_cache:
                 statement = select(Article).where(Article.title == entity_name)
                 exists = session.exec(statement).first() is not None
                 existence_cache[entity_name] = exists
@@ -1,29 +1,148 @@
-from openai import AsyncOpenAI
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict
 from app.config import get_settings
+from app.core.http_client import provider_http_client, timeout
+from app.core.telemetry import span, record_llm_usage
 from pydantic import BaseModel
 
 settings = get_settings()
 
+# Set for speculative work (see app/core/prefetch.py). Such calls wait at the
+# limiter's background gate so they don't compete with user-facing requests.
+background_call: ContextVar[bool] = ContextVar("background_call", default=False)
+
+
+class RateLimiter:
+    """
+    Shared by every call to the provider: caps how many requests run at once
+    and, optionally, spaces request starts to stay under a per-minute limit.
+    """
+
+    def __init__(self, max_concurrency: int = None, requests_per_minute: int = None):
+        self.max_concurrency = (
+            settings.LLM_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        )
+        self.requests_per_minute = (
+            settings.LLM_REQUESTS_PER_MINUTE
+            if requests_per_minute is None
+            else requests_per_minute
+        )
+        self._semaphore = None
+        self._loop = None
+        self._next_start = 0.0
+        # Awaited before every background call, e.g. "until no foreground work"
+        self.background_gate = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; scripts may call asyncio.run repeatedly
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        if background_call.get() and self.background_gate is not None:
+            await self.background_gate()
+        if self.max_concurrency > 0:
+            async with self._get_semaphore():
+                await self._wait_for_rate()
+                yield
+        else:
+            await self._wait_for_rate()
+            yield
+
+    async def _wait_for_rate(self):
+        if self.requests_per_minute <= 0:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 60.0 / self.requests_per_minute
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+llm_rate_limiter = RateLimiter()
+
 
 class LLMService:
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL
-        )
+        self._client = None
+        self.limiter = llm_rate_limiter
+        self.usage = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        }
+
+    @property
+    def client(self):
+        """
+        The OpenAI SDK client, created on first use: importing `openai`,
+        picking the provider and reading the key (possibly from the keyring)
+        would slow down startup.
+        """
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            # AI_PROVIDER="auto" is resolved here, see Settings.resolve_provider
+            settings.resolve_provider()
+            self._client = AsyncOpenAI(
+                api_key=settings.provider_api_key(),
+                base_url=settings.OPENAI_BASE_URL,
+                http_client=provider_http_client(),
+                timeout=timeout(settings.LLM_TIMEOUT_SECONDS),
+            )
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def record_usage(self, response, model: str = None):
+        """
+        Adds a response's token usage to the process-wide counters and to the
+        current telemetry span.
+        """
+        record_llm_usage(response, model)
+        self.usage["requests"] += 1
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            self.usage[key] += getattr(usage, key, None) or 0
+
+    def usage_stats(self) -> Dict[str, int]:
+        return dict(self.usage)
+
+    @staticmethod
+    def _request_options(timeout_seconds: float = None) -> Dict:
+        """Per-call overrides, e.g. a short timeout for quick checks."""
+        return {"timeout": timeout(timeout_seconds)} if timeout_seconds else {}
 
     async def generate_text(
         self,
         prompt: str,
         model: str = "grok-4-1-fast-reasoning-latest",
         system_prompt: str = "You are a helpful assistant.",
+        timeout_seconds: float = None,
     ) -> str:
-        response = await self.client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-        )
+        with span("llm.generate_text", model=model):
+            async with self.limiter.slot():
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt},
+                    ],
+                    **self._request_options(timeout_seconds),
+                )
+            self.record_usage(response, model)
         return response.choices[0].message.content
 
     async def generate_json(
@@ -32,15 +151,20 @@ class LLMService:
         schema: BaseModel,
         model: str = "grok-4-1fast-reasoning-latest",
         system_prompt: str = "You are a helpful assistant.",
+        timeout_seconds: float = None,
     ) -> str:
-        response = await self.client.beta.chat.completions.parse(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-            response_format=schema,
-        )
+        with span("llm.generate_json", model=model, schema=schema.__name__):
+            async with self.limiter.slot():
+                response = await self.client.beta.chat.completions.parse(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt},
+                    ],
+                    response_format=schema,
+                    **self._request_options(timeout_seconds),
+                )
+            self.record_usage(response, model)
         return response.choices[0].message.parsed
 
 
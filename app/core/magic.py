@@ -48,6 +48,8 @@ class MagicService:
         5. A Seed Article Description: A short paragraph describing what this first article should cover.
         """
 
+        # The provider's default models, picked on first use
+        settings.resolve_provider()
         response = await llm_service.generate_json(
             user_prompt,
             schema=MagicConfigResponse,
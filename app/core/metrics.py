@@ -0,0 +1,147 @@
+import threading
+from typing import Callable, Dict, Optional
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.exposition import CONTENT_TYPE_PLAIN_0_0_4
+
+# Media type of render()
+CONTENT_TYPE = CONTENT_TYPE_PLAIN_0_0_4
+
+# Seconds; covers everything from a cache hit to a slow multi-call generation
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# Every counter and histogram would otherwise export a *_created series
+prometheus_client.disable_created_metrics()
+
+
+class Metric:
+    """
+    A prometheus_client metric on the wiki's own registry. Labels are passed
+    as keyword arguments, and recorded values can be read back by label.
+    """
+
+    metric_class: type
+
+    def __init__(
+        self,
+        registry: CollectorRegistry,
+        name: str,
+        help: str,
+        labelnames=(),
+        **kwargs,
+    ):
+        self.name = name
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._metric = self.metric_class(
+            name, help, self.labelnames, registry=registry, **kwargs
+        )
+
+    def _child(self, labels: Dict):
+        # Raises ValueError when the labels don't match labelnames
+        return self._metric.labels(**labels) if labels else self._metric
+
+    def _sample(self, suffix: str, labels: Dict) -> float:
+        labels = {name: str(value) for name, value in labels.items()}
+        value = self._registry.get_sample_value(self.name + suffix, labels)
+        return value or 0
+
+
+class Counter(Metric):
+    metric_class = prometheus_client.Counter
+
+    def inc(self, amount: float = 1, **labels):
+        self._child(labels).inc(amount)
+
+    def value(self, **labels) -> float:
+        return self._sample("_total", labels)
+
+
+class Gauge(Metric):
+    metric_class = prometheus_client.Gauge
+
+    def set(self, value: float, **labels):
+        self._child(labels).set(value)
+
+    def inc(self, amount: float = 1, **labels):
+        self._child(labels).inc(amount)
+
+    def dec(self, amount: float = 1, **labels):
+        self._child(labels).dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Computes the value of an unlabelled gauge at scrape time."""
+        self._metric.set_function(function)
+
+    def value(self, **labels) -> float:
+        return self._sample("", labels)
+
+
+class Histogram(Metric):
+    metric_class = prometheus_client.Histogram
+
+    def observe(self, value: float, **labels):
+        self._child(labels).observe(value)
+
+    def count(self, **labels) -> int:
+        return int(self._sample("_count", labels))
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format at /metrics.
+    Metrics are created on first use, so modules can declare what they record
+    without caring about import order.
+    """
+
+    def __init__(self):
+        self._registry = CollectorRegistry()
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(
+                    self._registry, name, help, labelnames, **kwargs
+                )
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric '{name}' already registered differently")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return generate_latest(self._registry).decode()
+
+
+metrics_registry = MetricsRegistry()
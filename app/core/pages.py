@@ -0,0 +1,133 @@
+import os
+import re
+import json
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.graph import graph_service
+from app.core.linker import linker_service
+from app.core.residency import residency_manager
+from app.core.timeline import timeline_service
+from app.core.world import world_manager
+from app.models.article import Article
+
+
+def existence_candidates(world_name: str, article: Article) -> Set[str]:
+    """Titles whose existence decides how the article page links to them."""
+    candidates = set(linker_service.find_entities(world_name, article.content))
+    candidates.update(e["name"] for e in json.loads(article.related_entities_json))
+    return candidates
+
+
+def render_article_content(
+    world_name: str, article: Article, existing_titles: Set[str]
+) -> Tuple[str, List[Dict]]:
+    """
+    Returns the article body as HTML (auto-linked, red links for missing
+    articles) and its related entities annotated with `exists`.
+    """
+    import markdown
+
+    linked_content = linker_service.autolink_content(
+        world_name, article.content, existing_titles=existing_titles
+    )
+
+    # Convert Markdown to HTML (allow raw HTML for red links)
+    html_content = markdown.markdown(linked_content, extensions=["extra"])
+
+    related = json.loads(article.related_entities_json)
+    for entity in related:
+        entity["exists"] = entity["name"] in existing_titles
+    return html_content, related
+
+
+def graph_data(world_name: str) -> Dict:
+    import networkx as nx
+
+    graph = graph_service.get_graph(world_name)
+    return nx.node_link_data(graph)
+
+
+def timeline_data(world_name: str) -> List[Dict]:
+    events = timeline_service.get_context_events(world_name)
+    return [
+        {
+            "id": e["name"],
+            "name": e["name"],
+            "content": e["name"],
+            "year_numeric": e["year_numeric"],
+            "display_date": e["display_date"],
+            "description": e["description"],
+            "type": e.get("type", "Unknown"),
+        }
+        for e in events
+    ]
+
+
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def search_shard_key(token: str) -> str:
+    """Shard name for a token: its first letter/digit, "_" for anything else."""
+    first = token[0]
+    return first if first.isascii() and first.isalnum() else "_"
+
+
+def search_index(articles: Iterable[Tuple[str, str]]) -> Dict[str, Dict]:
+    """
+    Builds the client-side search index from (title, summary) pairs.
+
+    Returns {"index": {"docs": [[title, summary], ...], "shards": [...]},
+    "<letter>": {token: [doc ids]}, ...}: the browser loads "index" once and
+    only fetches the shard of the letter a query word starts with.
+    """
+    docs = []
+    shards: Dict[str, Dict[str, List[int]]] = {}
+    for doc_id, (title, summary) in enumerate(sorted(articles)):
+        summary = summary or ""
+        docs.append([title, summary[:150]])
+        tokens = set(SEARCH_TOKEN_PATTERN.findall(f"{title} {summary}".lower()))
+        for token in sorted(tokens):
+            shard = shards.setdefault(search_shard_key(token), {})
+            shard.setdefault(token, []).append(doc_id)
+
+    files = {"index": {"docs": docs, "shards": sorted(shards)}}
+    files.update(shards)
+    return files
+
+
+# world_name -> (database signature, search index files)
+_search_index_cache: Dict[str, Tuple[Tuple, Dict[str, Dict]]] = {}
+residency_manager.register(
+    "search", lambda world_name: _search_index_cache.pop(world_name, None)
+)
+
+
+def database_signature(world_name: str) -> Tuple:
+    """
+    (mtime_ns, size) of the world's database and its WAL: every commit
+    changes one of them, so data derived from the articles can be cached
+    against it.
+    """
+    path = os.path.join(world_manager.get_world_path(world_name), "database.db")
+    signature = []
+    for name in (path, path + "-wal"):
+        try:
+            stat = os.stat(name)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def cached_search_index(world_name: str, signature: Tuple) -> Optional[Dict[str, Dict]]:
+    """The world's search index files if they were built at `signature`."""
+    cached = _search_index_cache.get(world_name)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    return None
+
+
+def cache_search_index(world_name: str, signature: Tuple, files: Dict[str, Dict]):
+    # `signature` is taken before the articles are read: a commit in between
+    # only makes the next request rebuild
+    _search_index_cache[world_name] = (signature, files)
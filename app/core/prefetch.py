@@ -0,0 +1,279 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.config import get_settings
+from app.core.graph import graph_service
+from app.core.llm import background_call, llm_rate_limiter
+from app.core.metrics import metrics_registry
+from app.core.telemetry import track_background
+
+settings = get_settings()
+
+BUDGET_WINDOW_SECONDS = 3600.0
+# Requests that neither read nor generate content: probes, stats, assets
+NON_CONTENT_PATHS = ("/static/", "/api/system/", "/metrics", "/health", "/ready")
+
+
+class ForegroundHold:
+    """One request's share of the foreground work prefetching yields to."""
+
+    def __init__(self, service: "PrefetchService"):
+        self.service = service
+        self.held = False
+
+    def acquire(self):
+        if not self.held:
+            self.held = True
+            self.service._enter_foreground()
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.service._exit_foreground()
+
+
+# The hold of the request being handled
+current_hold: ContextVar[Optional[ForegroundHold]] = ContextVar(
+    "foreground_hold", default=None
+)
+
+
+class PrefetchService:
+    """
+    Speculatively generates the articles a reader is likely to open next: the
+    unresolved related entities of the article they are viewing, best
+    connected (graph degree) first. Generations run one at a time, only while
+    no foreground generation is running, and within a per-world hourly budget.
+    A page request for an article that is being prefetched waits for that
+    generation instead of starting a second one.
+    """
+
+    def __init__(
+        self, enabled: bool = None, top_k: int = None, budget_per_hour: int = None
+    ):
+        self.enabled = settings.PREFETCH_ENABLED if enabled is None else enabled
+        self.top_k = settings.PREFETCH_TOP_K if top_k is None else top_k
+        self.budget_per_hour = (
+            settings.PREFETCH_BUDGET_PER_HOUR
+            if budget_per_hour is None
+            else budget_per_hour
+        )
+
+        self._queue = deque()
+        self._running: Dict[tuple, asyncio.Task] = {}
+        self._history: Dict[str, deque] = {}
+        self._foreground = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+        self.generated = 0
+        self.failed = 0
+
+        llm_rate_limiter.background_gate = self.wait_until_idle
+
+    def _bind_loop(self):
+        # Tasks and events belong to one event loop (tests create several)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = asyncio.Event()
+            if self._foreground == 0:
+                self._idle.set()
+            self._queue.clear()
+            self._running.clear()
+            self._worker = None
+
+    # --- Foreground coordination ---
+
+    @asynccontextmanager
+    async def foreground(self):
+        """Wrap user-facing work: prefetching pauses while it runs."""
+        hold = ForegroundHold(self)
+        hold.acquire()
+        token = current_hold.set(hold)
+        try:
+            yield
+        finally:
+            current_hold.reset(token)
+            hold.release()
+
+    def _enter_foreground(self):
+        self._bind_loop()
+        self._foreground += 1
+        self._idle.clear()
+
+    def _exit_foreground(self):
+        self._foreground -= 1
+        if self._foreground == 0:
+            self._idle.set()
+
+    async def wait_until_idle(self):
+        self._bind_loop()
+        await self._idle.wait()
+
+    async def wait_for(self, world_name: str, title: str) -> bool:
+        """
+        Called before generating `title` in the foreground. A queued prefetch is
+        dropped (the caller generates it now); a running one is awaited.
+        Returns True if a prefetch of the article just finished.
+        """
+        self._bind_loop()
+        key = (world_name, title)
+        if key in self._queue:
+            self._queue.remove(key)
+            return False
+        task = self._running.get(key)
+        if task is None:
+            return False
+        # The prefetch's LLM calls wait for the foreground, so this request
+        # mustn't count as foreground while it waits for them
+        hold = current_hold.get()
+        if hold is not None:
+            hold.release()
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            return False
+        finally:
+            if hold is not None:
+                hold.acquire()
+        return True
+
+    # --- Scheduling ---
+
+    def _budget_left(self, world_name: str) -> int:
+        history = self._history.setdefault(world_name, deque())
+        cutoff = time.monotonic() - BUDGET_WINDOW_SECONDS
+        while history and history[0] < cutoff:
+            history.popleft()
+        return self.budget_per_hour - len(history)
+
+    def candidates(self, world_name: str, related: List[Dict]) -> List[str]:
+        """Unresolved related entities, ranked by graph degree."""
+        graph = graph_service.get_graph(world_name)
+        names = {
+            entity["name"]
+            for entity in related
+            if not entity.get("exists") and entity.get("name")
+        }
+        return sorted(
+            names,
+            key=lambda n: (-(graph.degree(n) if graph.has_node(n) else 0), n),
+        )
+
+    def schedule(self, world_name: str, related: List[Dict]) -> List[str]:
+        """
+        Queues the top-K unresolved entities of `related` (the related entities
+        of a viewed article, annotated with `exists`). Returns the queued titles.
+        """
+        if not self.enabled or self.top_k <= 0:
+            return []
+        self._bind_loop()
+
+        queued = []
+        for title in self.candidates(world_name, related)[: self.top_k]:
+            key = (world_name, title)
+            if key in self._queue or key in self._running:
+                continue
+            if self._budget_left(world_name) <= 0:
+                break
+            self._history[world_name].append(time.monotonic())
+            self._queue.append(key)
+            queued.append(title)
+
+        if self._queue and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        return queued
+
+    async def _run(self):
+        try:
+            while self._queue:
+                await self._idle.wait()
+                if not self._queue:
+                    break
+                key = self._queue.popleft()
+                task = asyncio.create_task(
+                    track_background("prefetch", self._generate)(*key)
+                )
+                self._running[key] = task
+                try:
+                    await task
+                    self.generated += 1
+                except Exception as e:
+                    print(f"Prefetch of '{key[1]}' failed: {e}")
+                    self.failed += 1
+                finally:
+                    self._running.pop(key, None)
+        finally:
+            self._worker = None
+
+    async def _generate(self, world_name: str, title: str):
+        from app.core.generator import generator_service
+        from app.database import get_session
+
+        background_call.set(True)
+        print(f"Prefetching '{title}' in world '{world_name}'...")
+        session = next(get_session(world_name))
+        try:
+            await generator_service.generate_article(world_name, title, session)
+        finally:
+            session.close()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "queued": [list(key) for key in self._queue],
+            "running": [list(key) for key in self._running],
+            "foreground": self._foreground,
+            "generated": self.generated,
+            "failed": self.failed,
+            "budget_left": {
+                world: self._budget_left(world) for world in list(self._history)
+            },
+        }
+
+
+prefetch_service = PrefetchService()
+
+
+class ForegroundMiddleware:
+    """
+    Makes every user-facing request foreground work, so prefetching pauses
+    until its response is sent. Plain ASGI like RequestMetricsMiddleware;
+    background tasks that run after the response don't hold prefetching up.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(NON_CONTENT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        hold = ForegroundHold(prefetch_service)
+        hold.acquire()
+        token = current_hold.set(hold)
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.pathsend" or (
+                message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+            ):
+                hold.release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_hold.reset(token)
+            hold.release()
+
+
+metrics_registry.gauge(
+    "wiki_prefetch_queue_length", "Speculative generations waiting to run."
+).set_function(lambda: len(prefetch_service._queue))
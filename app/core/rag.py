@@ -1,39 +1,231 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List
+import re
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.config import get_settings
 from app.core.world import world_manager
+from app.core.residency import residency_manager
+from app.core.telemetry import span
+
+settings = get_settings()
+
+
+# Collection of a world in its own chroma_db folder
+COLLECTION_NAME = "wiki_articles"
+
+
+def collection_name(world_name: str) -> str:
+    """
+    A world's collection in the shared store, within Chroma's naming rules
+    (letters, digits, "_" and "-"). Names that had characters replaced or
+    cut off get a hash suffix, so different worlds never share a collection.
+    """
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", world_name)[:400]
+    name = f"{COLLECTION_NAME}_{safe}"
+    if safe != world_name or not name[-1].isalnum():
+        name += "_" + hashlib.sha1(world_name.encode("utf-8")).hexdigest()[:8]
+    return name
 
 
 class RAGService:
-    def __init__(self):
+    """
+    Article embeddings for retrieval, in Chroma (RAG_BACKEND="chroma") or in a
+    memory-mapped NumPy vector store per world (RAG_BACKEND="numpy", see
+    app/core/vector_store.py).
+
+    Chroma storage is either per world (CHROMA_STORAGE="per_world": a client
+    and "wiki_articles" collection in each world's chroma_db folder) or
+    shared (one client over WORLD_DATA_DIR/_chroma hosting a
+    "wiki_articles_<world>" collection per world). Collection handles are
+    cached per world until the world is evicted.
+    """
+
+    def __init__(self, storage: str = None, backend: str = None):
+        self.storage = settings.CHROMA_STORAGE if storage is None else storage
+        self.backend = settings.RAG_BACKEND if backend is None else backend
+        # World name -> client, or None -> the shared client
         self._clients = {}
+        self._collections = {}
+        self._stores = {}
+        # RAG calls run in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+        residency_manager.register("chroma", self.close_client)
+
+    @property
+    def shared(self) -> bool:
+        return self.storage == "shared"
+
+    def _client(self, world_name: Optional[str]):
+        with self._lock:
+            if world_name not in self._clients:
+                # Imported on first use, chromadb alone takes ~0.5s to import
+                import chromadb
+
+                if world_name is None:
+                    path = world_manager.get_shared_chroma_path()
+                else:
+                    path = world_manager.get_paths(world_name)["chroma"]
+                self._clients[world_name] = chromadb.PersistentClient(path=path)
+            return self._clients[world_name]
+
+    def shared_client(self):
+        return self._client(None)
 
     def get_client(self, world_name: str):
-        if world_name not in self._clients:
-            path = world_manager.get_paths(world_name)["chroma"]
-            self._clients[world_name] = chromadb.PersistentClient(path=path)
-        return self._clients[world_name]
+        client = self._client(None if self.shared else world_name)
+        residency_manager.touch(world_name)
+        return client
+
+    def close_client(self, world_name: str):
+        """
+        Drops a world's collection handle and, with per-world storage, releases
+        its Chroma client (HNSW index, SQLite handles). The shared client stays
+        open; it keeps a bounded LRU cache of HNSW indexes itself. Unmaps the
+        world's vector store.
+        """
+        self._collections.pop(world_name, None)
+        store = self._stores.pop(world_name, None)
+        if store is not None:
+            store.close()
+        with self._lock:
+            client = self._clients.pop(world_name, None)
+        if client is not None:
+            # Chroma caches one System per path for the whole process and its
+            # clients have no close(); dropping the client alone frees nothing
+            from chromadb.api.shared_system_client import SharedSystemClient
+
+            system = SharedSystemClient._identifier_to_system.pop(
+                client._identifier, None
+            )
+            if system is not None:
+                system.stop()
+
+    def embedding_function(self):
+        """
+        The function collections embed documents and queries with: one
+        process-wide batcher, so the model is loaded once and concurrent
+        requests from all worlds share batches.
+        """
+        from app.core.embeddings import embedding_service
+
+        return embedding_service()
 
     def get_collection(self, world_name: str):
+        collection = self._collections.get(world_name)
+        if collection is not None:
+            residency_manager.touch(world_name)
+            return collection
         client = self.get_client(world_name)
-        return client.get_or_create_collection(name="wiki_articles")
+        collection = client.get_or_create_collection(
+            name=collection_name(world_name) if self.shared else COLLECTION_NAME,
+            embedding_function=self.embedding_function(),
+        )
+        with self._lock:
+            return self._collections.setdefault(world_name, collection)
+
+    def get_vector_store(self, world_name: str):
+        with self._lock:
+            store = self._stores.get(world_name)
+            if store is None:
+                from app.core.vector_store import VectorStore
+
+                store = VectorStore(world_manager.get_paths(world_name)["vectors"])
+                self._stores[world_name] = store
+        residency_manager.touch(world_name)
+        return store
+
+    def warm(self, world_name: str):
+        """Loads a world's index, so its first query doesn't wait for it."""
+        if self.backend == "numpy":
+            self.get_vector_store(world_name).warm()
+            return
+        collection = self.get_collection(world_name)
+        if collection.count():
+            # Queries load the HNSW index into memory
+            collection.query(query_texts=["warm-up"], n_results=1)
 
     def add_article(self, world_name: str, title: str, content: str, article_id: int):
+        if self.backend == "numpy":
+            store = self.get_vector_store(world_name)
+            with span("vectors.add"):
+                store.upsert(
+                    [str(article_id)],
+                    self.embedding_function()([content]),
+                    [{"title": title, "id": article_id}],
+                    [content],
+                )
+            return
         collection = self.get_collection(world_name)
-        collection.add(
-            documents=[content],
-            metadatas=[{"title": title, "id": article_id}],
-            ids=[str(article_id)],
-        )
+        # Upsert: articles are re-added after edits and integrations
+        with span("chroma.add"):
+            collection.upsert(
+                documents=[content],
+                metadatas=[{"title": title, "id": article_id}],
+                ids=[str(article_id)],
+            )
 
     def query_context(
         self, world_name: str, query: str, n_results: int = 3
     ) -> List[str]:
+        if self.backend == "numpy":
+            store = self.get_vector_store(world_name)
+            with span("vectors.query"):
+                embedding = self.embedding_function().embed_query([query])[0]
+                return store.query(embedding, n_results)["documents"]
         collection = self.get_collection(world_name)
-        results = collection.query(query_texts=[query], n_results=n_results)
+        with span("chroma.query"):
+            results = collection.query(query_texts=[query], n_results=n_results)
         if results["documents"]:
             return results["documents"][0]
         return []
 
+    # --- Bulk maintenance (see app/core/indexes.py) ---
+
+    def indexed_documents(
+        self, world_name: str, page_size: int = 500
+    ) -> Dict[str, str]:
+        """Id -> stored document of everything in the world's index."""
+        if self.backend == "numpy":
+            store = self.get_vector_store(world_name)
+            return dict(zip(store.ids, store.documents))
+        collection = self.get_collection(world_name)
+        documents = {}
+        for offset in range(0, collection.count(), page_size):
+            page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            documents.update(zip(page["ids"], page["documents"]))
+        return documents
+
+    def upsert_articles(self, world_name: str, articles: List[Tuple[int, str, str]]):
+        """Embeds (id, title, content) tuples in one batch and adds or replaces them."""
+        if not articles:
+            return
+        ids = [str(article_id) for article_id, _, _ in articles]
+        metadatas = [
+            {"title": title, "id": article_id} for article_id, title, _ in articles
+        ]
+        documents = [content for _, _, content in articles]
+        embeddings = self.embedding_function()(documents)
+        if self.backend == "numpy":
+            with span("vectors.upsert", articles=len(articles)):
+                self.get_vector_store(world_name).upsert(
+                    ids, embeddings, metadatas, documents
+                )
+            return
+        with span("chroma.upsert", articles=len(articles)):
+            self.get_collection(world_name).upsert(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings,
+            )
+
+    def delete_articles(self, world_name: str, ids: List[str]):
+        if not ids:
+            return
+        if self.backend == "numpy":
+            self.get_vector_store(world_name).delete(ids)
+        else:
+            self.get_collection(world_name).delete(ids=ids)
+
 
 rag_service = RAGService()
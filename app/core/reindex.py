@@ -0,0 +1,173 @@
+import time
+import asyncio
+from typing import Dict, List, Optional
+
+from sqlmodel import select
+
+from app.config import get_settings
+from app.core.indexes import index_service
+from app.core.metrics import metrics_registry
+from app.core.rag import rag_service
+from app.core.telemetry import track_background
+from app.models.article import Article
+
+settings = get_settings()
+
+
+class ReindexQueue:
+    """
+    Brings the derived state of changed articles up to date: their RAG entry
+    (re-embedded and upserted) and their graph node and related-entity
+    relations. Pages are rendered per request and link against the graph,
+    so that is all there is to refresh.
+
+    `enqueue` returns right away. An article enqueued again before it is
+    processed counts once. A world's pending articles are reindexed together,
+    in one embedding batch, once the world has had no edit for
+    `debounce_seconds`, or `max_delay_seconds` after its first pending edit.
+    Without a running event loop (scripts) the article is reindexed inline.
+    Edits still pending when the process dies are picked up by
+    scripts/rebuild_indexes.py.
+    """
+
+    def __init__(self, debounce_seconds: float = None, max_delay_seconds: float = None):
+        self.debounce = (
+            settings.REINDEX_DEBOUNCE_SECONDS
+            if debounce_seconds is None
+            else debounce_seconds
+        )
+        self.max_delay = (
+            settings.REINDEX_MAX_DELAY_SECONDS
+            if max_delay_seconds is None
+            else max_delay_seconds
+        )
+        # World -> {"ids": set of article ids, "first": time, "last": time}
+        self._pending: Dict[str, Dict] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.reindexed = 0
+        self.batches = 0
+        self.failed = 0
+
+    def enqueue(self, world_name: str, article_id: int):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.reindex(world_name, [article_id])
+            return
+
+        self.enqueued += 1
+        now = time.monotonic()
+        pending = self._pending.setdefault(
+            world_name, {"ids": set(), "first": now, "last": now}
+        )
+        if article_id in pending["ids"]:
+            self.coalesced += 1
+        pending["ids"].add(article_id)
+        pending["last"] = now
+
+        # Tasks belong to one event loop (tests create several)
+        if self._worker is None or self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._worker = asyncio.create_task(track_background("reindex", self._run)())
+
+    def _due_at(self, pending: Dict) -> float:
+        return min(pending["last"] + self.debounce, pending["first"] + self.max_delay)
+
+    async def _run(self):
+        while self._pending:
+            now = time.monotonic()
+            due = [w for w, p in self._pending.items() if self._due_at(p) <= now]
+            for world_name in due:
+                ids = self._pending.pop(world_name)["ids"]
+                await self._reindex_async(world_name, sorted(ids))
+            if self._pending:
+                # Later edits only push a world's due time back
+                next_due = min(self._due_at(p) for p in self._pending.values())
+                await asyncio.sleep(max(0.0, next_due - time.monotonic()))
+
+    async def flush(self):
+        """Reindexes everything pending now (e.g. before shutdown)."""
+        while self._pending:
+            world_name, pending = self._pending.popitem()
+            await self._reindex_async(world_name, sorted(pending["ids"]))
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        await self.flush()
+
+    # --- Reindexing ---
+
+    def _load(self, world_name: str, article_ids: List[int]) -> List[Article]:
+        from app.database import get_session
+
+        session = next(get_session(world_name))
+        try:
+            statement = select(Article).where(Article.id.in_(article_ids))
+            return list(session.exec(statement).all())
+        finally:
+            session.close()
+
+    def _update_rag(self, world_name: str, article_ids: List[int]) -> List[Article]:
+        articles = self._load(world_name, article_ids)
+        rag_service.upsert_articles(
+            world_name, [(a.id, a.title, a.content) for a in articles]
+        )
+        # Ids without a row left: the article is gone
+        found = {a.id for a in articles}
+        rag_service.delete_articles(
+            world_name, [str(id) for id in article_ids if id not in found]
+        )
+        return articles
+
+    def _finished(self, articles: List[Article]):
+        self.reindexed += len(articles)
+        self.batches += 1
+
+    def reindex(self, world_name: str, article_ids: List[int]):
+        """Reindexes articles in the calling thread."""
+        try:
+            articles = self._update_rag(world_name, article_ids)
+            index_service.repair_graph(world_name, articles)
+        except Exception as e:
+            print(f"Reindexing articles {article_ids} of '{world_name}' failed: {e}")
+            self.failed += len(article_ids)
+            return
+        self._finished(articles)
+
+    async def _reindex_async(self, world_name: str, article_ids: List[int]):
+        try:
+            articles = await asyncio.to_thread(
+                self._update_rag, world_name, article_ids
+            )
+            # On the event loop, where every other graph change happens
+            index_service.repair_graph(world_name, articles)
+        except Exception as e:
+            print(f"Reindexing articles {article_ids} of '{world_name}' failed: {e}")
+            self.failed += len(article_ids)
+            return
+        self._finished(articles)
+
+    def pending(self) -> int:
+        return sum(len(p["ids"]) for p in self._pending.values())
+
+    def stats(self) -> Dict:
+        return {
+            "pending": {w: sorted(p["ids"]) for w, p in self._pending.items()},
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "reindexed": self.reindexed,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+
+reindex_queue = ReindexQueue()
+
+metrics_registry.gauge(
+    "wiki_reindex_queue_length", "Edited articles waiting to be reindexed."
+).set_function(reindex_queue.pending)
@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.core.metrics import metrics_registry
+
+settings = get_settings()
+
+# Once evicting stops lowering the RSS, the budget counts as exceeded again
+# only after the RSS grows this fraction of the budget past that level
+RSS_REGROWTH_FRACTION = 0.05
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None if the platform doesn't expose it."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class WorldResidencyManager:
+    """
+    Keeps track of which worlds currently hold in-memory resources
+    (SQLite engines, Chroma clients, graphs) and evicts the least recently
+    used ones when the configured limits are exceeded.
+
+    Services register an unload callback and call `touch(world_name)` whenever
+    they hand out a per-world resource. Evicted worlds are reloaded lazily by
+    the services on their next access.
+    """
+
+    def __init__(
+        self,
+        max_resident_worlds: int = None,
+        memory_budget_mb: int = None,
+        min_idle_seconds: float = None,
+    ):
+        self.max_resident_worlds = (
+            max_resident_worlds
+            if max_resident_worlds is not None
+            else settings.MAX_RESIDENT_WORLDS
+        )
+        self.memory_budget_mb = (
+            memory_budget_mb
+            if memory_budget_mb is not None
+            else settings.RESIDENT_MEMORY_BUDGET_MB
+        )
+        self.min_idle_seconds = (
+            min_idle_seconds
+            if min_idle_seconds is not None
+            else settings.RESIDENT_MIN_IDLE_SECONDS
+        )
+
+        self._lock = threading.RLock()
+        # world_name -> last access timestamp, ordered from least to most recently used
+        self._resident: "OrderedDict[str, float]" = OrderedDict()
+        self._unloaders: Dict[str, Callable[[str], None]] = {}
+        self._loads = 0
+        self._evictions = 0
+        # RSS after the last eviction that didn't lower it
+        self._rss_floor: Optional[int] = None
+
+    def register(self, resource: str, unload: Callable[[str], None]):
+        """Registers a callback that releases `resource` for a given world."""
+        with self._lock:
+            self._unloaders[resource] = unload
+
+    def touch(self, world_name: str):
+        """Marks a world as used right now, loading it into the residency set if needed."""
+        with self._lock:
+            newly_loaded = world_name not in self._resident
+            if newly_loaded:
+                self._loads += 1
+            else:
+                self._resident.move_to_end(world_name)
+            self._resident[world_name] = time.monotonic()
+            over_count = (
+                self.max_resident_worlds
+                and len(self._resident) > self.max_resident_worlds
+            )
+
+        # Memory only grows noticeably when a world is (re)loaded, so that's the
+        # main point where it's worth checking. Worlds that were too busy to evict
+        # earlier are retried on later accesses.
+        if newly_loaded or over_count:
+            self.enforce_limits(protect=world_name)
+
+    def is_resident(self, world_name: str) -> bool:
+        with self._lock:
+            return world_name in self._resident
+
+    def resident_worlds(self) -> List[str]:
+        with self._lock:
+            return list(self._resident.keys())
+
+    def evict(self, world_name: str):
+        """Releases every registered resource held for `world_name`."""
+        with self._lock:
+            if self._resident.pop(world_name, None) is None:
+                return
+            self._evictions += 1
+            unloaders = list(self._unloaders.items())
+
+        print(f"Residency: evicting world '{world_name}'")
+        for resource, unload in unloaders:
+            try:
+                unload(world_name)
+            except Exception as e:
+                print(f"Residency: failed to unload {resource} for '{world_name}': {e}")
+
+    def evict_all(self):
+        for world_name in self.resident_worlds():
+            self.evict(world_name)
+
+    def _over_count(self) -> bool:
+        return bool(
+            self.max_resident_worlds and len(self._resident) > self.max_resident_worlds
+        )
+
+    def _over_memory(self, rss: Optional[int]) -> bool:
+        if not self.memory_budget_mb or rss is None:
+            return False
+        budget = self.memory_budget_mb * 1024 * 1024
+        if self._rss_floor is not None:
+            # The allocator rarely hands freed memory back, so RSS can stay
+            # above the budget with nothing left worth evicting
+            budget = max(budget, self._rss_floor + budget * RSS_REGROWTH_FRACTION)
+        return rss > budget
+
+    def _next_victim(self, protect: Optional[str]) -> Optional[str]:
+        now = time.monotonic()
+        for world_name, last_used in self._resident.items():
+            if world_name == protect:
+                continue
+            # Worlds used very recently are likely mid-request; leave them alone.
+            if now - last_used < self.min_idle_seconds:
+                continue
+            return world_name
+        return None
+
+    def enforce_limits(self, protect: Optional[str] = None):
+        """
+        Evicts idle worlds (least recently used first) until within limits.
+        For the memory budget alone, only as long as evicting lowers the RSS.
+        """
+        while True:
+            rss = _current_rss_bytes()
+            with self._lock:
+                over_count = self._over_count()
+                if not over_count and not self._over_memory(rss):
+                    return
+                victim = self._next_victim(protect)
+            if victim is None:
+                return
+            self.evict(victim)
+            if over_count:
+                continue
+            after = _current_rss_bytes()
+            with self._lock:
+                if after is not None and after >= rss:
+                    self._rss_floor = after
+                    return
+                self._rss_floor = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            rss = _current_rss_bytes()
+            return {
+                "resident_count": len(self._resident),
+                "max_resident_worlds": self.max_resident_worlds,
+                "memory_budget_mb": self.memory_budget_mb,
+                "rss_mb": round(rss / (1024 * 1024), 1) if rss is not None else None,
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "worlds": [
+                    {"name": name, "idle_seconds": round(now - last_used, 1)}
+                    for name, last_used in reversed(self._resident.items())
+                ],
+            }
+
+
+residency_manager = WorldResidencyManager()
+
+metrics_registry.gauge(
+    "wiki_resident_worlds", "Worlds currently holding in-memory resources."
+).set_function(lambda: len(residency_manager.resident_worlds()))
+metrics_registry.gauge(
+    "wiki_process_resident_memory_bytes", "Resident set size of the process."
+).set_function(lambda: _current_rss_bytes() or 0)
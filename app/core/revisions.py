@@ -0,0 +1,156 @@
+import json
+import zlib
+import difflib
+from typing import List, Optional, Tuple
+from sqlmodel import Session, select, func, update
+
+from app.config import get_settings
+from app.models.article import Article, ArticleRevision
+
+settings = get_settings()
+
+
+def _encode_reverse_delta(newer: str, older: str) -> bytes:
+    """
+    Encodes `older` as a list of operations against `newer`:
+    ["c", start, end] copies lines newer[start:end], ["i", [lines]] inserts lines.
+    """
+    newer_lines = newer.splitlines(keepends=True)
+    older_lines = older.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, newer_lines, older_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append(["i", older_lines[j1:j2]])
+        # "delete": lines only present in the newer version are simply not copied
+    return zlib.compress(json.dumps(ops).encode("utf-8"))
+
+
+def _apply_reverse_delta(newer: str, data: bytes) -> str:
+    newer_lines = newer.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(data).decode("utf-8")):
+        if op[0] == "c":
+            parts.extend(newer_lines[op[1] : op[2]])
+        else:
+            parts.extend(op[1])
+    return "".join(parts)
+
+
+class RevisionService:
+    def __init__(self, snapshot_interval: int = None):
+        self.snapshot_interval = max(
+            1, snapshot_interval or settings.REVISION_SNAPSHOT_INTERVAL
+        )
+
+    def latest_revision(self, session: Session, article_id: int) -> int:
+        statement = select(func.max(ArticleRevision.revision)).where(
+            ArticleRevision.article_id == article_id
+        )
+        return session.exec(statement).one() or 0
+
+    def record_update(
+        self,
+        session: Session,
+        article: Article,
+        new_content: str,
+        source: str = "edit",
+        new_summary: Optional[str] = None,
+    ) -> Optional[ArticleRevision]:
+        """
+        Archives the article's current content as a new revision and replaces it
+        with `new_content`. The caller commits the session, which also releases
+        the article's write lock taken here.
+        Returns the stored revision, or None if nothing changed.
+        """
+        # A no-op write locks the article until the caller commits: concurrent
+        # edits then number their revisions one after the other, and each one
+        # archives the content the previous one stored
+        session.exec(
+            update(Article).where(Article.id == article.id).values(id=article.id)
+        )
+        session.refresh(article, ["content", "summary"])
+
+        new_summary = article.summary if new_summary is None else new_summary
+        if new_content == article.content and new_summary == article.summary:
+            return None
+
+        revision_number = self.latest_revision(session, article.id) + 1
+        is_snapshot = revision_number % self.snapshot_interval == 0
+        if is_snapshot:
+            data = zlib.compress(article.content.encode("utf-8"))
+        else:
+            # The delta base is the version that follows this one, i.e. new_content
+            data = _encode_reverse_delta(new_content, article.content)
+
+        revision = ArticleRevision(
+            article_id=article.id,
+            revision=revision_number,
+            source=source,
+            summary=article.summary,
+            is_snapshot=is_snapshot,
+            content_length=len(article.content),
+            data=data,
+        )
+        session.add(revision)
+
+        article.content = new_content
+        article.summary = new_summary
+        session.add(article)
+        return revision
+
+    def list_revisions(
+        self, session: Session, article_id: int
+    ) -> List[ArticleRevision]:
+        statement = (
+            select(ArticleRevision)
+            .where(ArticleRevision.article_id == article_id)
+            .order_by(ArticleRevision.revision.desc())
+        )
+        return session.exec(statement).all()
+
+    def get_revision(
+        self, session: Session, article: Article, revision_number: int
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Reconstructs (content, summary) of a past revision. Walks forward to the
+        nearest snapshot, or the current content if there is none, and applies
+        reverse deltas back down to the requested revision. Snapshots normally
+        come every `snapshot_interval` revisions, but the walk doesn't rely on
+        it: the interval may have been different when the rows were written.
+        """
+        snapshot = select(func.min(ArticleRevision.revision)).where(
+            ArticleRevision.article_id == article.id,
+            ArticleRevision.revision >= revision_number,
+            ArticleRevision.is_snapshot,
+        )
+        last = session.exec(snapshot).one()
+        statement = (
+            select(ArticleRevision)
+            .where(ArticleRevision.article_id == article.id)
+            .where(ArticleRevision.revision >= revision_number)
+            .order_by(ArticleRevision.revision)
+        )
+        if last is not None:
+            statement = statement.where(ArticleRevision.revision <= last)
+        rows = session.exec(statement).all()
+        if not rows or rows[0].revision != revision_number:
+            return None
+
+        chain = []
+        content = article.content
+        for row in rows:
+            if row.is_snapshot:
+                content = zlib.decompress(row.data).decode("utf-8")
+                break
+            chain.append(row)
+
+        for row in reversed(chain):
+            content = _apply_reverse_delta(content, row.data)
+
+        return content, rows[0].summary
+
+
+revision_service = RevisionService()
@@ -0,0 +1,296 @@
+import time
+import asyncio
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.routing import Mount
+
+from app.config import get_settings
+from app.core.metrics import metrics_registry
+
+settings = get_settings()
+
+span_duration = metrics_registry.histogram(
+    "wiki_span_duration_seconds",
+    "Duration of instrumented operations (generation stages, LLM calls).",
+    ("span", "status"),
+)
+llm_requests = metrics_registry.counter(
+    "wiki_llm_requests",
+    "Requests made to the LLM/image provider, by generation stage and model.",
+    ("stage", "model"),
+)
+llm_tokens = metrics_registry.counter(
+    "wiki_llm_tokens",
+    "Tokens reported by the provider, by generation stage, model and kind.",
+    ("stage", "model", "kind"),
+)
+db_queries = metrics_registry.counter(
+    "wiki_db_queries", "SQL statements executed on world databases."
+)
+http_request_seconds = metrics_registry.histogram(
+    "wiki_http_request_duration_seconds",
+    "Time to produce a response, by route template.",
+    ("method", "route", "status"),
+)
+http_request_queries = metrics_registry.histogram(
+    "wiki_http_db_queries",
+    "SQL statements executed per request, by route template.",
+    ("route",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+background_tasks = metrics_registry.gauge(
+    "wiki_background_tasks", "Background tasks currently running, by kind.", ("kind",)
+)
+
+# The span the current task is inside of (asyncio tasks inherit a copy)
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+# [query count] of the HTTP request being handled, set by the metrics middleware
+request_queries: ContextVar[Optional[list]] = ContextVar(
+    "request_queries", default=None
+)
+
+_otel_tracer = None
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes)
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self._otel = None
+        if _otel_tracer is not None:
+            from opentelemetry import trace
+
+            context = (
+                trace.set_span_in_context(parent._otel)
+                if parent is not None and parent._otel is not None
+                else None
+            )
+            self._otel = _otel_tracer.start_span(
+                name, context=context, attributes=_otel_attributes(self.attributes)
+            )
+
+    @property
+    def stage(self) -> str:
+        """Name of the closest enclosing span that isn't an LLM call."""
+        span = self
+        while span is not None and span.name.startswith("llm."):
+            span = span.parent
+        return span.name if span is not None else "none"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def finish(self, error: BaseException = None):
+        self.duration = time.perf_counter() - self.start
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = type(error).__name__
+        span_duration.observe(self.duration, span=self.name, status=self.status)
+        if self._otel is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            if error is not None:
+                self._otel.record_exception(error)
+                self._otel.set_status(Status(StatusCode.ERROR))
+            self._otel.end()
+
+
+def _otel_attributes(attributes: Dict) -> Dict:
+    return {
+        k: v for k, v in attributes.items() if isinstance(v, (str, bool, int, float))
+    }
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times a block as a child of the current span. Usable around awaits: the
+    span follows the task's context.
+    """
+    parent = current_span.get()
+    current = Span(name, parent, attributes)
+    token = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    else:
+        current.finish()
+    finally:
+        current_span.reset(token)
+
+
+def traced(name: str = None):
+    """Decorator version of span() for sync and async functions."""
+
+    def decorator(fn):
+        span_name = name or fn.__name__
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_llm_usage(response, model: str = None):
+    """
+    Counts a provider response against the current generation stage and adds
+    its token usage to the current span.
+    """
+    current = current_span.get()
+    stage = current.stage if current is not None else "none"
+    model = model or getattr(response, "model", None) or "unknown"
+    llm_requests.inc(stage=stage, model=model)
+
+    usage = getattr(response, "usage", None)
+    if current is not None:
+        current.set_attribute("llm.model", model)
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None) or 0
+        llm_tokens.inc(tokens, stage=stage, model=model, kind=kind)
+        if current is not None:
+            current.set_attribute(f"llm.{kind}_tokens", tokens)
+
+
+def count_query(*args):
+    """SQLAlchemy before_cursor_execute listener (see app/database.py)."""
+    db_queries.inc()
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def track_background(kind: str, fn):
+    """Wraps a coroutine function so the background_tasks gauge counts its runs."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        background_tasks.inc(kind=kind)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            background_tasks.dec(kind=kind)
+
+    return wrapper
+
+
+def _route_template(scope) -> str:
+    """
+    "/world/{world_name}/wiki/{title}" rather than the concrete path, so label
+    values stay bounded. Mounted apps (static files) are reported by prefix.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    for mount in getattr(scope.get("app"), "routes", []):
+        if isinstance(mount, Mount) and scope["path"].startswith(mount.path + "/"):
+            return mount.path
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency and SQL statement count per route template. Plain ASGI
+    (no BaseHTTPMiddleware task/stream wrapping) to keep the per-request cost
+    negligible. A request is measured until its last body chunk is sent, so
+    background tasks that run afterwards are not included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = [0]
+        token = request_queries.set(queries)
+        started = time.perf_counter()
+        state = {"status": 500, "recorded": False}
+
+        def record():
+            if state["recorded"]:
+                return
+            state["recorded"] = True
+            route = _route_template(scope)
+            http_request_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route,
+                status=state["status"],
+            )
+            http_request_queries.observe(queries[0], route=route)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
+            request_queries.reset(token)
+
+
+def configure_otlp(endpoint: str) -> bool:
+    """
+    Mirrors every span to an OpenTelemetry collector (OTLP over gRPC, e.g.
+    http://localhost:4317). Returns False if the OpenTelemetry SDK is missing.
+    """
+    global _otel_tracer
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+            OTLPSpanExporter,
+        )
+    except ImportError as e:
+        print(f"OpenTelemetry export disabled, SDK not available: {e}")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME})
+    )
+    provider.add_span_processor(
+        BatchSpanProcessor(
+            OTLPSpanExporter(endpoint=endpoint, insecure=endpoint.startswith("http://"))
+        )
+    )
+    _otel_tracer = provider.get_tracer("infinite-wiki")
+    print(f"Exporting traces to OpenTelemetry collector at {endpoint}")
+    return True
+
+
+if settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+    configure_otlp(settings.OTEL_EXPORTER_OTLP_ENDPOINT)
@@ -1,9 +1,13 @@
+import asyncio
 from typing import List, Tuple
+from app.config import get_settings
 from app.core.llm import llm_service
 from app.core.rag import rag_service
 from app.core.world import world_manager
 from pydantic import BaseModel
 
+settings = get_settings()
+
 
 class ValidationOutput(BaseModel):
     is_valid: bool
@@ -23,7 +27,9 @@ class ValidatorService:
 
         # 2. Get RAG Context (checking against other articles)
         # We query using the new content to see if it contradicts existing knowledge
-        context_docs = rag_service.query_context(world_name, new_content, n_results=3)
+        context_docs = await asyncio.to_thread(
+            rag_service.query_context, world_name, new_content, 3
+        )
         context_text = "\n\n".join(context_docs)
 
         # 3. Construct Prompt
@@ -63,6 +69,7 @@ class ValidatorService:
                 model=config.llm_model,
                 schema=ValidationOutput,
                 system_prompt="You are a strict consistency validator.",
+                timeout_seconds=settings.LLM_FAST_TIMEOUT_SECONDS,
             )
             return result.is_valid, result.issues
         except Exception as e:
@@ -0,0 +1,495 @@
+import io
+import os
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.core.fs import write_atomic
+
+settings = get_settings()
+
+# int8 rows are the vector scaled so its largest component is +-127
+INT8_SCALE = 127.0
+INITIAL_CAPACITY = 256
+# Rows converted to float32 at a time while scanning (small enough for the CPU cache)
+SCAN_CHUNK = 4096
+# The IVF index is rebuilt once the store has grown by this factor
+REBUILD_GROWTH = 1.25
+# Vectors the k-means clustering is trained on
+TRAINING_SAMPLE = 50000
+# The log is compacted once it holds this many times more entries than rows
+COMPACT_RATIO = 2
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed=0):
+    """Spherical k-means: unit centroids maximizing the members' dot products."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Clusters that lost all members keep their previous centroid
+        sums[empty] = centroids[empty]
+        centroids = normalize(sums)
+    return centroids
+
+
+class VectorStore:
+    """
+    One world's embeddings in a memory-mapped `<path>.npy`, as float16 unit
+    vectors or as int8 (each row scaled to use the full range; its norm is
+    kept in memory to score by cosine). Ids, metadata and documents go to an
+    append-only `<path>.jsonl` log, one line per write, after the vector is
+    flushed: the rows the log accounts for are always complete, and adding an
+    article doesn't rewrite the whole store. Deletes are logged before the
+    last rows move into the freed ones and confirmed after, so loading
+    finishes the moves of an interrupted delete.
+
+    Search is exact, dot products over every row, until the store holds
+    `ann_threshold` vectors. From then on an IVF index (k-means clusters,
+    `<path>.ivf.npz`) limits the scan to the `probes` clusters nearest to the
+    query, plus the rows added since the index was last built.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dtype: str = None,
+        ann_threshold: int = None,
+        probes: int = None,
+    ):
+        self.path = path
+        self.dtype = np.dtype(dtype or settings.VECTOR_STORE_DTYPE)
+        self.ann_threshold = (
+            settings.VECTOR_STORE_ANN_THRESHOLD
+            if ann_threshold is None
+            else ann_threshold
+        )
+        self.probes = settings.VECTOR_STORE_ANN_PROBES if probes is None else probes
+
+        self._lock = threading.RLock()
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.documents: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        # Unmapped by close(); the next use maps the file again
+        self._closed = False
+        # Norms of the int8 rows, one per row of the file
+        self._norms: Optional[np.ndarray] = None
+        # (centroids, rows ordered by cluster, cluster offsets, rows indexed)
+        self._index = None
+        self._log_entries = 0
+        self.scanned = 0
+        self._load()
+
+    @property
+    def vectors_path(self) -> str:
+        return self.path + ".npy"
+
+    @property
+    def log_path(self) -> str:
+        return self.path + ".jsonl"
+
+    @property
+    def index_path(self) -> str:
+        return self.path + ".ivf.npz"
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Storage ---
+
+    def _load(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            # The file's dtype wins over the setting, until the store is rebuilt
+            self.dtype = np.dtype(json.loads(f.readline())["dtype"])
+            # Row moves of deletes not yet confirmed as flushed
+            pending = []
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted write
+                    break
+                self._log_entries += 1
+                if entry.get("flushed"):
+                    pending = []
+                    continue
+                self._apply(entry)
+                if "move" in entry:
+                    pending.append(entry["move"])
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+        if pending:
+            # Copying from rows nothing has overwritten since, so redoing moves
+            # that did complete is harmless
+            self._move_rows(pending)
+            self._append_log([{"flushed": True}])
+        if self.dtype == np.int8:
+            self._norms = np.zeros(len(self._vectors), dtype=np.float32)
+            self._update_norms(np.arange(len(self.ids)))
+        if os.path.exists(self.index_path):
+            with np.load(self.index_path) as index:
+                if int(index["count"]) <= len(self.ids):
+                    self._index = (
+                        index["centroids"],
+                        index["order"],
+                        index["offsets"],
+                        int(index["count"]),
+                    )
+
+    def _open(self):
+        """Maps the vectors again after close() (callers may still hold the store)."""
+        if self._closed:
+            if os.path.exists(self.vectors_path):
+                self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+            self._closed = False
+
+    def _apply(self, entry: Dict[str, Any]):
+        row = self._rows.get(entry["id"])
+        if entry.get("deleted"):
+            # The last row moves into the freed one
+            del self._rows[entry["id"]]
+            last = len(self.ids) - 1
+            if row != last:
+                self.ids[row] = self.ids[last]
+                self.metadatas[row] = self.metadatas[last]
+                self.documents[row] = self.documents[last]
+                self._rows[self.ids[row]] = row
+            self.ids.pop()
+            self.metadatas.pop()
+            self.documents.pop()
+        elif row is None:
+            self._rows[entry["id"]] = len(self.ids)
+            self.ids.append(entry["id"])
+            self.metadatas.append(entry["metadata"])
+            self.documents.append(entry["document"])
+        else:
+            self.metadatas[row] = entry["metadata"]
+            self.documents[row] = entry["document"]
+
+    def _header(self) -> str:
+        return json.dumps({"dtype": self.dtype.name}) + "\n"
+
+    def _append_log(self, entries: List[Dict[str, Any]], compact: bool = True):
+        if (
+            compact
+            and self._log_entries + len(entries) > COMPACT_RATIO * len(self.ids) + 100
+        ):
+            self._compact()
+            return
+        new = not os.path.exists(self.log_path)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            if new:
+                f.write(self._header())
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        self._log_entries += len(entries)
+
+    def _compact(self):
+        """Rewrites the log with one entry per row."""
+        lines = [self._header()] + [
+            json.dumps({"id": id, "metadata": metadata, "document": document}) + "\n"
+            for id, metadata, document in zip(self.ids, self.metadatas, self.documents)
+        ]
+        write_atomic(self.log_path, "".join(lines).encode("utf-8"))
+        self._log_entries = len(self.ids)
+
+    def _ensure_capacity(self, rows: int, dimensions: int):
+        if self._vectors is None and self.ids:
+            # Never start an empty file under rows the log accounts for
+            raise RuntimeError(f"{self.vectors_path} is missing")
+        if self._vectors is not None:
+            if self._vectors.shape[1] != dimensions:
+                raise ValueError(
+                    f"Embedding has {dimensions} dimensions, "
+                    f"the store holds {self._vectors.shape[1]}"
+                )
+            if rows <= self._vectors.shape[0]:
+                return
+        capacity = max(
+            rows,
+            INITIAL_CAPACITY,
+            2 * self._vectors.shape[0] if self._vectors is not None else 0,
+        )
+        # Grow into a new file, so the old one stays intact until the rename
+        temp_path = self.path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(
+            temp_path, mode="w+", dtype=self.dtype, shape=(capacity, dimensions)
+        )
+        if self._vectors is not None:
+            grown[: len(self.ids)] = self._vectors[: len(self.ids)]
+        grown.flush()
+        if self.dtype == np.int8:
+            norms = np.zeros(capacity, dtype=np.float32)
+            if self._norms is not None:
+                norms[: len(self._norms)] = self._norms
+            self._norms = norms
+        # Unmap both before the rename (Windows can't replace a mapped file)
+        del grown
+        self._vectors = None
+        os.replace(temp_path, self.vectors_path)
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = normalize(vectors)
+        if self.dtype == np.int8:
+            peak = np.abs(vectors).max(axis=1, keepdims=True)
+            vectors = vectors * (INT8_SCALE / np.where(peak == 0, 1, peak))
+            return np.round(vectors).astype(np.int8)
+        return vectors.astype(self.dtype)
+
+    def _update_norms(self, rows: np.ndarray):
+        for start in range(0, len(rows), SCAN_CHUNK):
+            chunk = rows[start : start + SCAN_CHUNK]
+            norms = np.linalg.norm(self._vectors[chunk].astype(np.float32), axis=1)
+            self._norms[chunk] = np.where(norms == 0, 1, norms)
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings,
+        metadatas: List[Dict[str, Any]] = None,
+        documents: List[str] = None,
+    ):
+        """Adds vectors, or replaces those of ids already stored."""
+        vectors = self._encode(np.atleast_2d(np.asarray(embeddings)))
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or ["" for _ in ids]
+        with self._lock:
+            self._open()
+            entries, written = [], []
+            for id, vector, metadata, document in zip(
+                ids, vectors, metadatas, documents
+            ):
+                entry = {"id": id, "metadata": metadata, "document": document}
+                # New ids take the next row; indexed rows keep their cluster
+                # until the next rebuild
+                row = self._rows.get(id, len(self.ids))
+                self._ensure_capacity(row + 1, len(vector))
+                self._vectors[row] = vector
+                self._apply(entry)
+                entries.append(entry)
+                written.append(row)
+            self._vectors.flush()
+            if self.dtype == np.int8:
+                self._update_norms(np.array(written))
+            self._append_log(entries)
+            self._maybe_build_index()
+
+    def delete(self, ids: List[str]):
+        """Removes vectors; the last row moves into each freed one."""
+        with self._lock:
+            self._open()
+            if not any(id in self._rows for id in ids):
+                return
+            # Until the log records the deletes, the index on disk is outdated
+            if self._index is not None and os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            entries, moves = [], []
+            for id in ids:
+                row = self._rows.get(id)
+                if row is None:
+                    continue
+                last = len(self.ids) - 1
+                entry = {"id": id, "deleted": True}
+                if row != last:
+                    entry["move"] = [last, row]
+                    moves.append(entry["move"])
+                if self._index is not None:
+                    self._unindex(row, last)
+                self._apply(entry)
+                entries.append(entry)
+            # The log goes first, the moves it records are redone on load if
+            # they don't complete. Compacting would drop that record.
+            self._append_log(entries, compact=False)
+            self._move_rows(moves)
+            self._append_log([{"flushed": True}])
+            if self._index is not None:
+                self._save_index()
+
+    def _move_rows(self, moves: List[List[int]]):
+        """Copies each [source, target] row in order, then flushes."""
+        for source, target in moves:
+            self._vectors[target] = self._vectors[source]
+            if self._norms is not None:
+                self._norms[target] = self._norms[source]
+        self._vectors.flush()
+
+    # --- IVF index ---
+
+    def _maybe_build_index(self):
+        count = len(self.ids)
+        if not self.ann_threshold or count < self.ann_threshold:
+            return
+        if self._index is not None and count < self._index[3] * REBUILD_GROWTH:
+            return
+        self.build_index()
+
+    def build_index(self):
+        """Clusters the stored vectors (about sqrt(n) clusters) for IVF search."""
+        with self._lock:
+            self._open()
+            count = len(self.ids)
+            clusters = max(1, int(np.sqrt(count)))
+            rng = np.random.default_rng(0)
+            sample = np.sort(
+                rng.choice(count, min(count, TRAINING_SAMPLE), replace=False)
+            )
+            centroids = kmeans(self._decode(sample), clusters)
+
+            # The nearest centroid doesn't depend on the row's scale. Rows
+            # past `count` are spare capacity, not vectors
+            assignment = np.empty(count, dtype=np.int64)
+            for start in range(0, count, SCAN_CHUNK):
+                end = min(start + SCAN_CHUNK, count)
+                chunk = self._vectors[start:end].astype(np.float32)
+                assignment[start:end] = np.argmax(chunk @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            offsets = np.searchsorted(assignment[order], np.arange(clusters + 1))
+
+            self._index = (centroids, order, offsets, count)
+            self._save_index()
+
+    def _save_index(self):
+        centroids, order, offsets, count = self._index
+        buffer = io.BytesIO()
+        np.savez(buffer, centroids=centroids, order=order, offsets=offsets, count=count)
+        write_atomic(self.index_path, buffer.getvalue())
+
+    def _unindex(self, row: int, last: int):
+        """
+        Updates the index for a delete of `row`, before the last row moves
+        into it, instead of clustering everything again.
+        """
+        centroids, order, offsets, indexed = self._index
+        if row >= indexed:
+            # A row added since the build, scanned anyway
+            return
+        position = int(np.flatnonzero(order == row)[0])
+        cluster = int(np.searchsorted(offsets, position, side="right")) - 1
+        order = np.delete(order, position)
+        offsets = offsets.copy()
+        offsets[cluster + 1 :] -= 1
+        if last < indexed:
+            # No rows after the indexed ones: the last moves, keeping its cluster
+            indexed -= 1
+            if row != last:
+                order[order == last] = row
+        else:
+            # An unindexed row moves into the index: its nearest cluster
+            vector = self._vectors[last].astype(np.float32)
+            cluster = int(np.argmax(centroids @ vector))
+            order = np.insert(order, offsets[cluster + 1], row)
+            offsets[cluster + 1 :] += 1
+        self._index = (centroids, order, offsets, indexed)
+
+    # --- Search ---
+
+    def _decode(self, rows) -> np.ndarray:
+        """The given rows (a slice or row numbers) as float32 unit vectors."""
+        vectors = self._vectors[rows].astype(np.float32)
+        if self.dtype == np.int8:
+            vectors /= self._norms[rows][:, None]
+        return vectors
+
+    def _scores(self, rows, query: np.ndarray) -> np.ndarray:
+        """Cosine similarities of the given rows with a unit query vector."""
+        scores = self._vectors[rows].astype(np.float32) @ query
+        if self.dtype == np.int8:
+            scores /= self._norms[rows]
+        return scores
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to scan, or None for all of them."""
+        if self._index is None:
+            return None
+        centroids, order, offsets, indexed = self._index
+        nearest = np.argsort(-(centroids @ query))[: self.probes]
+        rows = [order[offsets[c] : offsets[c + 1]] for c in nearest]
+        # Rows added since the index was built are always scanned
+        rows.append(np.arange(indexed, len(self.ids)))
+        return np.sort(np.concatenate(rows))
+
+    def query(self, embedding, n_results: int = 3) -> Dict[str, List]:
+        """The `n_results` most similar vectors, like a Chroma query result row."""
+        query = normalize(embedding).reshape(-1)
+        with self._lock:
+            self._open()
+            count = len(self.ids)
+            if count == 0:
+                return {"ids": [], "documents": [], "metadatas": [], "scores": []}
+            rows = self._candidates(query)
+            if rows is None:
+                # Slices read the mapped file directly, without gathering rows
+                scan = np.arange(count)
+                chunks = [
+                    slice(start, min(start + SCAN_CHUNK, count))
+                    for start in range(0, count, SCAN_CHUNK)
+                ]
+            else:
+                scan = rows
+                chunks = [
+                    rows[start : start + SCAN_CHUNK]
+                    for start in range(0, len(rows), SCAN_CHUNK)
+                ]
+            scores = np.concatenate([self._scores(chunk, query) for chunk in chunks])
+            self.scanned = len(scan)
+
+            k = min(n_results, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return {
+                "ids": [self.ids[scan[i]] for i in top],
+                "documents": [self.documents[scan[i]] for i in top],
+                "metadatas": [self.metadatas[scan[i]] for i in top],
+                "scores": [float(scores[i]) for i in top],
+            }
+
+    def warm(self):
+        """Reads the vectors once, so the first query finds them in the page cache."""
+        with self._lock:
+            self._open()
+            if self._vectors is not None:
+                for start in range(0, len(self.ids), SCAN_CHUNK):
+                    self._vectors[start : start + SCAN_CHUNK].sum()
+
+    def close(self):
+        with self._lock:
+            self._vectors = None
+            self._closed = True
+
+    def stats(self) -> Dict:
+        return {
+            "count": len(self.ids),
+            "dtype": self.dtype.name,
+            "indexed": self._index[3] if self._index is not None else 0,
+            "clusters": len(self._index[0]) if self._index is not None else 0,
+        }
+
+
+def copy_collection(collection, store: VectorStore, page_size: int = 500) -> int:
+    """Copies a Chroma collection's stored embeddings into `store` (no re-embedding)."""
+    total = collection.count()
+    for offset in range(0, total, page_size):
+        page = collection.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=page_size,
+            offset=offset,
+        )
+        store.upsert(
+            page["ids"], page["embeddings"], page["metadatas"], page["documents"]
+        )
+    return total
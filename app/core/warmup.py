@@ -0,0 +1,140 @@
+import os
+import time
+import asyncio
+import inspect
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.core.graph import graph_service
+from app.core.rag import rag_service
+from app.core.world import world_manager
+from app.database import get_async_engine, get_engine
+
+settings = get_settings()
+
+
+class WarmupService:
+    """
+    Loads what the first visitor would otherwise wait for: the embedding
+    model, and the engines (sync and async), RAG indexes and graphs of
+    the most recently used worlds. The linker works off the graph, so it's
+    warm once the graph is.
+
+    `start()` runs it in the background so the server accepts requests right
+    away; `ready` turns true once it's done, failures included (they are
+    reported in `stats()`, the affected worlds load on first use as before).
+    """
+
+    def __init__(self, enabled: bool = None, worlds: int = None):
+        self.enabled = settings.WARMUP_ENABLED if enabled is None else enabled
+        self.worlds = settings.WARMUP_WORLDS if worlds is None else worlds
+
+        self.status = "pending"
+        self.warmed: List[str] = []
+        self.errors: Dict[str, str] = {}
+        self.seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "disabled")
+
+    # --- Lifecycle ---
+
+    def start(self) -> Optional[asyncio.Task]:
+        if not self.enabled:
+            self.status = "disabled"
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        # A world being loaded in its thread finishes, the rest are skipped
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self):
+        self.status = "warming"
+        self.warmed = []
+        self.errors = {}
+        started = time.perf_counter()
+        try:
+            await self._step("embedding model", self.warm_embedding_model)
+            for world_name in self.recent_worlds():
+                if await self._step(world_name, self.warm_world, world_name):
+                    self.warmed.append(world_name)
+        finally:
+            self.seconds = round(time.perf_counter() - started, 2)
+            self.status = "ready"
+        print(
+            f"Warm-up done in {self.seconds}s: {len(self.warmed)} world(s), "
+            f"{len(self.errors)} error(s)."
+        )
+
+    async def _step(self, name: str, func, *args) -> bool:
+        try:
+            if inspect.iscoroutinefunction(func):
+                await func(*args)
+            else:
+                # Model and index loading block, keep them off the event loop
+                await asyncio.to_thread(func, *args)
+            return True
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            self.errors[name] = str(e)
+            return False
+
+    # --- Steps ---
+
+    def recent_worlds(self) -> List[str]:
+        """
+        The worlds to warm, most recently written first. Capped by
+        MAX_RESIDENT_WORLDS, so warming doesn't evict the worlds it just opened.
+        """
+        limit = self.worlds
+        if settings.MAX_RESIDENT_WORLDS:
+            limit = min(limit, settings.MAX_RESIDENT_WORLDS)
+        if limit <= 0:
+            return []
+
+        def last_written(world_name: str) -> float:
+            # Database (and its WAL), graph and config sit at the top level
+            with os.scandir(world_manager.get_world_path(world_name)) as entries:
+                return max((e.stat().st_mtime for e in entries), default=0.0)
+
+        worlds = sorted(world_manager.list_worlds(), key=last_written, reverse=True)
+        return worlds[:limit]
+
+    def warm_embedding_model(self):
+        rag_service.embedding_function()(["warm-up"])
+
+    async def warm_world(self, world_name: str):
+        await asyncio.to_thread(self.load_world, world_name)
+        # The page and article routes read through the async engine, and it
+        # has to be created on the event loop that serves them
+        async with get_async_engine(world_name).connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    def load_world(self, world_name: str):
+        # Opens the engine and brings the schema up to date
+        with get_engine(world_name).connect():
+            pass
+        graph_service.get_graph(world_name)
+        rag_service.warm(world_name)
+
+    def stats(self) -> Dict:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "worlds": self.warmed,
+            "errors": self.errors,
+        }
+
+
+warmup_service = WarmupService()
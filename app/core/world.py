@@ -1,8 +1,11 @@
 import os
 import shutil
-from typing import List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 
+from app.core.fs import write_atomic
+
 
 class WorldConfig(BaseModel):
     name: str
@@ -20,16 +23,29 @@ class WorldManager:
         self.base_path = base_path or os.getenv("WORLD_DATA_DIR", "worlds")
         os.makedirs(self.base_path, exist_ok=True)
 
+        # world_name -> ((mtime_ns, size), parsed config)
+        self._config_cache: Dict[str, Tuple[Tuple[int, int], WorldConfig]] = {}
+        # (base dir mtime_ns, world names)
+        self._worlds_cache: Optional[Tuple[int, List[str]]] = None
+        self._cache_lock = threading.Lock()
+
     def get_world_path(self, world_name: str) -> str:
         return os.path.join(self.base_path, world_name)
 
     def get_chroma_path(self, world_name: str) -> str:
         return os.path.join(self.get_world_path(world_name), "chroma_db")
 
+    def get_shared_chroma_path(self) -> str:
+        """Chroma store hosting every world's collection (CHROMA_STORAGE="shared")."""
+        return os.path.join(self.base_path, "_chroma")
+
     def get_images_path(self, world_name: str) -> str:
         return os.path.join(self.get_world_path(world_name), "images")
 
     def create_world(self, config: WorldConfig):
+        if config.name.startswith((".", "_")):
+            # Reserved for shared data next to the worlds (e.g. _chroma)
+            raise ValueError("World names can't start with '.' or '_'.")
         world_path = self.get_world_path(config.name)
         if os.path.exists(world_path):
             raise ValueError(f"World '{config.name}' already exists.")
@@ -38,25 +54,61 @@ class WorldManager:
         os.makedirs(self.get_images_path(config.name))  # Create images directory
 
         # Save config
-        config_path = os.path.join(world_path, "config.json")
-        with open(config_path, "w") as f:
-            f.write(config.model_dump_json(indent=2))
+        self.update_config(config)
 
     def list_worlds(self) -> List[str]:
-        return [
-            d
-            for d in os.listdir(self.base_path)
-            if os.path.isdir(os.path.join(self.base_path, d))
-        ]
+        # Creating or removing a world directory bumps the base directory's mtime,
+        # so the listing only has to be rebuilt when that changes.
+        mtime = os.stat(self.base_path).st_mtime_ns
+        cached = self._worlds_cache
+        if cached is None or cached[0] != mtime:
+            worlds = [
+                d
+                for d in os.listdir(self.base_path)
+                if os.path.isdir(os.path.join(self.base_path, d))
+                and not d.startswith((".", "_"))
+            ]
+            cached = (mtime, worlds)
+            self._worlds_cache = cached
+        return list(cached[1])
+
+    def get_config_path(self, world_name: str) -> str:
+        return os.path.join(self.get_world_path(world_name), "config.json")
 
     def get_config(self, world_name: str) -> WorldConfig:
-        config_path = os.path.join(self.get_world_path(world_name), "config.json")
-        if not os.path.exists(config_path):
+        config_path = self.get_config_path(world_name)
+        try:
+            stat = os.stat(config_path)
+        except FileNotFoundError:
             # Return default if no config exists (migration support)
+            self._config_cache.pop(world_name, None)
             return WorldConfig(name=world_name)
 
-        with open(config_path, "r") as f:
-            return WorldConfig.model_validate_json(f.read())
+        # Invalidate on mtime/size so manual edits of config.json are picked up
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._config_cache.get(world_name)
+        if cached is None or cached[0] != signature:
+            with open(config_path, "r") as f:
+                config = WorldConfig.model_validate_json(f.read())
+            cached = (signature, config)
+            self._config_cache[world_name] = cached
+
+        # Hand out a copy so callers can't mutate the cached instance
+        return cached[1].model_copy()
+
+    def update_config(self, config: WorldConfig):
+        """Atomically writes a world's config.json and refreshes the cache."""
+        config_path = self.get_config_path(config.name)
+        with self._cache_lock:
+            # Unlike a bare mkstemp file, readable by other users (e.g. another
+            # container user or the static exporter)
+            write_atomic(config_path, config.model_dump_json(indent=2).encode("utf-8"))
+
+            stat = os.stat(config_path)
+            self._config_cache[config.name] = (
+                (stat.st_mtime_ns, stat.st_size),
+                config.model_copy(),
+            )
 
     def get_paths(self, world_name: str):
         world_path = self.get_world_path(world_name)
@@ -64,6 +116,8 @@ class WorldManager:
             "db": f"sqlite:///{os.path.join(world_path, 'database.db')}",
             "graph": os.path.join(world_path, "wiki_graph.json"),
             "chroma": os.path.join(world_path, "chroma_db"),
+            # vectors.npy and vectors.jsonl (RAG_BACKEND="numpy")
+            "vectors": os.path.join(world_path, "vectors"),
         }
 
 
@@ -1,18 +1,201 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+from typing import AsyncIterator, Dict
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import get_settings
 from app.core.world import world_manager
+from app.core.residency import residency_manager
+from app.core.telemetry import count_query
+
+# Importing the models registers their tables on SQLModel.metadata
+from app.models import article as _article_models, image_job as _image_job_models
+
+settings = get_settings()
 
 # Cache engines to avoid recreating them
 _engines = {}
+_async_engines = {}
+_readonly_engines = {}
+# Creating an engine upgrades the schema, which must not run twice at once
+# (e.g. warm-up in its thread and a request on the event loop)
+_engines_lock = threading.Lock()
+
+
+def get_sqlite_pragmas() -> Dict[str, object]:
+    """The pragma profile applied to every world database connection."""
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
+    # Empty / zero values mean "keep SQLite's default"
+    return {name: value for name, value in pragmas.items() if value}
+
+
+def install_sqlite_pragmas(engine, pragmas: Dict[str, object] = None):
+    """Applies `pragmas` (defaults to the configured profile) on every new connection."""
+    pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def install_query_counter(engine):
+    """Counts statements for /metrics (total and per HTTP request)."""
+    if settings.METRICS_ENABLED:
+        event.listen(engine, "before_cursor_execute", count_query)
+
+
+def add_missing_columns(engine):
+    """
+    create_all() only creates missing tables. Adds the columns introduced
+    after a world was created (e.g. Article.image_hash) to its existing
+    tables; new columns must be nullable or have a default.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(engine.dialect)
+                conn.execute(
+                    text(
+                        f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                    )
+                )
+                print(f"Added column {table.name}.{column.name}")
 
 
 def get_engine(world_name: str):
     if world_name not in _engines:
-        paths = world_manager.get_paths(world_name)
-        connect_args = {"check_same_thread": False}
-        _engines[world_name] = create_engine(paths["db"], connect_args=connect_args)
+        with _engines_lock:
+            if world_name not in _engines:
+                _engines[world_name] = _create_engine(world_name)
+    residency_manager.touch(world_name)
     return _engines[world_name]
 
 
+def _create_engine(world_name: str):
+    paths = world_manager.get_paths(world_name)
+    connect_args = {"check_same_thread": False}
+    engine = create_engine(paths["db"], connect_args=connect_args)
+    install_sqlite_pragmas(engine)
+    install_query_counter(engine)
+    if os.path.isdir(world_manager.get_world_path(world_name)):
+        # Adds tables introduced after the world was created (e.g. revisions)
+        SQLModel.metadata.create_all(engine)
+        add_missing_columns(engine)
+    return engine
+
+
+def get_async_engine(world_name: str):
+    """aiosqlite-backed engine for non-blocking reads from async route handlers."""
+    entry = _async_engines.get(world_name)
+    if entry is not None and entry[1] is not asyncio.get_running_loop():
+        # Created under another event loop (e.g. a previous asyncio.run in a script)
+        _dispose_async_engine(_async_engines.pop(world_name))
+    if world_name not in _async_engines:
+        # The sync engine creates missing tables and columns (once per process)
+        get_engine(world_name)
+        paths = world_manager.get_paths(world_name)
+        url = paths["db"].replace("sqlite://", "sqlite+aiosqlite://", 1)
+        engine = create_async_engine(url)
+        install_sqlite_pragmas(engine.sync_engine)
+        install_query_counter(engine.sync_engine)
+        # Remember the loop: aiosqlite connections must be closed on the loop that opened them
+        _async_engines[world_name] = (engine, asyncio.get_running_loop())
+    residency_manager.touch(world_name)
+    return _async_engines[world_name][0]
+
+
+def get_readonly_engine(world_name: str):
+    """
+    Engine for tools that must not modify a world, like the static export.
+    It opens the database read-only, without the schema upgrade or the
+    pragma profile (journal_mode is persistent). Columns added after the
+    database was created read as NULL.
+    """
+    if world_name not in _readonly_engines:
+        path = os.path.abspath(
+            world_manager.get_paths(world_name)["db"][len("sqlite:///") :]
+        )
+        uri = f"file:{quote(path)}?mode=ro"
+        engine = create_engine(
+            "sqlite://",
+            creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+        )
+        event.listen(engine, "connect", _shadow_missing_columns)
+        _readonly_engines[world_name] = engine
+    return _readonly_engines[world_name]
+
+
+def _shadow_missing_columns(dbapi_connection, connection_record):
+    # TEMP views live outside the database file and take precedence over its
+    # tables in unqualified queries
+    cursor = dbapi_connection.cursor()
+    try:
+        for table in SQLModel.metadata.sorted_tables:
+            rows = cursor.execute(f'PRAGMA main.table_info("{table.name}")')
+            existing = {row[1] for row in rows.fetchall()}
+            missing = [c.name for c in table.columns if c.name not in existing]
+            if existing and missing:
+                nulls = ", ".join(f'NULL AS "{name}"' for name in missing)
+                cursor.execute(
+                    f'CREATE TEMP VIEW "{table.name}" AS '
+                    f'SELECT *, {nulls} FROM main."{table.name}"'
+                )
+    finally:
+        cursor.close()
+
+
+def dispose_engine(world_name: str):
+    """Closes pooled connections for a world; the engines are recreated on next use."""
+    for engines in (_engines, _readonly_engines):
+        engine = engines.pop(world_name, None)
+        if engine is not None:
+            engine.dispose()
+
+    entry = _async_engines.pop(world_name, None)
+    if entry is not None:
+        _dispose_async_engine(entry)
+
+
+def _dispose_async_engine(entry):
+    async_engine, loop = entry
+    if loop.is_closed():
+        return
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        loop.create_task(async_engine.dispose())
+    else:
+        asyncio.run_coroutine_threadsafe(async_engine.dispose(), loop)
+
+
+residency_manager.register("engine", dispose_engine)
+
+
 def create_db_and_tables(world_name: str):
     engine = get_engine(world_name)
     SQLModel.metadata.create_all(engine)
@@ -22,3 +205,15 @@ def get_session(world_name: str):
     engine = get_engine(world_name)
     with Session(engine) as session:
         yield session
+
+
+def get_readonly_session(world_name: str):
+    with Session(get_readonly_engine(world_name)) as session:
+        yield session
+
+
+async def get_async_session(world_name: str) -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding an AsyncSession for the `world_name` path parameter."""
+    engine = get_async_engine(world_name)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import (
     FastAPI,
     Depends,
@@ -8,18 +10,30 @@ from fastapi import (
     BackgroundTasks,
 )
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+)
 from fastapi import Query
 from sqlmodel import Session, select
-from typing import Optional
-import json
-import markdown
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 
 from app.config import get_settings
-from app.database import create_db_and_tables, get_session
+from app.database import create_db_and_tables, get_session, get_async_session
 from app.core.generator import generator_service
-from app.models.article import Article, ArticleRead
+from app.core.images import content_hash, image_derivatives
+from app.models.article import Article, ArticleRead, ArticleRevisionRead
 from app.core.world import world_manager, WorldConfig
+from app.core.metrics import CONTENT_TYPE, metrics_registry
+from app.core.telemetry import RequestMetricsMiddleware
+from app.core.prefetch import ForegroundMiddleware
+from app.core.reindex import reindex_queue
+from app.core.warmup import warmup_service
 
 settings = get_settings()
 
@@ -29,12 +43,18 @@ import secrets
 
 security = HTTPBasic(auto_error=False)
 
+# Liveness/readiness probes, reachable by orchestrators without credentials
+PROBE_PATHS = ("/health", "/ready")
+
 
 def get_current_username(
+    request: Request,
     credentials: Optional[HTTPBasicCredentials] = Depends(security),
 ):
     if not settings.AUTH_USERNAME or not settings.AUTH_PASSWORD:
         return "anonymous"
+    if request.url.path in PROBE_PATHS:
+        return "anonymous"
 
     if not credentials:
         raise HTTPException(
@@ -71,25 +91,48 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
 
-# Inject base_url into all templates
-@app.middleware("http")
-async def add_base_url_context(request: Request, call_next):
-    response = await call_next(request)
-    return response
+# Prefetching pauses while user-facing requests are handled
+app.add_middleware(ForegroundMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
 
 
-# We can't easily inject into TemplateResponse via middleware without monkeypatching or using a custom response class.
-# Instead, let's just add it to the environment globals so it's available everywhere.
+# Inject base_url into all templates through the environment globals. (No
+# @app.middleware("http"): it re-streams every response, which rules out pathsend for images.)
 import os
 
 base_url = os.getenv("BASE_URL", "")
 templates.env.globals["base_url"] = base_url
+templates.env.globals["image_sources"] = image_derivatives.sources
 
 
 @app.on_event("startup")
-def on_startup():
-    # Ensure default world exists if needed, or just ensure base dir
-    pass
+async def on_startup():
+    from app.core.image_queue import image_queue
+
+    # Image workers; also resumes jobs left unfinished by a crash or restart
+    await image_queue.start()
+
+    # Opens provider connections in the background, so the first generation
+    # doesn't wait for TCP/TLS handshakes
+    if settings.HTTP_PREWARM_CONNECTIONS > 0:
+        from app.core.http_client import prewarm
+
+        app.state.prewarm_task = asyncio.create_task(prewarm())
+
+    # Loads the embedding model and the most recently used worlds; /ready
+    # reports when it's done, /health is live right away
+    warmup_service.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from app.core.image_queue import image_queue
+
+    await warmup_service.stop()
+    await image_queue.stop()
+    # Pending edits are reindexed before the process exits
+    await reindex_queue.stop()
 
 
 # --- World Management Routes ---
@@ -170,27 +213,115 @@ async def create_world(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.get("/world/{world_name}", response_class=HTMLResponse)
-async def world_home(request: Request, world_name: str):
-    session_gen = get_session(world_name)
-    session = next(session_gen)
-    try:
-        statement = select(Article).order_by(Article.title)
-        articles = session.exec(statement).all()
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
 
-        world_config = world_manager.get_config(world_name)
 
-        return templates.TemplateResponse(
-            "world_overview.html",
-            {
-                "request": request,
-                "world_name": world_name,
-                "world_config": world_config,
-                "articles": articles,
-            },
+@app.get("/ready")
+async def ready():
+    if not warmup_service.ready:
+        return JSONResponse({"status": warmup_service.status}, status_code=503)
+    return {"status": "ready"}
+
+
+@app.get("/api/system/warmup")
+async def get_warmup_stats():
+    return warmup_service.stats()
+
+
+@app.get("/api/system/residency")
+async def get_residency_stats():
+    from app.core.residency import residency_manager
+
+    return residency_manager.stats()
+
+
+@app.get("/api/system/prefetch")
+async def get_prefetch_stats():
+    from app.core.prefetch import prefetch_service
+
+    return prefetch_service.stats()
+
+
+@app.get("/api/system/images")
+async def get_image_queue_stats():
+    from app.core.image_queue import image_queue
+
+    return image_queue.stats()
+
+
+@app.get("/api/system/embeddings")
+async def get_embedding_stats():
+    from app.core.embeddings import embedding_service
+
+    return embedding_service().stats()
+
+
+@app.get("/api/system/reindex")
+async def get_reindex_stats():
+    return reindex_queue.stats()
+
+
+@app.get("/api/system/indexes")
+async def get_index_rebuild_stats():
+    from app.core.indexes import index_service
+
+    return index_service.stats()
+
+
+@app.get("/api/world/{world_name}/indexes")
+async def verify_indexes(world_name: str):
+    from app.core.indexes import index_service
+
+    if world_name not in world_manager.list_worlds():
+        raise HTTPException(status_code=404, detail="World not found")
+    return await index_service.verify_async(world_name)
+
+
+@app.post("/api/world/{world_name}/indexes/rebuild", status_code=202)
+async def rebuild_indexes(
+    world_name: str,
+    index: List[str] = Query(default=["rag", "graph"]),
+    full: bool = False,
+):
+    from app.core.indexes import INDEXES, index_service
+
+    if world_name not in world_manager.list_worlds():
+        raise HTTPException(status_code=404, detail="World not found")
+    unknown = set(index) - set(INDEXES)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown index: {', '.join(sorted(unknown))}"
         )
-    finally:
-        session.close()
+    return index_service.start_rebuild(world_name, index, full=full)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/world/{world_name}", response_class=HTMLResponse)
+async def world_home(
+    request: Request,
+    world_name: str,
+    session: AsyncSession = Depends(get_async_session),
+):
+    statement = select(Article).order_by(Article.title)
+    articles = (await session.exec(statement)).all()
+
+    world_config = world_manager.get_config(world_name)
+
+    return templates.TemplateResponse(
+        "world_overview.html",
+        {
+            "request": request,
+            "world_name": world_name,
+            "world_config": world_config,
+            "articles": articles,
+        },
+    )
 
 
 # --- Wiki Routes ---
@@ -202,19 +333,24 @@ async def create_custom_article(
     title: str = Form(...),
     description: str = Form(None),
     background_tasks: BackgroundTasks = None,
+    async_session: AsyncSession = Depends(get_async_session),
 ):
+    # Check if exists
+    statement = select(Article.id).where(Article.title == title)
+    if (await async_session.exec(statement)).first() is not None:
+        return RedirectResponse(
+            url=f"/world/{world_name}/wiki/{title}", status_code=303
+        )
+
     session_gen = get_session(world_name)
     session = next(session_gen)
     try:
-        # Check if exists
-        statement = select(Article).where(Article.title == title)
-        if session.exec(statement).first():
-            return RedirectResponse(
-                url=f"/world/{world_name}/wiki/{title}", status_code=303
-            )
-
         article = await generator_service.generate_article(
-            world_name, title, session, background_tasks, user_instructions=description
+            world_name,
+            title,
+            session,
+            background_tasks,
+            user_instructions=description,
         )
         return RedirectResponse(
             url=f"/world/{world_name}/wiki/{article.title}", status_code=303
@@ -262,17 +398,23 @@ async def get_wiki_page(
     title: str,
     background_tasks: BackgroundTasks,
     skip_validation: Optional[bool] = Query(False, alias="skip-validation"),
+    async_session: AsyncSession = Depends(get_async_session),
 ):
-    session_gen = get_session(world_name)
-    session = next(session_gen)
+    from app.core.prefetch import prefetch_service
 
-    try:
-        # Try to find existing
-        statement = select(Article).where(Article.title == title)
-        article = session.exec(statement).first()
+    # Try to find existing
+    statement = select(Article).where(Article.title == title)
+    article = (await async_session.exec(statement)).first()
 
-        if not article:
-            # Generate if not found
+    if not article and await prefetch_service.wait_for(world_name, title):
+        # A speculative generation of this page just finished
+        article = (await async_session.exec(statement)).first()
+
+    if not article:
+        # Generate if not found
+        session_gen = get_session(world_name)
+        session = next(session_gen)
+        try:
             article = await generator_service.generate_article(
                 world_name,
                 title,
@@ -280,41 +422,41 @@ async def get_wiki_page(
                 background_tasks,
                 skip_validation=skip_validation,
             )
+        finally:
+            session.close()
 
-            # If deduplication returned a different article, redirect to it
-            if article.title != title:
-                return RedirectResponse(
-                    url=f"/world/{world_name}/wiki/{article.title}", status_code=303
-                )
+        # If deduplication returned a different article, redirect to it
+        if article.title != title:
+            return RedirectResponse(
+                url=f"/world/{world_name}/wiki/{article.title}", status_code=303
+            )
 
-        # Auto-link content
-        from app.core.linker import linker_service
+    from app.core.pages import existence_candidates, render_article_content
 
-        linked_content = linker_service.autolink_content(
-            world_name, article.content, session
-        )
+    # Resolve every existence check on the page (auto-links + related entities)
+    # with a single query
+    candidates = existence_candidates(world_name, article)
+    existing_titles = set()
+    if candidates:
+        statement = select(Article.title).where(Article.title.in_(candidates))
+        existing_titles = set((await async_session.exec(statement)).all())
 
-        # Convert Markdown to HTML (allow raw HTML for red links)
-        html_content = markdown.markdown(linked_content, extensions=["extra"])
+    html_content, related = render_article_content(world_name, article, existing_titles)
 
-        related = json.loads(article.related_entities_json)
-        # Check existence for each related entity
-        for entity in related:
-            statement = select(Article).where(Article.title == entity["name"])
-            entity["exists"] = session.exec(statement).first() is not None
-        return templates.TemplateResponse(
-            "article.html",
-            {
-                "request": request,
-                "world_name": world_name,
-                "article": article,
-                "content_html": html_content,
-                "related_entities": related,
-                "generate_images": world_manager.get_config(world_name).generate_images,
-            },
-        )
-    finally:
-        session.close()
+    # Opt-in: start generating the red links the reader is likely to click next
+    prefetch_service.schedule(world_name, related)
+
+    return templates.TemplateResponse(
+        "article.html",
+        {
+            "request": request,
+            "world_name": world_name,
+            "article": article,
+            "content_html": html_content,
+            "related_entities": related,
+            "generate_images": world_manager.get_config(world_name).generate_images,
+        },
+    )
 
 
 @app.get("/world/{world_name}/wiki/{title}/edit", response_class=HTMLResponse)
@@ -359,11 +501,13 @@ async def save_wiki_edit(
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
 
+        from app.core.revisions import revision_service
+
         if action == "force":
             # Skip validation, just save
-            article.content = content
-            session.add(article)
+            revision_service.record_update(session, article, content, source="edit")
             session.commit()
+            reindex_queue.enqueue(world_name, article.id)
             return RedirectResponse(
                 url=f"/world/{world_name}/wiki/{title}", status_code=303
             )
@@ -376,9 +520,9 @@ async def save_wiki_edit(
         )
 
         if is_valid:
-            article.content = content
-            session.add(article)
+            revision_service.record_update(session, article, content, source="edit")
             session.commit()
+            reindex_queue.enqueue(world_name, article.id)
             return RedirectResponse(
                 url=f"/world/{world_name}/wiki/{title}", status_code=303
             )
@@ -397,6 +541,36 @@ async def save_wiki_edit(
         session.close()
 
 
+@app.post("/world/{world_name}/wiki/{title}/revisions/{revision}/restore")
+async def restore_revision(world_name: str, title: str, revision: int):
+    from app.core.revisions import revision_service
+
+    session_gen = get_session(world_name)
+    session = next(session_gen)
+    try:
+        statement = select(Article).where(Article.title == title)
+        article = session.exec(statement).first()
+        if not article:
+            raise HTTPException(status_code=404, detail="Article not found")
+
+        restored = revision_service.get_revision(session, article, revision)
+        if restored is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+
+        content, summary = restored
+        revision_service.record_update(
+            session, article, content, source="rollback", new_summary=summary
+        )
+        session.commit()
+        reindex_queue.enqueue(world_name, article.id)
+        return RedirectResponse(
+            url=f"/world/{world_name}/wiki/{title}?delta=Restored revision {revision}.",
+            status_code=303,
+        )
+    finally:
+        session.close()
+
+
 # --- Visualizer Routes ---
 
 
@@ -409,30 +583,47 @@ async def visualizers_page(request: Request, world_name: str):
 
 @app.get("/api/world/{world_name}/graph_data")
 async def get_graph_data(world_name: str):
-    from app.core.graph import graph_service
-    import networkx as nx
+    from app.core.pages import graph_data
 
-    graph = graph_service.get_graph(world_name)
-    return nx.node_link_data(graph)
+    return graph_data(world_name)
 
 
 @app.get("/api/world/{world_name}/timeline_data")
 async def get_timeline_data(world_name: str):
-    from app.core.timeline import timeline_service
+    from app.core.pages import timeline_data
 
-    events = timeline_service.get_context_events(world_name)
-    return [
-        {
-            "id": e["name"],
-            "name": e["name"],
-            "content": e["name"],
-            "year_numeric": e["year_numeric"],
-            "display_date": e["display_date"],
-            "description": e["description"],
-            "type": e.get("type", "Unknown"),
-        }
-        for e in events
-    ]
+    return timeline_data(world_name)
+
+
+@app.get("/api/world/{world_name}/search/{shard}")
+async def get_search_shard(
+    world_name: str,
+    shard: str,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Serves the same search index files the static export writes. The index is
+    built once per database state, not per shard request.
+    """
+    from app.core.pages import (
+        cache_search_index,
+        cached_search_index,
+        database_signature,
+        search_index,
+    )
+
+    signature = database_signature(world_name)
+    files = cached_search_index(world_name, signature)
+    if files is None:
+        statement = select(Article.title, Article.summary)
+        files = search_index((await session.exec(statement)).all())
+        cache_search_index(world_name, signature, files)
+    if shard in files:
+        return files[shard]
+    if len(shard) == 1:
+        # A letter no title or summary starts with
+        return {}
+    raise HTTPException(status_code=404, detail="Unknown search shard")
 
 
 @app.get("/api/world/{world_name}/timeline/year/{year}")
@@ -449,16 +640,63 @@ async def get_timeline_nearby(world_name: str, year: str, range: int = 10):
     return timeline_service.get_nearby_events(world_name, year, range)
 
 
-@app.get("/world/{world_name}/images/{filename}")
-async def get_world_image(world_name: str, filename: str):
-    import os
-    from fastapi.responses import FileResponse
+# Content-addressed images never change: cache them for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-    image_path = os.path.join(world_manager.get_images_path(world_name), filename)
-    if os.path.exists(image_path):
-        return FileResponse(image_path)
+
+def _image_response(
+    request: Request, path: str, image_hash: Optional[str], variant: str = ""
+):
+    """
+    Serves an image file with validators. FileResponse handles Range requests
+    and hands the file to the server (http.response.pathsend) where supported.
+    Hash-named images get a strong ETag derived from the hash and are cached
+    as immutable; legacy title-named files are revalidated on every use.
+    """
+    stat_result = os.stat(path)
+    if image_hash:
+        etag = f'"{image_hash}{variant}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
     else:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        cache_control = "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, stat_result=stat_result)
+
+
+@app.get("/world/{world_name}/images/{filename}")
+async def get_world_image(request: Request, world_name: str, filename: str):
+    image_path = os.path.join(world_manager.get_images_path(world_name), filename)
+    if not os.path.isfile(image_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return _image_response(request, image_path, content_hash(filename))
+
+
+@app.get("/world/{world_name}/images/derived/{encoding}/{width}/{filename}")
+async def get_world_image_derivative(
+    request: Request, world_name: str, encoding: str, width: int, filename: str
+):
+    # "<original filename>.<format>"; created on first request for older images
+    source, _, fmt = filename.rpartition(".")
+    path = await asyncio.to_thread(
+        image_derivatives.get_or_create,
+        world_manager.get_images_path(world_name),
+        source,
+        encoding,
+        width,
+        fmt,
+    )
+    if path is None:
         raise HTTPException(status_code=404, detail="Image not found")
+    return _image_response(
+        request, path, content_hash(source), variant=f"-{encoding}-{width}.{fmt}"
+    )
 
 
 # --- API Routes ---
@@ -476,7 +714,25 @@ async def generate_article_api(world_name: str, title: str):
 
 
 @app.get("/api/world/{world_name}/article/{title}", response_model=ArticleRead)
-async def get_article_api(world_name: str, title: str):
+async def get_article_api(
+    world_name: str,
+    title: str,
+    session: AsyncSession = Depends(get_async_session),
+):
+    statement = select(Article).where(Article.title == title)
+    article = (await session.exec(statement)).first()
+    if not article:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return article
+
+
+@app.get(
+    "/api/world/{world_name}/article/{title}/revisions",
+    response_model=List[ArticleRevisionRead],
+)
+async def list_revisions_api(world_name: str, title: str):
+    from app.core.revisions import revision_service
+
     session_gen = get_session(world_name)
     session = next(session_gen)
     try:
@@ -484,6 +740,28 @@ async def get_article_api(world_name: str, title: str):
         article = session.exec(statement).first()
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
-        return article
+        return revision_service.list_revisions(session, article.id)
+    finally:
+        session.close()
+
+
+@app.get("/api/world/{world_name}/article/{title}/revisions/{revision}")
+async def get_revision_api(world_name: str, title: str, revision: int):
+    from app.core.revisions import revision_service
+
+    session_gen = get_session(world_name)
+    session = next(session_gen)
+    try:
+        statement = select(Article).where(Article.title == title)
+        article = session.exec(statement).first()
+        if not article:
+            raise HTTPException(status_code=404, detail="Article not found")
+
+        restored = revision_service.get_revision(session, article, revision)
+        if restored is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+
+        content, summary = restored
+        return {"revision": revision, "summary": summary, "content": content}
     finally:
         session.close()
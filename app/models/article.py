@@ -1,4 +1,6 @@
+from datetime import datetime, timezone
 from typing import Optional, List
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
 
 class ArticleBase(SQLModel):
@@ -15,9 +17,39 @@ class Article(ArticleBase, table=True):
     # We might want to store relationships as a JSON string or separate table later
     # For now, let's keep it simple. The Graph will handle complex relations.
     related_entities_json: str = "[]" 
+    # SHA-256 of the stored image (its filename in the world's images folder)
+    image_hash: Optional[str] = Field(default=None)
 
 class ArticleCreate(ArticleBase):
     pass
 
 class ArticleRead(ArticleBase):
     id: int
+
+class ArticleRevision(SQLModel, table=True):
+    """
+    A previous version of an article's content.
+
+    The current version always lives in Article.content. Older versions are
+    stored as zlib-compressed reverse deltas against the next newer version,
+    with a full snapshot every few revisions to bound reconstruction cost.
+    """
+    __table_args__ = (UniqueConstraint("article_id", "revision"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    article_id: int = Field(index=True, foreign_key="article.id")
+    revision: int
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    source: str = "edit"  # edit, integrate, rollback
+    summary: str = ""
+    is_snapshot: bool = False
+    content_length: int = 0
+    data: bytes
+
+class ArticleRevisionRead(SQLModel):
+    revision: int
+    created_at: datetime
+    source: str
+    summary: str
+    is_snapshot: bool
+    content_length: int
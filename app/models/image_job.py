@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ImageJob(SQLModel, table=True):
+    """
+    A pending or finished image generation for an article.
+
+    Written in the same transaction as the article, so a crash between saving
+    the article and generating its image leaves a job to resume instead of an
+    article that silently never gets one.
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    article_id: int = Field(index=True, foreign_key="article.id")
+    prompt: str
+    status: str = Field(default="pending", index=True)  # pending, running, done, failed
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
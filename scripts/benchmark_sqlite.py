@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.database import get_sqlite_pragmas, install_sqlite_pragmas
+from app.models.article import Article
+
+# What world engines used before the pragma profile: SQLite defaults plus
+# Python's built-in 5s busy handler.
+DEFAULT_PROFILE = {}
+
+
+def make_engine(db_path: str, pragmas: dict):
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+    )
+    install_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def seed(engine, n_articles: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(n_articles):
+            session.add(
+                Article(
+                    title=f"Article {i}",
+                    summary=f"Summary of article {i}",
+                    content=f"Content of article {i}. " * 200,
+                )
+            )
+        session.commit()
+
+
+def run_profile(name: str, pragmas: dict, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_sqlite_") as tmp_dir:
+        db_path = os.path.join(tmp_dir, "database.db")
+        engine = make_engine(db_path, pragmas)
+        seed(engine, args.articles)
+
+        counters = {"reads": 0, "writes": 0, "locked_errors": 0}
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + args.duration
+
+        def count(key):
+            with lock:
+                counters[key] += 1
+
+        def reader():
+            rng = random.Random()
+            while time.perf_counter() < stop_at:
+                title = f"Article {rng.randrange(args.articles)}"
+                try:
+                    with Session(engine) as session:
+                        session.exec(
+                            select(Article).where(Article.title == title)
+                        ).first()
+                    count("reads")
+                except OperationalError:
+                    count("locked_errors")
+
+        def writer():
+            # Mirrors the background image update: a separate session writing one row
+            rng = random.Random()
+            while time.perf_counter() < stop_at:
+                article_id = rng.randrange(1, args.articles + 1)
+                try:
+                    with Session(engine) as session:
+                        article = session.get(Article, article_id)
+                        article.image_url = f"/images/{rng.random()}.png"
+                        session.add(article)
+                        session.commit()
+                    count("writes")
+                except OperationalError:
+                    count("locked_errors")
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        engine.dispose()
+
+    return {
+        "profile": name,
+        "pragmas": pragmas,
+        "reads_per_sec": round(counters["reads"] / elapsed, 1),
+        "writes_per_sec": round(counters["writes"] / elapsed, 1),
+        "locked_errors": counters["locked_errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare SQLite read/write throughput under concurrent access "
+        "with default settings vs. the configured pragma profile."
+    )
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="Seconds per profile"
+    )
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = [
+        run_profile("default", DEFAULT_PROFILE, args),
+        run_profile("tuned", get_sqlite_pragmas(), args),
+    ]
+
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'locked':>10}")
+    for r in results:
+        print(
+            f"{r['profile']:<10}{r['reads_per_sec']:>12}{r['writes_per_sec']:>12}{r['locked_errors']:>10}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
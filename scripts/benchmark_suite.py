@@ -0,0 +1,580 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import functools
+import subprocess
+import tempfile
+from contextvars import ContextVar
+
+# Everything runs offline against the fake provider (read when the app modules
+# are first imported), in a throwaway data dir created by main()
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+import networkx as nx
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+import app.core.fake_provider as fake_provider
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.graph import graph_service
+from app.core.generator import generator_service
+from app.core.linker import linker_service
+from app.core.llm import llm_service
+from app.core.rag import rag_service
+from app.core.validator import validator_service
+from app.core.pages import graph_data, timeline_data
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+from scripts.export_static import export_static
+
+RESULTS_VERSION = 1
+# Entities per article: the rest of the graph are red links (no article yet)
+ENTITY_RATIO = 1.5
+# Share of entities that carry a date and show up on the timeline
+DATED_RATIO = 0.3
+RELATIONS = ["allied with", "located in", "founded by", "rival of", "part of"]
+
+# Innermost stage of the generation currently running (see StageTimer)
+current_stage: ContextVar[str] = ContextVar("current_stage", default=None)
+
+
+def percentiles(samples: list) -> dict:
+    """Summary of a list of durations in seconds, reported in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(rank(0.50), 3),
+        "p95_ms": round(rank(0.95), 3),
+        "p99_ms": round(rank(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn, *args, repeat: int = 1, **kwargs):
+    """Runs fn `repeat` times; returns (last result, durations)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        durations.append(time.perf_counter() - started)
+    return result, durations
+
+
+# --- Synthetic worlds ---
+
+
+def unique_names(rng: random.Random, count: int) -> list:
+    names, seen = [], set()
+    while len(names) < count:
+        name = fake_provider.fake_name(rng)
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def synthesize_world(world_name: str, n_articles: int, seed: int) -> dict:
+    """
+    Creates a world with `n_articles` articles on a scale-free entity graph
+    (a few hubs, many leaves), cross-mentions in the article bodies, red links
+    and dated entities, and indexes the articles in Chroma.
+    """
+    rng = random.Random(seed)
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(
+        WorldConfig(
+            name=world_name,
+            description="Synthetic benchmark world.",
+            llm_model="fake-llm",
+            generate_images=False,
+        )
+    )
+    create_db_and_tables(world_name)
+    timings = {}
+
+    # 1. Graph: the first n_articles entities have articles
+    started = time.perf_counter()
+    n_entities = max(int(n_articles * ENTITY_RATIO), n_articles + 1)
+    names = unique_names(rng, n_entities)
+    shape = nx.barabasi_albert_graph(n_entities, 3, seed=seed)
+    graph = nx.Graph()
+    for i, name in enumerate(names):
+        attrs = {
+            "type": (
+                "Article"
+                if i < n_articles
+                else rng.choice(["Person", "Location", "Organization"])
+            )
+        }
+        if rng.random() < DATED_RATIO:
+            year = rng.randint(-2000, 3000)
+            attrs.update(
+                year_numeric=year,
+                display_date=f"{year} AE",
+                description=fake_provider.fake_sentence(rng),
+            )
+        graph.add_node(name, **attrs)
+    for a, b in shape.edges():
+        graph.add_edge(names[a], names[b], relation=rng.choice(RELATIONS))
+    graph_service._graphs[world_name] = graph
+    graph_service.save_graph(world_name)
+    timings["graph_s"] = time.perf_counter() - started
+
+    # 2. Articles mentioning their neighbours (auto-links and red links)
+    started = time.perf_counter()
+    articles = []
+    session = next(get_session(world_name))
+    try:
+        for name in names[:n_articles]:
+            neighbours = list(graph.neighbors(name))
+            mentions = " ".join(
+                f"{name} {rng.choice(fake_provider.VERBS)} {other}."
+                for other in neighbours[:12]
+            )
+            content = fake_provider.fake_article(rng, name) + "\n" + mentions + "\n"
+            related = [
+                {
+                    "name": other,
+                    "type": graph.nodes[other]["type"],
+                    "relation": graph.edges[name, other]["relation"],
+                }
+                for other in neighbours[:8]
+            ]
+            articles.append(
+                Article(
+                    title=name,
+                    summary=fake_provider.fake_sentence(rng),
+                    content=content,
+                    related_entities_json=json.dumps(related),
+                )
+            )
+        session.add_all(articles)
+        session.commit()
+        rows = [(a.id, a.title, a.content) for a in articles]
+    finally:
+        session.close()
+    timings["database_s"] = time.perf_counter() - started
+
+    # 3. RAG index, in batches
+    started = time.perf_counter()
+    collection = rag_service.get_collection(world_name)
+    for i in range(0, len(rows), 500):
+        batch = rows[i : i + 500]
+        collection.add(
+            documents=[content for _, _, content in batch],
+            metadatas=[{"title": title, "id": id} for id, title, _ in batch],
+            ids=[str(id) for id, _, _ in batch],
+        )
+    timings["rag_index_s"] = time.perf_counter() - started
+
+    return {
+        "articles": n_articles,
+        "entities": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "titles": [title for _, title, _ in rows],
+        "red_links": names[n_articles:],
+        "seed_seconds": {k: round(v, 3) for k, v in timings.items()},
+    }
+
+
+# --- Generation stage breakdown ---
+
+
+class StageTimer:
+    """
+    Attributes the wall time of generate_article to stages by wrapping the
+    services it calls. Nested calls (e.g. the LLM call inside validation)
+    count towards the outer stage; whatever isn't wrapped (database queries,
+    the dedup heuristics, JSON parsing) is reported as "other".
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self._patched = []
+
+    def _add(self, stage: str, seconds: float):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def wrap(self, obj, attr: str, stage):
+        original = getattr(obj, attr)
+        stage_for = stage if callable(stage) else (lambda args, kwargs: stage)
+
+        if asyncio.iscoroutinefunction(original):
+
+            @functools.wraps(original)
+            async def wrapper(*args, **kwargs):
+                if current_stage.get() is not None:
+                    return await original(*args, **kwargs)
+                name = stage_for(args, kwargs)
+                token = current_stage.set(name)
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    self._add(name, time.perf_counter() - started)
+                    current_stage.reset(token)
+
+        else:
+
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                if current_stage.get() is not None:
+                    return original(*args, **kwargs)
+                name = stage_for(args, kwargs)
+                token = current_stage.set(name)
+                started = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    self._add(name, time.perf_counter() - started)
+                    current_stage.reset(token)
+
+        setattr(obj, attr, wrapper)
+        self._patched.append((obj, attr))
+
+    def install(self):
+        json_stages = {"DeduplicationResult": "dedup", "ArticlePlan": "plan"}
+        self.wrap(
+            llm_service,
+            "generate_json",
+            lambda args, kwargs: json_stages.get(
+                getattr(kwargs.get("schema"), "__name__", ""), "llm_json"
+            ),
+        )
+        self.wrap(llm_service, "generate_text", "write")
+        self.wrap(validator_service, "validate_article_update", "validate")
+        self.wrap(rag_service, "query_context", "rag_query")
+        self.wrap(rag_service, "add_article", "rag_index")
+        self.wrap(graph_service, "get_context_subgraph", "graph_context")
+        self.wrap(graph_service, "save_graph", "graph_save")
+        return self
+
+    def uninstall(self):
+        for obj, attr in self._patched:
+            delattr(obj, attr)
+        self._patched = []
+
+
+async def _generate_all(world_name: str, titles: list, timer: StageTimer) -> list:
+    runs = []
+    session = next(get_session(world_name))
+    try:
+        for title in titles:
+            timer.totals = {}
+            started = time.perf_counter()
+            await generator_service.generate_article(world_name, title, session)
+            total = time.perf_counter() - started
+            stages = dict(timer.totals)
+            stages["other"] = max(total - sum(stages.values()), 0.0)
+            runs.append((total, stages))
+    finally:
+        session.close()
+    return runs
+
+
+def bench_generation(world_name: str, titles: list) -> dict:
+    timer = StageTimer().install()
+    try:
+        runs = asyncio.run(_generate_all(world_name, titles, timer))
+    finally:
+        timer.uninstall()
+    stage_names = sorted({stage for _, stages in runs for stage in stages})
+    return {
+        "total": percentiles([total for total, _ in runs]),
+        "stages": {
+            stage: percentiles([stages.get(stage, 0.0) for _, stages in runs])
+            for stage in stage_names
+        },
+    }
+
+
+# --- Reading paths ---
+
+
+def bench_render(client: TestClient, world_name: str, titles: list) -> dict:
+    client.get(f"/world/{world_name}/wiki/{titles[0]}")  # warm templates
+    durations = []
+    for title in titles:
+        started = time.perf_counter()
+        resp = client.get(f"/world/{world_name}/wiki/{title}")
+        durations.append(time.perf_counter() - started)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Rendering '{title}' returned {resp.status_code}")
+    return percentiles(durations)
+
+
+def bench_linker(world_name: str, titles: list) -> dict:
+    session = next(get_session(world_name))
+    try:
+        statement = select(Article.content).where(Article.title.in_(titles))
+        contents = list(session.exec(statement).all())
+    finally:
+        session.close()
+    existing = set(titles)
+    graph = graph_service.get_graph(world_name)
+
+    _, find_times = timed(
+        lambda: [linker_service.find_entities(world_name, c) for c in contents]
+    )
+    _, link_times = timed(
+        lambda: [
+            linker_service.autolink_content(world_name, c, existing_titles=existing)
+            for c in contents
+        ]
+    )
+    megabytes = sum(len(c.encode("utf-8")) for c in contents) / 1e6
+    return {
+        "entities": graph.number_of_nodes(),
+        "articles": len(contents),
+        "find_entities_articles_per_s": round(len(contents) / find_times[0], 1),
+        "autolink_articles_per_s": round(len(contents) / link_times[0], 1),
+        "autolink_mb_per_s": round(megabytes / link_times[0], 3),
+    }
+
+
+def bench_serialization(world_name: str, repeat: int) -> dict:
+    results = {}
+    for name, fn in (("graph_data", graph_data), ("timeline_data", timeline_data)):
+        data, build = timed(fn, world_name, repeat=repeat)
+        payload, dump = timed(json.dumps, data, repeat=repeat)
+        results[name] = {
+            "build": percentiles(build),
+            "json_dumps": percentiles(dump),
+            "bytes": len(payload.encode("utf-8")),
+        }
+    return results
+
+
+def bench_export(world_name: str, workers: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_site_") as output_dir:
+        for run in ("full", "incremental"):
+            started = time.perf_counter()
+            stats = export_static(
+                output_dir=output_dir,
+                workers=workers,
+                full=run == "full",
+                only_worlds=[world_name],
+            )
+            results[run] = {
+                "seconds": round(time.perf_counter() - started, 3),
+                "rendered": stats["rendered"],
+            }
+    return results
+
+
+# --- Driver ---
+
+
+def run_size(client: TestClient, n_articles: int, args) -> dict:
+    world_name = f"Bench_{n_articles}"
+    print(f"\n== {n_articles} articles ==")
+    world = synthesize_world(world_name, n_articles, args.seed)
+    print(
+        f"Seeded {world['entities']} entities, {world['edges']} edges "
+        f"in {sum(world['seed_seconds'].values()):.1f}s"
+    )
+
+    rng = random.Random(args.seed)
+    sample = rng.sample(world["titles"], min(args.samples, len(world["titles"])))
+    result = {
+        key: world[key] for key in ("articles", "entities", "edges", "seed_seconds")
+    }
+
+    if "serialize" in args.stages:
+        result["serialization"] = bench_serialization(world_name, args.repeat)
+    if "linker" in args.stages:
+        result["linker"] = bench_linker(world_name, sample)
+    if "render" in args.stages:
+        result["render"] = bench_render(client, world_name, sample)
+    if "export" in args.stages:
+        result["export"] = bench_export(world_name, args.workers)
+    if "generate" in args.stages:
+        # Generating red links, like a reader clicking through the wiki
+        titles = world["red_links"][: args.generate]
+        result["generate"] = bench_generation(world_name, titles)
+
+    if not args.keep:
+        shutil.rmtree(world_manager.get_world_path(world_name), ignore_errors=True)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(data, prefix: str = "") -> dict:
+    """{"a": {"p50_ms": 1}} -> {"a.p50_ms": 1}, numbers only."""
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix] = data
+    return flat
+
+
+def compare(results: dict, baseline_path: str, threshold: float):
+    """Prints latency metrics that moved by more than `threshold` (a fraction)."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {str(w["articles"]): flatten(w) for w in baseline.get("worlds", [])}
+    print(f"\nChanges vs {baseline_path} (rev {baseline.get('revision')}):")
+    changed = 0
+    for world in results["worlds"]:
+        before = old.get(str(world["articles"]), {})
+        for key, value in flatten(world).items():
+            # Means and tails beyond p99 are too noisy to compare
+            if not key.endswith(("p50_ms", "p99_ms", "seconds")):
+                continue
+            if not before.get(key):
+                continue
+            delta = (value - before[key]) / before[key]
+            if abs(delta) >= threshold:
+                changed += 1
+                print(
+                    f"  {world['articles']:>6} {key:<48}"
+                    f"{before[key]:>12.3f} -> {value:<12.3f}{delta:+.0%}"
+                )
+    if not changed:
+        print(f"  No timing changed by more than {threshold:.0%}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmarks (fake AI provider) of article "
+        "generation, page rendering, auto-linking, graph/timeline serialization "
+        "and static export on synthetic worlds."
+    )
+    parser.add_argument(
+        "--sizes",
+        default="100,1000,10000",
+        help="Comma-separated article counts of the synthetic worlds",
+    )
+    parser.add_argument(
+        "--stages",
+        default="serialize,linker,render,export,generate",
+        help="Comma-separated subset of serialize,linker,render,export,generate",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=200, help="Articles rendered/linked per world"
+    )
+    parser.add_argument(
+        "--generate", type=int, default=20, help="Articles generated per world"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Repetitions of serialization timings"
+    )
+    parser.add_argument(
+        "--latency",
+        default="0",
+        help="Fake provider chat latency (FAKE_LATENCY_MS format). "
+        "0 measures only the app's own overhead.",
+    )
+    parser.add_argument("--workers", type=int, help="Export worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    parser.add_argument(
+        "--compare", type=str, help="Baseline results JSON to report changes against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change reported by --compare",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the synthetic worlds afterwards"
+    )
+    args = parser.parse_args()
+    args.stages = set(args.stages.split(","))
+
+    fake_provider.chat_latency = fake_provider.LatencyDistribution(
+        args.latency, args.seed
+    )
+
+    results = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "sizes": args.sizes,
+            "samples": args.samples,
+            "generate": args.generate,
+            "latency": args.latency,
+            "seed": args.seed,
+        },
+        "worlds": [],
+    }
+    bench_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    world_manager.base_path = os.path.join(bench_dir, "worlds")
+    os.makedirs(world_manager.base_path)
+    # Export workers started with spawn import the app afresh
+    os.environ["WORLD_DATA_DIR"] = world_manager.base_path
+    try:
+        with TestClient(app) as client:
+            for size in args.sizes.split(","):
+                results["worlds"].append(run_size(client, int(size), args))
+    finally:
+        if args.keep:
+            print(f"\nSynthetic worlds kept in {world_manager.base_path}")
+        else:
+            shutil.rmtree(bench_dir, ignore_errors=True)
+
+    print(
+        f"\n{'articles':>9}{'render p50':>12}{'render p99':>12}"
+        f"{'link art/s':>12}{'graph ms':>10}{'export s':>10}{'gen p50':>10}"
+    )
+    for w in results["worlds"]:
+        render = w.get("render", {})
+        print(
+            f"{w['articles']:>9}"
+            f"{render.get('p50_ms', '-'):>12}{render.get('p99_ms', '-'):>12}"
+            f"{w.get('linker', {}).get('autolink_articles_per_s', '-'):>12}"
+            f"{w.get('serialization', {}).get('graph_data', {}).get('build', {}).get('p50_ms', '-'):>10}"
+            f"{w.get('export', {}).get('full', {}).get('seconds', '-'):>10}"
+            f"{w.get('generate', {}).get('total', {}).get('p50_ms', '-'):>10}"
+        )
+
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
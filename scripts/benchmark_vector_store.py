@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+import numpy as np
+
+# The bundled worlds' collections are read as stored, nothing is embedded
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.rag import rag_service
+from app.core.vector_store import VectorStore, normalize
+from app.core.world import world_manager
+
+BENCH_DIR = tempfile.mkdtemp(prefix="bench_vectors_")
+# Noise added to stored vectors to make queries (0 would query the vectors themselves)
+QUERY_NOISE = 0.5
+DIMENSIONS = 384
+
+
+def percentiles(samples: list) -> dict:
+    """Summary of a list of durations in seconds, reported in milliseconds."""
+    ordered = sorted(samples)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(rank(0.50), 3),
+        "p95_ms": round(rank(0.95), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def bundled_datasets(worlds=None):
+    """(name, ids, unit vectors) of each world's stored Chroma embeddings."""
+    datasets = []
+    for world_name in worlds or world_manager.list_worlds():
+        stored = rag_service.get_collection(world_name).get(include=["embeddings"])
+        rag_service.close_client(world_name)
+        if stored["ids"]:
+            datasets.append(
+                (world_name, stored["ids"], normalize(stored["embeddings"]))
+            )
+    return datasets
+
+
+def synthetic_dataset(size: int, seed: int):
+    """Clustered unit vectors, like embeddings of articles on a few hundred topics."""
+    rng = np.random.default_rng(seed)
+    topics = normalize(rng.standard_normal((max(1, size // 50), DIMENSIONS)))
+    vectors = topics[rng.integers(0, len(topics), size)]
+    vectors = normalize(vectors + 0.08 * rng.standard_normal((size, DIMENSIONS)))
+    return (f"synthetic-{size}", [str(i) for i in range(size)], vectors)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    base = vectors[rng.integers(0, len(vectors), count)]
+    noise = rng.standard_normal(base.shape) / np.sqrt(base.shape[1])
+    return normalize(base + QUERY_NOISE * noise)
+
+
+def exact_top_k(vectors, queries, k):
+    scores = queries @ vectors.T
+    return [list(np.argsort(-row)[:k]) for row in scores]
+
+
+def recall(found, truth) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return round(hits / max(1, sum(len(t) for t in truth)), 4)
+
+
+def disk_bytes(*paths) -> int:
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        elif os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def bench_chroma(name, ids, vectors, queries, k):
+    import chromadb
+
+    path = os.path.join(BENCH_DIR, "chroma", name)
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection("bench", embedding_function=None)
+    started = time.perf_counter()
+    for offset in range(0, len(ids), 5000):
+        collection.add(
+            ids=ids[offset : offset + 5000], embeddings=vectors[offset : offset + 5000]
+        )
+    build = time.perf_counter() - started
+
+    rows = {id: row for row, id in enumerate(ids)}
+    found, durations = [], []
+    for query in queries:
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k)
+        durations.append(time.perf_counter() - started)
+        found.append([rows[id] for id in result["ids"][0]])
+    if hasattr(client, "close"):
+        client.close()
+    return found, durations, build, disk_bytes(path)
+
+
+def bench_numpy(name, ids, vectors, queries, k, dtype, ann_threshold, probes):
+    path = os.path.join(BENCH_DIR, "numpy", f"{name}-{dtype}-{ann_threshold}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    store = VectorStore(path, dtype=dtype, ann_threshold=0, probes=probes)
+    started = time.perf_counter()
+    for offset in range(0, len(ids), 5000):
+        store.upsert(ids[offset : offset + 5000], vectors[offset : offset + 5000])
+    if ann_threshold and len(ids) >= ann_threshold:
+        store.build_index()
+    build = time.perf_counter() - started
+    store.close()
+
+    # Reopened like after a restart: the vectors are mapped, not read
+    started = time.perf_counter()
+    store = VectorStore(path, probes=probes)
+    opened = time.perf_counter() - started
+
+    rows = {id: row for row, id in enumerate(ids)}
+    found, durations, scanned = [], [], []
+    for query in queries:
+        started = time.perf_counter()
+        result = store.query(query, k)
+        durations.append(time.perf_counter() - started)
+        found.append([rows[id] for id in result["ids"]])
+        scanned.append(store.scanned)
+    store.close()
+    size = disk_bytes(store.vectors_path, store.log_path, store.index_path)
+    return found, durations, build, size, opened, float(np.mean(scanned))
+
+
+def run_dataset(name, ids, vectors, args) -> dict:
+    queries = make_queries(vectors, args.queries, args.seed)
+    k = min(args.k, len(ids))
+    truth = exact_top_k(vectors, queries, k)
+    result = {"dataset": name, "vectors": len(ids), "k": k, "backends": {}}
+
+    found, durations, build, size = bench_chroma(name, ids, vectors, queries, k)
+    result["backends"]["chroma-hnsw"] = {
+        "recall": recall(found, truth),
+        "query": percentiles(durations),
+        "build_s": round(build, 3),
+        "disk_bytes": size,
+    }
+    variants = [("float16", 0), ("int8", 0)]
+    if len(ids) >= args.ann_min:
+        variants += [("float16", args.ann_min), ("int8", args.ann_min)]
+    for dtype, ann_threshold in variants:
+        found, durations, build, size, opened, scanned = bench_numpy(
+            name, ids, vectors, queries, k, dtype, ann_threshold, args.probes
+        )
+        label = f"numpy-{dtype}" + ("-ivf" if ann_threshold else "")
+        result["backends"][label] = {
+            "recall": recall(found, truth),
+            "query": percentiles(durations),
+            "build_s": round(build, 3),
+            "open_ms": round(opened * 1000, 3),
+            "scanned": round(scanned, 1),
+            "disk_bytes": size,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall and latency of the NumPy vector store against Chroma, "
+        "on the bundled worlds' stored embeddings and synthetic clustered vectors."
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Bundled world to include (repeatable, default: all)",
+    )
+    parser.add_argument(
+        "--synthetic",
+        default="10000,50000",
+        help="Comma-separated sizes of synthetic datasets (empty for none)",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Queries per dataset")
+    parser.add_argument("--k", type=int, default=3, help="Results per query")
+    parser.add_argument(
+        "--probes", type=int, default=16, help="IVF clusters scanned per query"
+    )
+    parser.add_argument(
+        "--ann-min",
+        type=int,
+        default=10000,
+        help="Also benchmark the IVF index on datasets at least this large",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "datasets": [],
+    }
+    try:
+        datasets = bundled_datasets(args.worlds)
+        for size in filter(None, args.synthetic.split(",")):
+            datasets.append(synthetic_dataset(int(size), args.seed))
+        for name, ids, vectors in datasets:
+            print(f"{name}: {len(ids)} vectors")
+            results["datasets"].append(run_dataset(name, ids, vectors, args))
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    print(
+        f"\n{'dataset':<24}{'backend':<20}{'recall':>8}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'build s':>9}{'MB':>8}"
+    )
+    for d in results["datasets"]:
+        for backend, b in d["backends"].items():
+            print(
+                f"{d['dataset']:<24}{backend:<20}{b['recall']:>8}"
+                f"{b['query']['p50_ms']:>9}{b['query']['p95_ms']:>9}"
+                f"{b['build_s']:>9}{b['disk_bytes'] / 1e6:>8.2f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
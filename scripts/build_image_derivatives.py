@@ -0,0 +1,50 @@
+import sys
+import os
+import argparse
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.images import image_derivatives
+from app.core.world import world_manager
+
+
+def build_image_derivatives(worlds=None) -> dict:
+    """Creates the missing resized variants of every image in the given worlds."""
+    if not image_derivatives.enabled:
+        print("No image derivative widths/formats configured, nothing to do.")
+        return {}
+
+    totals = {"images": 0, "created": 0, "failed": 0}
+    for world in worlds or world_manager.list_worlds():
+        stats = image_derivatives.backfill(world_manager.get_images_path(world))
+        print(
+            f"{world}: {stats['images']} images, {stats['created']} variants created"
+            + (f", {stats['failed']} failed" if stats["failed"] else "")
+        )
+        for key, value in stats.items():
+            totals[key] += value
+
+    print(
+        f"Done: {totals['created']} variants created for {totals['images']} images "
+        f"({', '.join(image_derivatives.formats)} at "
+        f"{', '.join(str(w) for w in image_derivatives.widths)}px)."
+    )
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create resized WebP/AVIF variants of existing world images"
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Only process this world (repeatable, default: all worlds)",
+    )
+    args = parser.parse_args()
+
+    totals = build_image_derivatives(args.worlds)
+    if totals.get("failed"):
+        sys.exit(1)
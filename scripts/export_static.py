@@ -1,22 +1,63 @@
 import os
 import sys
-import shutil
+import gzip
 import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import brotli
 
 # Add project root to path
 sys.path.append(os.getcwd())
 
-from fastapi.testclient import TestClient
-from app.main import app
+from fastapi.templating import Jinja2Templates
+from sqlmodel import select
+
 from app.core.world import world_manager
+from app.core.images import image_derivatives
+from app.core.pages import (
+    existence_candidates,
+    graph_data,
+    render_article_content,
+    search_index,
+    timeline_data,
+)
+from app.database import dispose_engine, get_readonly_session
 from app.models.article import Article
-from sqlmodel import select
-from app.database import get_session
 
 # Configuration
 OUTPUT_DIR = "static_site"
 # Use env var if set (e.g. from CI), otherwise default
 BASE_URL = os.getenv("BASE_URL", "/infinite-wiki")
+TEMPLATES_DIR = "app/templates"
+STATIC_DIR = "app/static"
+MANIFEST_NAME = ".export_manifest.json"
+# Bump when the output layout changes so old manifests trigger a full export
+MANIFEST_VERSION = 1
+# Files in the output root that the stale-file cleanup leaves alone
+KEEP_FILES = {".gitkeep", MANIFEST_NAME}
+# Precompressed siblings written next to every page with --compress
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+# Per-process template environment and output options, set up by _init_renderer
+_templates = None
+_compress = False
+
+
+def _init_renderer(base_url: str, compress: bool = False):
+    global _templates, _compress
+    _templates = Jinja2Templates(directory=TEMPLATES_DIR)
+    _templates.env.globals["base_url"] = base_url
+    _templates.env.globals["image_sources"] = image_derivatives.sources
+    _compress = compress
+
+
+def _render(template_name: str, context: dict) -> str:
+    # The templates don't use `request`, so they render without going through the app
+    return _templates.get_template(template_name).render(context)
 
 
 def ensure_dir(path):
@@ -24,169 +65,457 @@ def ensure_dir(path):
         os.makedirs(path)
 
 
-def save_html(path, content):
+def save_file(path, data: bytes):
     ensure_dir(os.path.dirname(path))
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(content)
+    with open(path, "wb") as f:
+        f.write(data)
+    if _compress:
+        # mtime=0 keeps the .gz output identical across runs
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
 
 
-def save_json(path, content):
-    ensure_dir(os.path.dirname(path))
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(content, f, indent=2)
+def save_html(path, content):
+    save_file(path, content.encode("utf-8"))
 
 
-def export_static():
-    print(f"Starting static export to {OUTPUT_DIR} with BASE_URL='{BASE_URL}'...")
+def save_json(path, content, compact: bool = False):
+    if compact or _compress:
+        text = json.dumps(content, separators=(",", ":"), ensure_ascii=False)
+    else:
+        text = json.dumps(content, indent=2)
+    save_file(path, text.encode("utf-8"))
 
-    # Clean output dir
-    if os.path.exists(OUTPUT_DIR):
-        shutil.rmtree(OUTPUT_DIR)
-    os.makedirs(OUTPUT_DIR)
-    # add .gitkeep just to static_site root
-    with open(os.path.join(OUTPUT_DIR, ".gitkeep"), "w+"):
-        pass
-
-    # Set BASE_URL in env for the app to pick up
-    os.environ["BASE_URL"] = BASE_URL
-    # We need to re-initialize templates or just rely on the fact that we set it in main.py
-    # But main.py runs at import time.
-    # Let's manually update the global in the imported app's templates
-    from app.main import templates
-
-    templates.env.globals["base_url"] = BASE_URL
-
-    # Patch settings to disable Auth during export
-    from app.config import get_settings
-    from unittest.mock import patch
-
-    settings = get_settings()
-    # We use a context manager to mock the settings for the duration of the client usage
-    # But TestClient is initialized with the app. The dependency is evaluated at request time.
-    # So we can patch the settings object globally or use patch.object
-
-    print("Disabling Auth for export...")
-    with (
-        patch.object(settings, "AUTH_USERNAME", None),
-        patch.object(settings, "AUTH_PASSWORD", None),
-    ):
-
-        client = TestClient(app)
-
-        # 1. Export Index
-        print("Exporting Index...")
-        resp = client.get("/")
-        if resp.status_code == 200:
-            save_html(os.path.join(OUTPUT_DIR, "index.html"), resp.text)
-        else:
-            print(f"Failed to fetch index: {resp.status_code}")
-
-        # 2. Export Worlds
-        worlds = world_manager.list_worlds()
-        for world in worlds:
-            print(f"Exporting World: {world}...")
 
-            # World Home
-            resp = client.get(f"/world/{world}")
-            if resp.status_code == 200:
-                save_html(
-                    os.path.join(OUTPUT_DIR, "world", world, "index.html"), resp.text
-                )
-            else:
-                print(f"Failed to fetch world {world}: {resp.status_code}")
-
-            # Visualizers
-            resp = client.get(f"/world/{world}/visualizers")
-            if resp.status_code == 200:
-                save_html(
-                    os.path.join(
-                        OUTPUT_DIR, "world", world, "visualizers", "index.html"
-                    ),
-                    resp.text,
-                )
+def output_files(path: str, compress: bool) -> list:
+    """A page's path plus, with --compress, its precompressed siblings."""
+    paths = [os.path.normpath(path)]
+    if compress:
+        paths.extend(paths[0] + suffix for suffix in COMPRESSED_SUFFIXES)
+    return paths
 
-            # Graph Data
-            resp = client.get(f"/api/world/{world}/graph_data")
-            if resp.status_code == 200:
-                save_json(
-                    os.path.join(OUTPUT_DIR, "api", "world", world, "graph_data"),
-                    resp.json(),
-                )
 
-            # Timeline Data
-            resp = client.get(f"/api/world/{world}/timeline_data")
-            if resp.status_code == 200:
-                save_json(
-                    os.path.join(OUTPUT_DIR, "api", "world", world, "timeline_data"),
-                    resp.json(),
+def fingerprint(*parts) -> str:
+    data = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    if not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tree_digest(root: str) -> str:
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, root).encode("utf-8"))
+            digest.update(file_digest(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def article_output(output_dir: str, world: str, title: str) -> str:
+    # "/wiki/The Great Library" is served as "wiki/The Great Library/index.html"
+    return os.path.join(output_dir, "world", world, "wiki", title, "index.html")
+
+
+def world_outputs(output_dir: str, world: str) -> dict:
+    return {
+        "home": os.path.join(output_dir, "world", world, "index.html"),
+        "visualizers": os.path.join(
+            output_dir, "world", world, "visualizers", "index.html"
+        ),
+        "graph_data": os.path.join(output_dir, "api", "world", world, "graph_data"),
+        "timeline_data": os.path.join(
+            output_dir, "api", "world", world, "timeline_data"
+        ),
+    }
+
+
+def search_output(output_dir: str, world: str, name: str) -> str:
+    # Same URLs as the live /api/world/{world}/search/{shard} route
+    return os.path.join(output_dir, "api", "world", world, "search", name)
+
+
+# --- Rendering (runs in worker processes) ---
+
+
+def render_article_batch(
+    world: str, article_ids: list, existing_titles: set, output_dir: str
+) -> int:
+    """Renders the given articles of a world. Returns the number of pages written."""
+    generate_images = world_manager.get_config(world).generate_images
+    session = next(get_readonly_session(world))
+    try:
+        statement = select(Article).where(Article.id.in_(article_ids))
+        articles = session.exec(statement).all()
+    finally:
+        session.close()
+
+    for article in articles:
+        html_content, related = render_article_content(world, article, existing_titles)
+        page = _render(
+            "article.html",
+            {
+                "world_name": world,
+                "article": article,
+                "content_html": html_content,
+                "related_entities": related,
+                "generate_images": generate_images,
+            },
+        )
+        save_html(article_output(output_dir, world, article.title), page)
+    return len(articles)
+
+
+def render_world_pages(world: str, output_dir: str) -> int:
+    """Renders the world home, visualizers and the graph/timeline JSON."""
+    session = next(get_readonly_session(world))
+    try:
+        articles = session.exec(select(Article).order_by(Article.title)).all()
+    finally:
+        session.close()
+
+    outputs = world_outputs(output_dir, world)
+    save_html(
+        outputs["home"],
+        _render(
+            "world_overview.html",
+            {
+                "world_name": world,
+                "world_config": world_manager.get_config(world),
+                "articles": articles,
+            },
+        ),
+    )
+    save_html(
+        outputs["visualizers"], _render("visualizers.html", {"world_name": world})
+    )
+    save_json(outputs["graph_data"], graph_data(world))
+    save_json(outputs["timeline_data"], timeline_data(world))
+    return len(outputs)
+
+
+def _run_job(fn, *args):
+    return fn(*args)
+
+
+# --- Files copied as-is ---
+
+
+def sync_tree(src: str, dest: str, produced: set) -> dict:
+    """
+    Mirrors `src` into `dest` using hard links (copying when linking isn't
+    possible, e.g. across filesystems). Files that are already the same inode
+    or have the same size and mtime are left untouched.
+    """
+    stats = {"linked": 0, "copied": 0, "unchanged": 0}
+    for dirpath, _, filenames in os.walk(src):
+        for filename in filenames:
+            src_path = os.path.join(dirpath, filename)
+            dest_path = os.path.join(dest, os.path.relpath(src_path, src))
+            produced.add(os.path.normpath(dest_path))
+
+            if os.path.exists(dest_path):
+                src_stat = os.stat(src_path)
+                dest_stat = os.stat(dest_path)
+                same_inode = (src_stat.st_dev, src_stat.st_ino) == (
+                    dest_stat.st_dev,
+                    dest_stat.st_ino,
                 )
+                same_file = (src_stat.st_size, src_stat.st_mtime_ns) == (
+                    dest_stat.st_size,
+                    dest_stat.st_mtime_ns,
+                )
+                if same_inode or same_file:
+                    stats["unchanged"] += 1
+                    continue
+                os.remove(dest_path)
 
-            # Articles
-            # We need to list all articles to export them
-            # We can use the database directly since we have access
-            session_gen = get_session(world)
-            session = next(session_gen)
+            ensure_dir(os.path.dirname(dest_path))
             try:
-                statement = select(Article)
-                articles = session.exec(statement).all()
-                for article in articles:
-                    print(f"  Exporting Article: {article.title}")
-                    resp = client.get(f"/world/{world}/wiki/{article.title}")
-                    if resp.status_code == 200:
-                        # Handle URL encoding in filename if needed, but usually browser handles it.
-                        # However, for static files, we might want to be careful.
-                        # Let's just save as is for now, assuming titles are file-system safe-ish or just simple text.
-                        # If title has spaces, browser requests "Title%20Name".
-                        # We should probably save as "Title Name/index.html" to match "/wiki/Title Name"
-
-                        # Actually, if the link is /wiki/Foo%20Bar, the browser looks for folder Foo%20Bar or file Foo%20Bar.
-                        # Let's try to match the URL structure exactly.
-
-                        # If the title is "The Great Library", the URL is ".../wiki/The Great Library" (unencoded in href usually, but browser encodes it).
-                        # If we save it as "The Great Library/index.html", then ".../wiki/The Great Library" works if server does directory index.
-                        # GitHub Pages does directory index.
-
-                        safe_title = (
-                            article.title
-                        )  # .replace(" ", "%20") ? No, FS usually handles spaces.
-
-                        save_html(
-                            os.path.join(
-                                OUTPUT_DIR,
-                                "world",
-                                world,
-                                "wiki",
-                                safe_title,
-                                "index.html",
-                            ),
-                            resp.text,
-                        )
-                    else:
-                        print(
-                            f"Failed to fetch article {article.title}: {resp.status_code}"
-                        )
-            finally:
-                session.close()
-
-            # Copy Images
-            images_path = world_manager.get_images_path(world)
-            if os.path.exists(images_path):
-                # We want images at static_site/world/{world}/images
-                # The BASE_URL is for the browser, not the file system structure inside static_site
-                dest_images_path = os.path.join(OUTPUT_DIR, "world", world, "images")
-
-                if os.path.exists(dest_images_path):
-                    shutil.rmtree(dest_images_path)
-                shutil.copytree(images_path, dest_images_path)
-                print(f"  Copied images for {world}")
-
-    # 3. Copy Static Assets (if any)
-    # We don't have a static folder in app/ currently, but if we did:
-    # if os.path.exists("app/static"):
-    #     shutil.copytree("app/static", os.path.join(OUTPUT_DIR, "static"))
-
-    print("Export complete.")
+                os.link(src_path, dest_path)
+                stats["linked"] += 1
+            except OSError:
+                shutil.copy2(src_path, dest_path)
+                stats["copied"] += 1
+    return stats
+
+
+def remove_stale_files(output_dir: str, produced: set, scopes: list) -> int:
+    """Deletes files under `scopes` that this export no longer produces."""
+    removed = 0
+    for scope in scopes:
+        if not os.path.isdir(scope):
+            continue
+        for dirpath, dirnames, filenames in os.walk(scope, topdown=False):
+            for filename in filenames:
+                path = os.path.normpath(os.path.join(dirpath, filename))
+                if dirpath == output_dir and filename in KEEP_FILES:
+                    continue
+                if path not in produced:
+                    os.remove(path)
+                    removed += 1
+            if dirpath != scope and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+    return removed
+
+
+# --- Manifest ---
+
+
+def load_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def save_manifest(output_dir: str, manifest: dict):
+    fd, tmp_path = tempfile.mkstemp(
+        dir=output_dir, prefix=".export-manifest-", suffix=".json"
+    )
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_NAME))
+
+
+# --- Export ---
+
+
+def plan_world(world: str, site_fingerprint: str, output_dir: str, previous: dict):
+    """
+    Fingerprints every page of a world and decides what needs rendering.
+    An article's fingerprint covers its own fields plus the entities it links
+    to and whether they exist, so a new article only re-renders the pages
+    that mention it.
+    """
+    session = next(get_readonly_session(world))
+    try:
+        articles = session.exec(select(Article)).all()
+    finally:
+        session.close()
+
+    titles = {article.title for article in articles}
+    config_digest = file_digest(world_manager.get_config_path(world))
+    article_fingerprints = {}
+    stale_ids = []
+    previous_articles = previous.get("articles", {})
+    for article in articles:
+        candidates = existence_candidates(world, article)
+        article_fingerprints[article.title] = fingerprint(
+            site_fingerprint,
+            config_digest,
+            article.model_dump(),
+            sorted(candidates),
+            sorted(candidates & titles),
+        )
+        if previous_articles.get(article.title) != article_fingerprints[
+            article.title
+        ] or not os.path.exists(article_output(output_dir, world, article.title)):
+            stale_ids.append(article.id)
+
+    world_fingerprint = fingerprint(
+        site_fingerprint,
+        config_digest,
+        file_digest(world_manager.get_paths(world)["graph"]),
+        article_fingerprints,
+    )
+    search_files = search_index((a.title, a.summary) for a in articles)
+    world_stale = previous.get("fingerprint") != world_fingerprint or not all(
+        os.path.exists(path)
+        for path in [
+            *world_outputs(output_dir, world).values(),
+            search_output(output_dir, world, "index"),
+        ]
+    )
+
+    # Release pooled connections before worker processes fork
+    dispose_engine(world)
+    return {
+        "entry": {"fingerprint": world_fingerprint, "articles": article_fingerprints},
+        "stale_ids": stale_ids,
+        "titles": titles,
+        "world_stale": world_stale,
+        "search_files": search_files,
+    }
+
+
+def export_static(
+    output_dir: str = OUTPUT_DIR,
+    base_url: str = BASE_URL,
+    workers: int = None,
+    full: bool = False,
+    only_worlds: list = None,
+    batch_size: int = 100,
+    compress: bool = False,
+):
+    print(f"Starting static export to {output_dir} with BASE_URL='{base_url}'...")
+    output_dir = os.path.normpath(output_dir)
+    ensure_dir(output_dir)
+    # add .gitkeep just to static_site root
+    gitkeep = os.path.join(output_dir, ".gitkeep")
+    if not os.path.exists(gitkeep):
+        with open(gitkeep, "w+"):
+            pass
+
+    # Templates, base_url and the output format affect every page
+    site_fingerprint = fingerprint(tree_digest(TEMPLATES_DIR), base_url, compress)
+    manifest = {} if full else load_manifest(output_dir)
+    previous_worlds = manifest.get("worlds", {})
+
+    all_worlds = world_manager.list_worlds()
+    worlds = [w for w in all_worlds if not only_worlds or w in only_worlds]
+
+    workers = workers or os.cpu_count() or 1
+    _init_renderer(base_url, compress)
+    produced = set()
+    new_worlds = {w: entry for w, entry in previous_worlds.items() if w in all_worlds}
+    jobs = []
+
+    # 1. Fingerprint everything and decide what needs rendering
+    rendered = 0
+    for world in worlds:
+        plan = plan_world(
+            world, site_fingerprint, output_dir, previous_worlds.get(world, {})
+        )
+        stale_ids, titles = plan["stale_ids"], plan["titles"]
+        new_worlds[world] = plan["entry"]
+        for path in world_outputs(output_dir, world).values():
+            produced.update(output_files(path, compress))
+        for title in titles:
+            produced.update(
+                output_files(article_output(output_dir, world, title), compress)
+            )
+        for name in plan["search_files"]:
+            produced.update(
+                output_files(search_output(output_dir, world, name), compress)
+            )
+        print(
+            f"Exporting World: {world} "
+            f"({len(stale_ids)} of {len(titles)} articles changed)"
+        )
+        if plan["world_stale"]:
+            jobs.append((render_world_pages, world, output_dir))
+            # The search index is small, it's written right away
+            for name, payload in plan["search_files"].items():
+                save_json(search_output(output_dir, world, name), payload, True)
+            rendered += len(plan["search_files"])
+        for start in range(0, len(stale_ids), batch_size):
+            batch = stale_ids[start : start + batch_size]
+            jobs.append((render_article_batch, world, batch, titles, output_dir))
+
+    # 2. Render (in parallel across worlds and article batches)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_renderer,
+            initargs=(base_url, compress),
+        ) as pool:
+            futures = [pool.submit(_run_job, *job) for job in jobs]
+            rendered += sum(future.result() for future in futures)
+    else:
+        rendered += sum(_run_job(*job) for job in jobs)
+
+    index_path = os.path.join(output_dir, "index.html")
+    index_fingerprint = fingerprint(site_fingerprint, all_worlds)
+    if manifest.get("index") != index_fingerprint or not os.path.exists(index_path):
+        save_html(index_path, _render("index.html", {"worlds": all_worlds}))
+        rendered += 1
+    produced.update(output_files(index_path, compress))
+
+    # 3. Images and static assets are hard linked, unchanged files are skipped
+    file_stats = sync_tree(STATIC_DIR, os.path.join(output_dir, "static"), produced)
+    for world in worlds:
+        images_path = world_manager.get_images_path(world)
+        if os.path.exists(images_path):
+            # We want images at static_site/world/{world}/images
+            output_images = os.path.join(output_dir, "world", world, "images")
+            stats = sync_tree(images_path, output_images, produced)
+            for key, value in stats.items():
+                file_stats[key] += value
+            # The pages' srcset points at the resized variants. Missing ones are
+            # created in the output, the export never writes to the worlds.
+            image_derivatives.backfill(images_path, dest_dir=output_images)
+            for filename in image_derivatives.originals(images_path):
+                for path in image_derivatives.variant_paths(output_images, filename):
+                    if os.path.exists(path):
+                        produced.add(os.path.normpath(path))
+
+    # 4. Remove pages of deleted articles/worlds and images that are gone
+    if only_worlds:
+        scopes = [os.path.join(output_dir, "static")]
+        for world in worlds:
+            scopes.append(os.path.join(output_dir, "world", world))
+            scopes.append(os.path.join(output_dir, "api", "world", world))
+    else:
+        scopes = [output_dir]
+    removed = remove_stale_files(output_dir, produced, scopes)
+
+    save_manifest(
+        output_dir,
+        {
+            "version": MANIFEST_VERSION,
+            "index": index_fingerprint,
+            "worlds": new_worlds,
+        },
+    )
+
+    print(
+        f"Export complete: {rendered} files rendered, "
+        f"{file_stats['linked']} linked, {file_stats['copied']} copied, "
+        f"{file_stats['unchanged']} unchanged, {removed} removed."
+    )
+    return {"rendered": rendered, "removed": removed, **file_stats}
 
 
 if __name__ == "__main__":
-    export_static()
+    parser = argparse.ArgumentParser(description="Export worlds to a static site")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Output directory")
+    parser.add_argument("--base-url", default=BASE_URL, help="URL prefix of the site")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Render processes (default: CPU count, 1 renders inline)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the manifest and re-render every page",
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Only export this world (repeatable)",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Minify JSON and write precompressed .gz/.br siblings of every page",
+    )
+    args = parser.parse_args()
+
+    export_static(
+        output_dir=args.output,
+        base_url=args.base_url,
+        workers=args.workers,
+        full=args.full,
+        only_worlds=args.worlds,
+        compress=args.compress,
+    )
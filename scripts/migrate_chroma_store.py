@@ -0,0 +1,108 @@
+import sys
+import os
+import shutil
+import argparse
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.rag import COLLECTION_NAME, collection_name, rag_service
+from app.core.world import world_manager
+
+# Documents copied per request, embeddings included (nothing is re-embedded)
+PAGE_SIZE = 500
+
+
+def migrate_world(world_name: str, dry_run: bool = False, keep_files=False) -> dict:
+    """
+    Copies a world's per-world Chroma collection into the shared store, then
+    removes its chroma_db folder once the shared collection holds every
+    document.
+    """
+    import chromadb
+
+    stats = {"documents": 0, "removed": False}
+    path = world_manager.get_paths(world_name)["chroma"]
+    if not os.path.isdir(path):
+        return stats
+
+    # The world's own client must not stay cached by the app's RAG service
+    rag_service.close_client(world_name)
+    source_client = chromadb.PersistentClient(path=path)
+    try:
+        try:
+            source = source_client.get_collection(
+                COLLECTION_NAME, embedding_function=rag_service.embedding_function()
+            )
+        except Exception:
+            source = None
+        total = source.count() if source is not None else 0
+        stats["documents"] = total
+        if dry_run:
+            return stats
+
+        if source is not None:
+            target = rag_service.shared_client().get_or_create_collection(
+                name=collection_name(world_name),
+                embedding_function=rag_service.embedding_function(),
+            )
+            for offset in range(0, total, PAGE_SIZE):
+                page = source.get(
+                    include=["documents", "metadatas", "embeddings"],
+                    limit=PAGE_SIZE,
+                    offset=offset,
+                )
+                target.upsert(
+                    ids=page["ids"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
+                    embeddings=page["embeddings"],
+                )
+            if target.count() < total:
+                print(
+                    f"  {world_name}: shared collection is incomplete, kept chroma_db"
+                )
+                return stats
+    finally:
+        if hasattr(source_client, "close"):
+            source_client.close()
+
+    if not keep_files:
+        shutil.rmtree(path)
+        stats["removed"] = True
+    return stats
+
+
+def migrate_chroma_store(worlds=None, dry_run: bool = False, keep_files=False):
+    for world in worlds or world_manager.list_worlds():
+        stats = migrate_world(world, dry_run=dry_run, keep_files=keep_files)
+        print(
+            f"{world}: {stats['documents']} documents "
+            f"{'to migrate' if dry_run else 'migrated'}"
+            f"{', chroma_db removed' if stats['removed'] else ''}"
+        )
+    if not dry_run:
+        print('Set CHROMA_STORAGE="shared" to use the shared store.')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Move per-world Chroma folders into one shared Chroma store"
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Only migrate this world (repeatable, default: all worlds)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be migrated"
+    )
+    parser.add_argument(
+        "--keep-files",
+        action="store_true",
+        help="Keep the per-world chroma_db folders (e.g. to switch back)",
+    )
+    args = parser.parse_args()
+
+    migrate_chroma_store(args.worlds, dry_run=args.dry_run, keep_files=args.keep_files)
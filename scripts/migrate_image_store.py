@@ -0,0 +1,113 @@
+import sys
+import os
+import glob
+import argparse
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlmodel import select
+
+from app.core.images import DERIVED_DIR, content_hash, ingest_file
+from app.core.world import world_manager
+from app.database import get_session
+from app.models.article import Article
+
+
+def migrate_world(world_name: str, dry_run: bool = False, keep_files=False) -> dict:
+    """
+    Moves a world's title-named images to the content-addressed store and
+    points their articles at the new files.
+    """
+    stats = {"migrated": 0, "missing": 0, "removed": 0}
+    images_dir = world_manager.get_images_path(world_name)
+    prefix = f"/world/{world_name}/images/"
+    legacy_files = set()
+
+    session = next(get_session(world_name))
+    try:
+        articles = session.exec(
+            select(Article).where(Article.image_url.startswith(prefix))
+        ).all()
+        for article in articles:
+            filename = article.image_url[len(prefix) :]
+            digest = content_hash(filename)
+            if digest is not None:
+                # Already content-addressed; fill in the hash if it's missing
+                if article.image_hash != digest:
+                    article.image_hash = digest
+                    session.add(article)
+                continue
+
+            path = os.path.join(images_dir, filename)
+            if not os.path.isfile(path):
+                print(f"  {article.title}: {filename} is missing, skipped")
+                stats["missing"] += 1
+                continue
+            if dry_run:
+                stats["migrated"] += 1
+                continue
+
+            digest, new_filename = ingest_file(images_dir, path)
+            article.image_url = prefix + new_filename
+            article.image_hash = digest
+            session.add(article)
+            legacy_files.add(filename)
+            stats["migrated"] += 1
+
+        if not dry_run:
+            session.commit()
+    finally:
+        session.close()
+
+    # Only after the articles point at the new files
+    if not keep_files:
+        for filename in legacy_files:
+            # derived/<encoding>/<width>/, and derived/<width>/ from before the
+            # encoder settings were part of the path
+            variants = [
+                path
+                for pattern in ("*/*", "*")
+                for path in glob.glob(
+                    os.path.join(
+                        images_dir, DERIVED_DIR, pattern, glob.escape(filename) + ".*"
+                    )
+                )
+                if os.path.isfile(path)
+            ]
+            for path in [os.path.join(images_dir, filename)] + variants:
+                os.remove(path)
+            stats["removed"] += 1
+    return stats
+
+
+def migrate_image_store(worlds=None, dry_run: bool = False, keep_files=False):
+    for world in worlds or world_manager.list_worlds():
+        stats = migrate_world(world, dry_run=dry_run, keep_files=keep_files)
+        print(
+            f"{world}: {stats['migrated']} images {'to migrate' if dry_run else 'migrated'}, "
+            f"{stats['missing']} missing, {stats['removed']} legacy files removed"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rename title-named world images to their content hash"
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Only migrate this world (repeatable, default: all worlds)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be migrated"
+    )
+    parser.add_argument(
+        "--keep-files",
+        action="store_true",
+        help="Keep the title-named files (e.g. while an old static export links them)",
+    )
+    args = parser.parse_args()
+
+    migrate_image_store(args.worlds, dry_run=args.dry_run, keep_files=args.keep_files)
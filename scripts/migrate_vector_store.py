@@ -0,0 +1,62 @@
+import sys
+import os
+import argparse
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.rag import rag_service
+from app.core.vector_store import VectorStore, copy_collection
+from app.core.world import world_manager
+
+
+def migrate_world(world_name: str, dry_run: bool = False) -> dict:
+    """
+    Copies a world's Chroma collection, embeddings included, into its NumPy
+    vector store. Chroma's files are left in place to allow switching back.
+    """
+    # Collections are Chroma's whatever RAG_BACKEND is set to
+    collection = rag_service.get_collection(world_name)
+    stats = {"documents": collection.count(), "stored": 0}
+    try:
+        if not dry_run:
+            store = VectorStore(world_manager.get_paths(world_name)["vectors"])
+            copy_collection(collection, store)
+            stats["stored"] = len(store)
+            store.close()
+    finally:
+        # Also drops the app's handle on the store, which is stale now
+        rag_service.close_client(world_name)
+    return stats
+
+
+def migrate_vector_store(worlds=None, dry_run: bool = False):
+    for world in worlds or world_manager.list_worlds():
+        stats = migrate_world(world, dry_run=dry_run)
+        if dry_run:
+            print(f"{world}: {stats['documents']} documents to copy")
+        else:
+            print(
+                f"{world}: {stats['documents']} documents copied, "
+                f"{stats['stored']} in the vector store"
+            )
+    if not dry_run:
+        print('Set RAG_BACKEND="numpy" to use the vector stores.')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Copy Chroma collections into memory-mapped NumPy vector stores"
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Only copy this world (repeatable, default: all worlds)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be copied"
+    )
+    args = parser.parse_args()
+
+    migrate_vector_store(args.worlds, dry_run=args.dry_run)
@@ -0,0 +1,109 @@
+import sys
+import os
+import time
+import argparse
+import threading
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.indexes import INDEXES, index_service
+from app.core.world import world_manager
+
+_print_lock = threading.Lock()
+_last_printed = {}
+
+
+def print_progress(world: str, index: str, done: int, total: int):
+    # At most every second per world, plus when an index is complete
+    now = time.monotonic()
+    if done < total and now - _last_printed.get(world, 0) < 1:
+        return
+    _last_printed[world] = now
+    with _print_lock:
+        print(f"  {world}: {index} {done}/{total}")
+
+
+def print_report(report: dict):
+    rag, graph = report["rag"], report["graph"]
+    print(
+        f"{report['world']}: {report['articles']} articles, "
+        f"{'consistent' if report['consistent'] else 'INCONSISTENT'}"
+    )
+    print(
+        f"  rag ({rag['backend']}): {rag['indexed']} indexed, "
+        f"{len(rag['missing'])} missing, {len(rag['stale'])} stale, "
+        f"{len(rag['orphaned'])} orphaned"
+    )
+    print(
+        f"  graph: {graph['nodes']} nodes, {len(graph['missing_nodes'])} missing "
+        f"article nodes, {len(graph['missing_edges'])} missing relations, "
+        f"{len(graph['orphaned'])} article nodes without an article"
+    )
+
+
+def rebuild_indexes(
+    worlds=None, indexes=INDEXES, full=False, verify_only=False, workers=None
+) -> bool:
+    """Verifies (and unless `verify_only` repairs) the worlds' derived indexes."""
+    worlds = worlds or world_manager.list_worlds()
+    reports = [index_service.verify(world) for world in worlds]
+    for report in reports:
+        print_report(report)
+    if verify_only:
+        return all(report["consistent"] for report in reports)
+
+    # Consistent worlds are skipped, unless everything is re-embedded anyway
+    todo = [r["world"] for r in reports if full or not r["consistent"]]
+    if not todo:
+        print("Nothing to rebuild.")
+        return True
+    print(f"Rebuilding {', '.join(indexes)} for {len(todo)} world(s)...")
+    started = time.perf_counter()
+    results = index_service.rebuild_worlds(
+        todo, indexes, full=full, on_progress=print_progress, workers=workers
+    )
+    for world, result in results.items():
+        print(f"{world}: {result}")
+    print(f"Done in {time.perf_counter() - started:.1f}s.")
+    return not any("error" in result for result in results.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Verify the RAG index and graph of worlds against their "
+        "articles, and rebuild what has drifted"
+    )
+    parser.add_argument(
+        "--world",
+        action="append",
+        dest="worlds",
+        help="Only process this world (repeatable, default: all worlds)",
+    )
+    parser.add_argument(
+        "--index",
+        action="append",
+        dest="indexes",
+        choices=INDEXES,
+        help="Only rebuild this index (repeatable, default: all)",
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="Only report, exit 1 if inconsistent"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-embed every article, not only missing and stale ones",
+    )
+    parser.add_argument("--workers", type=int, help="Worlds rebuilt in parallel")
+    args = parser.parse_args()
+
+    ok = rebuild_indexes(
+        args.worlds,
+        tuple(args.indexes or INDEXES),
+        full=args.full,
+        verify_only=args.verify,
+        workers=args.workers,
+    )
+    if not ok:
+        sys.exit(1)
@@ -1,33 +1,326 @@
 import asyncio
 import sys
 import os
+import json
+import time
 import argparse
+import tempfile
+from collections import deque
 
 # Add project root to path
 sys.path.append(os.getcwd())
 
+from sqlmodel import select
+
 from app.core.generator import generator_service
+from app.core.llm import llm_service, RateLimiter
+from app.core.pages import existence_candidates
+from app.core.world import world_manager
 from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+CHECKPOINT_NAME = "crawl_checkpoint.json"
+
+
+class WikiCrawler:
+    """
+    Breadth-first crawl from a seed article: every generated article enqueues
+    the entities it links to (related entities and red links) that don't have
+    an article yet. Progress is checkpointed after every article so an
+    interrupted crawl resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        world_name: str,
+        max_articles: int = 50,
+        max_depth: int = 3,
+        concurrency: int = 2,
+        checkpoint_path: str = None,
+        skip_validation: bool = False,
+        llm_concurrency: int = 4,
+        requests_per_minute: int = 0,
+    ):
+        self.world_name = world_name
+        self.max_articles = max_articles
+        self.max_depth = max_depth
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_path = checkpoint_path or os.path.join(
+            world_manager.get_world_path(world_name), CHECKPOINT_NAME
+        )
+        self.skip_validation = skip_validation
+        self.limiter = RateLimiter(
+            max_concurrency=llm_concurrency, requests_per_minute=requests_per_minute
+        )
+
+        self.frontier = deque()
+        self.seen = set()
+        self.in_flight = {}
+        self.failed = {}
+        self.generated = 0
+        self.previously_generated = 0
+        self.existing_titles = set()
+        self._changed = None
+
+    # --- Checkpointing ---
+
+    def load_checkpoint(self) -> bool:
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.frontier = deque((title, depth) for title, depth in state["frontier"])
+        self.seen = set(state["seen"])
+        self.failed = state.get("failed", {})
+        self.previously_generated = state.get("generated", 0)
+        return True
+
+    def save_checkpoint(self):
+        # Articles still being generated go back to the front of the queue
+        frontier = [[t, d] for t, d in self.in_flight.items()]
+        frontier.extend([t, d] for t, d in self.frontier)
+        state = {
+            "world": self.world_name,
+            "frontier": frontier,
+            "seen": sorted(self.seen),
+            "failed": self.failed,
+            "generated": self.previously_generated + self.generated,
+        }
+        directory = os.path.dirname(self.checkpoint_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".crawl-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- Crawl ---
+
+    def enqueue(self, title: str, depth: int):
+        title = title.strip().lstrip("#").strip()
+        if not title or title in self.seen or depth > self.max_depth:
+            return
+        self.seen.add(title)
+        self.frontier.append((title, depth))
+
+    def discover(self, article: Article, depth: int):
+        """Queues the article's unresolved links one level deeper."""
+        for title in sorted(existence_candidates(self.world_name, article)):
+            if title not in self.existing_titles:
+                self.enqueue(title, depth + 1)
+
+    async def _next_item(self):
+        async with self._changed:
+            while True:
+                budget = self.max_articles - self.generated - len(self.in_flight)
+                if self.frontier and budget > 0:
+                    title, depth = self.frontier.popleft()
+                    self.in_flight[title] = depth
+                    return title, depth
+                if not self.in_flight:
+                    # Nothing queued and nothing running that could add more
+                    return None
+                await self._changed.wait()
+
+    async def _process(self, title: str, depth: int):
+        session = next(get_session(self.world_name))
+        try:
+            existing = session.exec(
+                select(Article).where(Article.title == title)
+            ).first()
+            if existing:
+                # Already written (e.g. the seed or a resumed crawl): only expand it
+                self.discover(existing, depth)
+                return
+
+            started = time.monotonic()
+            article = await generator_service.generate_article(
+                self.world_name,
+                title,
+                session,
+                skip_validation=self.skip_validation,
+            )
+            if article.title in self.existing_titles:
+                print(f"  '{title}' resolved to existing article '{article.title}'")
+            else:
+                self.generated += 1
+                self.existing_titles.add(article.title)
+                print(
+                    f"[{self.generated}/{self.max_articles}] Generated '{article.title}' "
+                    f"(depth {depth}, {time.monotonic() - started:.1f}s)"
+                )
+            self.discover(article, depth)
+        except Exception as e:
+            print(f"Error generating '{title}': {e}")
+            self.failed[title] = str(e)
+        finally:
+            session.close()
+
+    async def _worker(self):
+        while True:
+            item = await self._next_item()
+            if item is None:
+                return
+            title, depth = item
+            try:
+                await self._process(title, depth)
+            finally:
+                async with self._changed:
+                    self.in_flight.pop(title, None)
+                    self.save_checkpoint()
+                    self._changed.notify_all()
+
+    async def run(self, seed: str = None, resume: bool = True) -> dict:
+        create_db_and_tables(self.world_name)
+        session = next(get_session(self.world_name))
+        try:
+            self.existing_titles = set(session.exec(select(Article.title)).all())
+        finally:
+            session.close()
+
+        if resume and self.load_checkpoint():
+            print(
+                f"Resuming crawl of '{self.world_name}': {len(self.frontier)} queued, "
+                f"{self.previously_generated} generated so far."
+            )
+        elif not seed:
+            raise ValueError("A seed topic is required when there is no checkpoint.")
+        if seed:
+            self.enqueue(seed, 0)
+
+        self._changed = asyncio.Condition()
+        # The crawl's own limits apply only while it runs
+        previous_limiter, llm_service.limiter = llm_service.limiter, self.limiter
+        usage_before = llm_service.usage_stats()
+        started = time.monotonic()
+
+        try:
+            await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+        finally:
+            llm_service.limiter = previous_limiter
+
+        elapsed = time.monotonic() - started
+        usage = llm_service.usage_stats()
+        tokens = usage["total_tokens"] - usage_before["total_tokens"]
+        stats = {
+            "generated": self.generated,
+            "failed": len(self.failed),
+            "queued": len(self.frontier),
+            "elapsed_seconds": round(elapsed, 2),
+            "articles_per_minute": (
+                round(self.generated / elapsed * 60, 2) if elapsed > 0 else 0.0
+            ),
+            "llm_requests": usage["requests"] - usage_before["requests"],
+            "tokens": tokens,
+            "tokens_per_article": (
+                round(tokens / self.generated) if self.generated else 0
+            ),
+        }
+        return stats
+
+
+async def seed_wiki(
+    world_name: str,
+    topic: str = None,
+    max_articles: int = 50,
+    max_depth: int = 3,
+    concurrency: int = 2,
+    checkpoint_path: str = None,
+    resume: bool = True,
+    skip_validation: bool = False,
+    llm_concurrency: int = 4,
+    requests_per_minute: int = 0,
+):
+    if not os.path.exists(world_manager.get_world_path(world_name)):
+        print(f"World '{world_name}' does not exist. Create it in the app first.")
+        return None
+
+    print(f"Seeding world '{world_name}' starting from: {topic or '(checkpoint)'}")
+    crawler = WikiCrawler(
+        world_name,
+        max_articles=max_articles,
+        max_depth=max_depth,
+        concurrency=concurrency,
+        checkpoint_path=checkpoint_path,
+        skip_validation=skip_validation,
+        llm_concurrency=llm_concurrency,
+        requests_per_minute=requests_per_minute,
+    )
+    stats = await crawler.run(topic, resume=resume)
+
+    print(
+        f"Crawl finished: {stats['generated']} articles in {stats['elapsed_seconds']}s "
+        f"({stats['articles_per_minute']} articles/min, "
+        f"{stats['tokens_per_article']} tokens/article, "
+        f"{stats['failed']} failed, {stats['queued']} still queued)."
+    )
+    print(f"Checkpoint: {crawler.checkpoint_path}")
+    return stats
 
-async def seed_wiki(topic: str):
-    print(f"Seeding wiki with topic: {topic}")
-    create_db_and_tables()
-    session_gen = get_session()
-    session = next(session_gen)
-    
-    try:
-        article = await generator_service.generate_article(topic, session)
-        print(f"Successfully generated article: {article.title}")
-        print(f"Summary: {article.summary}")
-        print(f"Image URL: {article.image_url}")
-    except Exception as e:
-        print(f"Error seeding wiki: {e}")
-    finally:
-        session.close()
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Seed the Infinite Wiki with a starting topic.")
-    parser.add_argument("topic", type=str, help="The topic of the first article.")
+    parser = argparse.ArgumentParser(
+        description="Seed a world by crawling outward from a starting topic."
+    )
+    parser.add_argument("world", type=str, help="Name of an existing world.")
+    parser.add_argument(
+        "topic",
+        type=str,
+        nargs="?",
+        help="The topic of the first article (optional when resuming).",
+    )
+    parser.add_argument(
+        "--max-articles", type=int, default=50, help="Stop after this many articles."
+    )
+    parser.add_argument(
+        "--max-depth", type=int, default=3, help="Link distance from the seed to crawl."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=2, help="Articles generated in parallel."
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=4,
+        help="Provider requests at once, across all articles (0 = unlimited).",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=int,
+        default=0,
+        help="Provider requests started per minute (0 = unlimited).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help=f"Frontier checkpoint file (default: <world>/{CHECKPOINT_NAME}).",
+    )
+    parser.add_argument(
+        "--fresh", action="store_true", help="Ignore an existing checkpoint."
+    )
+    parser.add_argument(
+        "--skip-validation",
+        action="store_true",
+        help="Skip the consistency validation pass (fewer LLM calls per article).",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the final stats as JSON."
+    )
     args = parser.parse_args()
-    
-    asyncio.run(seed_wiki(args.topic))
+
+    stats = asyncio.run(
+        seed_wiki(
+            args.world,
+            args.topic,
+            max_articles=args.max_articles,
+            max_depth=args.max_depth,
+            concurrency=args.concurrency,
+            checkpoint_path=args.checkpoint,
+            resume=not args.fresh,
+            skip_validation=args.skip_validation,
+            llm_concurrency=args.llm_concurrency,
+            requests_per_minute=args.requests_per_minute,
+        )
+    )
+    if stats and args.output:
+        with open(args.output, "w") as f:
+            json.dump(stats, f, indent=2)
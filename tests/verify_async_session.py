@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import json
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.graph import graph_service
+from app.database import create_db_and_tables, get_session, get_async_session
+from app.models.article import Article
+
+
+def verify_async_session():
+    print("Starting Async Session Verification...")
+
+    world_name = "TestWorld_Async"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+
+    session = next(get_session(world_name))
+    try:
+        session.add(
+            Article(
+                title="Harbor",
+                summary="The harbor.",
+                content="The Harbor is guarded by the Lighthouse and the Old Fort.",
+                related_entities_json=json.dumps(
+                    [
+                        {"name": "Lighthouse", "type": "Location", "relation": "near"},
+                        {"name": "Old Fort", "type": "Location", "relation": "near"},
+                    ]
+                ),
+            )
+        )
+        session.add(Article(title="Lighthouse", summary="A light.", content="Light."))
+        session.commit()
+    finally:
+        session.close()
+
+    for name in ["Harbor", "Lighthouse", "Old Fort"]:
+        graph_service.add_entity(world_name, name, "Location")
+
+    client = TestClient(app)
+    try:
+        # 1. World overview listing
+        resp = client.get(f"/world/{world_name}")
+        if resp.status_code != 200 or "Lighthouse" not in resp.text:
+            print(f"FAILED: Overview listing ({resp.status_code}).")
+            sys.exit(1)
+        print("SUCCESS: Overview listed via AsyncSession.")
+
+        # 2. Article lookup + batched existence checks
+        resp = client.get(f"/world/{world_name}/wiki/Harbor")
+        if resp.status_code != 200:
+            print(f"FAILED: Article page returned {resp.status_code}.")
+            sys.exit(1)
+        if f"/world/{world_name}/wiki/Lighthouse" not in resp.text:
+            print("FAILED: Existing entity not linked.")
+            sys.exit(1)
+        if 'data-title="Old Fort"' not in resp.text:
+            print("FAILED: Missing entity not rendered as red link.")
+            sys.exit(1)
+        print("SUCCESS: Article rendered with batched existence checks.")
+
+        # 3. JSON API
+        resp = client.get(f"/api/world/{world_name}/article/Lighthouse")
+        if resp.status_code != 200 or resp.json()["title"] != "Lighthouse":
+            print(f"FAILED: Article API ({resp.status_code}).")
+            sys.exit(1)
+        resp = client.get(f"/api/world/{world_name}/article/Nowhere")
+        if resp.status_code != 404:
+            print(f"FAILED: Expected 404, got {resp.status_code}.")
+            sys.exit(1)
+        print("SUCCESS: Article API served via AsyncSession.")
+    finally:
+        client.close()
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Async Session Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_async_session()
@@ -0,0 +1,102 @@
+import os
+import re
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+# Offline, in a scratch data directory (the shared store lives next to the worlds)
+os.environ["AI_PROVIDER"] = "fake"
+os.environ["WORLD_DATA_DIR"] = tempfile.mkdtemp()
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.rag import collection_name, rag_service
+from app.core.world import world_manager, WorldConfig
+from scripts.migrate_chroma_store import migrate_world
+
+WORLDS = ["Glass Coast", "Glass_Coast"]
+
+
+def verify_chroma_store():
+    print("Starting Chroma Store Verification...")
+
+    try:
+        # 1. Collection names are valid and distinct per world
+        names = [collection_name(w) for w in WORLDS + ["Old-Realm", "ünïcode.."]]
+        valid = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{1,510}[A-Za-z0-9]$")
+        if len(set(names)) != len(names) or not all(valid.match(n) for n in names):
+            print(f"FAILED: Bad collection names {names}.")
+            sys.exit(1)
+        if names[2] != "wiki_articles_Old-Realm":
+            print(f"FAILED: Unexpected name {names[2]}.")
+            sys.exit(1)
+        print("SUCCESS: Valid, distinct collection names.")
+
+        # 2. Per-world folders are migrated into the shared store
+        for i, world_name in enumerate(WORLDS):
+            world_manager.create_world(
+                WorldConfig(name=world_name, llm_model="fake-llm")
+            )
+            rag_service.add_article(world_name, "Harbor", f"Harbor of world {i}", 1)
+            rag_service.add_article(world_name, "Lighthouse", f"Tower {i}", 2)
+        for world_name in WORLDS:
+            stats = migrate_world(world_name)
+            if stats != {"documents": 2, "removed": True} or os.path.exists(
+                world_manager.get_paths(world_name)["chroma"]
+            ):
+                print(f"FAILED: {world_name} not migrated ({stats}).")
+                sys.exit(1)
+        print("SUCCESS: Per-world folders migrated and removed.")
+
+        # 3. One client serves every world from its own cached collection
+        with patch.object(rag_service, "storage", "shared"):
+            results = [
+                rag_service.query_context(w, "harbor", n_results=1) for w in WORLDS
+            ]
+            if results != [["Harbor of world 0"], ["Harbor of world 1"]]:
+                print(f"FAILED: Worlds not isolated ({results}).")
+                sys.exit(1)
+            if list(rag_service._clients) != [None]:
+                print(
+                    f"FAILED: Expected one shared client, got {rag_service._clients}."
+                )
+                sys.exit(1)
+            if rag_service.get_collection(WORLDS[0]) is not rag_service.get_collection(
+                WORLDS[0]
+            ):
+                print("FAILED: Collection handle not cached.")
+                sys.exit(1)
+            # Eviction drops the handle, the shared client stays
+            rag_service.close_client(WORLDS[0])
+            if (
+                WORLDS[0] in rag_service._collections
+                or None not in rag_service._clients
+            ):
+                print("FAILED: Eviction in shared mode.")
+                sys.exit(1)
+        print("SUCCESS: Shared client with cached per-world collections.")
+
+        # 4. The store's folder is reserved, not a world
+        if "_chroma" in world_manager.list_worlds():
+            print("FAILED: Shared store listed as a world.")
+            sys.exit(1)
+        try:
+            world_manager.create_world(WorldConfig(name="_chroma"))
+            print("FAILED: Reserved world name accepted.")
+            sys.exit(1)
+        except ValueError:
+            pass
+        print("SUCCESS: Shared store folder reserved.")
+    finally:
+        for world_name in WORLDS:
+            rag_service.close_client(world_name)
+        rag_service.close_client(None)
+        shutil.rmtree(world_manager.base_path, ignore_errors=True)
+
+    print("Chroma Store Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_chroma_store()
@@ -0,0 +1,89 @@
+import os
+import sys
+import shutil
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.world import WorldManager, WorldConfig
+
+
+def verify_config_cache():
+    print("Starting Config Cache Verification...")
+
+    custom_dir = "test_config_cache_worlds"
+    if os.path.exists(custom_dir):
+        shutil.rmtree(custom_dir)
+
+    manager = WorldManager(base_path=custom_dir)
+    world_name = "cache_test"
+
+    try:
+        manager.create_world(WorldConfig(name=world_name, description="Original"))
+
+        # 1. Repeated reads are served from cache (no re-parse)
+        with patch.object(
+            WorldConfig, "model_validate_json", wraps=WorldConfig.model_validate_json
+        ) as parse_mock:
+            for _ in range(5):
+                config = manager.get_config(world_name)
+            if parse_mock.call_count != 0:
+                print(f"FAILED: config parsed {parse_mock.call_count} times.")
+                sys.exit(1)
+        print("SUCCESS: Config served from cache.")
+
+        # 2. Mutating the returned copy doesn't leak into the cache
+        config.description = "Mutated"
+        if manager.get_config(world_name).description != "Original":
+            print("FAILED: Cached config was mutated by caller.")
+            sys.exit(1)
+        print("SUCCESS: Cached config isolated from callers.")
+
+        # 3. External edits of config.json invalidate the cache
+        config_path = manager.get_config_path(world_name)
+        with open(config_path, "w") as f:
+            f.write(
+                WorldConfig(
+                    name=world_name, description="Edited on disk"
+                ).model_dump_json(indent=2)
+            )
+        if manager.get_config(world_name).description != "Edited on disk":
+            print("FAILED: Cache not invalidated by file change.")
+            sys.exit(1)
+        print("SUCCESS: File change invalidated cache.")
+
+        # 4. update_config writes atomically and refreshes the cache
+        manager.update_config(WorldConfig(name=world_name, description="Updated"))
+        leftovers = [
+            f
+            for f in os.listdir(os.path.dirname(config_path))
+            if f.startswith(".")
+        ]
+        if manager.get_config(world_name).description != "Updated" or leftovers:
+            print("FAILED: update_config did not apply cleanly.")
+            sys.exit(1)
+        # Temp files are owner-only; config.json is readable by other users
+        if os.stat(config_path).st_mode & 0o777 != 0o644:
+            print(f"FAILED: config.json mode {oct(os.stat(config_path).st_mode)}.")
+            sys.exit(1)
+        print("SUCCESS: update_config applied atomically.")
+
+        # 5. list_worlds picks up new worlds
+        if manager.list_worlds() != [world_name]:
+            print(f"FAILED: Unexpected worlds {manager.list_worlds()}")
+            sys.exit(1)
+        manager.create_world(WorldConfig(name="cache_test_2"))
+        if sorted(manager.list_worlds()) != [world_name, "cache_test_2"]:
+            print(f"FAILED: list_worlds stale: {manager.list_worlds()}")
+            sys.exit(1)
+        print("SUCCESS: list_worlds cache refreshed on directory change.")
+    finally:
+        if os.path.exists(custom_dir):
+            shutil.rmtree(custom_dir)
+
+    print("Config Cache Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_config_cache()
@@ -0,0 +1,186 @@
+import os
+import sys
+import shutil
+import asyncio
+import threading
+from functools import cached_property
+
+import numpy as np
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+from app.core.embeddings import (
+    EmbeddingBatcher,
+    OnnxEmbeddingFunction,
+    embedding_service,
+)
+from app.core.fake_provider import FakeEmbeddingFunction
+from app.core.rag import rag_service
+from app.core.world import world_manager, WorldConfig
+
+WORLDS = ["TestWorld_EmbeddingsA", "TestWorld_EmbeddingsB"]
+
+
+class RecordingFunction(FakeEmbeddingFunction):
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, input):
+        self.calls.append(len(input))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return super().__call__(input)
+
+
+def concurrent_calls(batcher, texts):
+    """One call per text, all released at once from separate threads."""
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = batcher([texts[i]])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+async def concurrent_queries(queries):
+    return await asyncio.gather(
+        *(
+            asyncio.to_thread(rag_service.query_context, world, text, 1)
+            for world, text in queries
+        )
+    )
+
+
+def verify_embeddings():
+    print("Starting Embeddings Verification...")
+
+    texts = [f"the tower of shard {i}" for i in range(8)]
+    reference = FakeEmbeddingFunction()(texts)
+
+    # 1. Concurrent calls are embedded together, each caller gets its own rows
+    function = RecordingFunction()
+    batcher = EmbeddingBatcher(function, window_ms=100, max_batch=32)
+    results = concurrent_calls(batcher, texts)
+    if len(function.calls) >= len(texts) or sum(function.calls) != len(texts):
+        print(f"FAILED: Calls were not batched ({function.calls}).")
+        sys.exit(1)
+    for result, expected in zip(results, reference):
+        if len(result) != 1 or not np.allclose(result[0], expected):
+            print("FAILED: Embeddings handed to the wrong caller.")
+            sys.exit(1)
+    print(f"SUCCESS: 8 concurrent calls embedded in {len(function.calls)} batch(es).")
+
+    # 2. Batches close once max_batch texts are waiting
+    function = RecordingFunction()
+    batcher = EmbeddingBatcher(function, window_ms=100, max_batch=3)
+    concurrent_calls(batcher, texts)
+    if max(function.calls) > 3 or sum(function.calls) != len(texts):
+        print(f"FAILED: Batch limit exceeded ({function.calls}).")
+        sys.exit(1)
+    print(f"SUCCESS: Batches capped at max_batch ({function.calls}).")
+
+    # 3. A failing batch fails every caller in it, and the batcher keeps going
+    failing = EmbeddingBatcher(RecordingFunction(fail=True), window_ms=50)
+    results = concurrent_calls(failing, texts[:4])
+    if not all(isinstance(r, RuntimeError) for r in results):
+        print(f"FAILED: Errors not propagated ({results}).")
+        sys.exit(1)
+    failing.function.fail = False
+    if len(failing(["again"])) != 1:
+        print("FAILED: Batcher stopped after an error.")
+        sys.exit(1)
+    print("SUCCESS: Errors reach every caller of the batch.")
+
+    # 4. The ONNX function overrides Chroma's non-public `model` property:
+    # fail here, not at the first query, if a chromadb update changes it
+    function = OnnxEmbeddingFunction(threads=2)
+    relied_on = ("DOWNLOAD_PATH", "EXTRACTED_FOLDER_NAME", "ort")
+    if not isinstance(ONNXMiniLM_L6_V2.__dict__.get("model"), cached_property) or any(
+        not hasattr(function, name) for name in relied_on
+    ):
+        print("FAILED: Chroma's ONNX embedding function changed.")
+        sys.exit(1)
+    if function.name() != "default" or function.get_config() != {}:
+        print("FAILED: ONNX function not recorded as Chroma's default.")
+        sys.exit(1)
+    print("SUCCESS: Chroma's ONNX embedding function has the expected shape.")
+
+    # 5. All worlds share one batcher through their collections
+    for world_name in WORLDS:
+        world_path = world_manager.get_world_path(world_name)
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+        world_manager.create_world(WorldConfig(name=world_name, llm_model="fake-llm"))
+    try:
+        for i, world_name in enumerate(WORLDS):
+            rag_service.add_article(world_name, "Harbor", f"Harbor of world {i}", 1)
+            rag_service.add_article(world_name, "Tower", f"Tower of world {i}", 2)
+
+        shared = embedding_service()
+        if any(
+            rag_service.get_collection(w)._embedding_function is not shared
+            for w in WORLDS
+        ):
+            print("FAILED: Collections don't use the shared batcher.")
+            sys.exit(1)
+        shared.window = 0.1
+        before = shared.batches
+        queries = [(WORLDS[i % 2], "tower") for i in range(6)]
+        results = asyncio.run(concurrent_queries(queries))
+        batches = shared.batches - before
+        if batches >= len(queries):
+            print(f"FAILED: RAG queries were not batched ({batches} batches).")
+            sys.exit(1)
+        if any(docs != [f"Tower of world {i % 2}"] for i, docs in enumerate(results)):
+            print(f"FAILED: Unexpected query results {results}.")
+            sys.exit(1)
+        print(f"SUCCESS: 6 queries over 2 worlds embedded in {batches} batch(es).")
+
+        # 6. Collections record the wrapped function, so another embedding
+        # space is refused
+        collection = rag_service.get_collection(WORLDS[0])
+        recorded = collection.configuration["embedding_function"]
+        if shared.name() != "infinite-wiki-fake" or recorded.name() != shared.name():
+            print(f"FAILED: Collection recorded '{recorded.name()}'.")
+            sys.exit(1)
+        other = EmbeddingBatcher(RecordingFunction())
+        other.name = lambda: "other-model"
+        try:
+            rag_service.get_client(WORLDS[0]).get_collection(
+                collection.name, embedding_function=other
+            )
+            print("FAILED: Collection opened with another embedding function.")
+            sys.exit(1)
+        except ValueError:
+            pass
+        print("SUCCESS: Collections record the wrapped embedding function.")
+    finally:
+        for world_name in WORLDS:
+            rag_service.close_client(world_name)
+            world_path = world_manager.get_world_path(world_name)
+            if os.path.exists(world_path):
+                shutil.rmtree(world_path)
+
+    print("Embeddings Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_embeddings()
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+
+# The provider is chosen when settings are first loaded
+os.environ["AI_PROVIDER"] = "fake"
+os.environ["FAKE_LATENCY_MS"] = "normal:40:10"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.llm import llm_service
+from app.core.fake_provider import LatencyDistribution
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+
+async def generate_offline(world_name: str):
+    session = next(get_session(world_name))
+    try:
+        started = time.monotonic()
+        article = await generator_service.generate_article(
+            world_name, "The Sunken Library", session
+        )
+        elapsed = time.monotonic() - started
+
+        if not article.content or not article.summary:
+            print("FAILED: Fake provider returned an empty article.")
+            sys.exit(1)
+        print(
+            f"SUCCESS: Generated '{article.title}' offline in {elapsed:.2f}s "
+            f"({len(article.content)} chars)."
+        )
+
+        # A second article sees the first through RAG (fake embeddings)
+        await generator_service.generate_article(
+            world_name, "The Drowned Stair", session
+        )
+
+        # Image path: prompt optimisation plus a decoded b64 PNG
+        await generator_service.generate_and_save_image(
+            world_name,
+            article.id,
+            "A library under water",
+            WorldConfig(name=world_name),
+        )
+        session.expire_all()
+        article = session.get(Article, article.id)
+        image_path = os.path.join(
+            world_manager.get_images_path(world_name),
+            os.path.basename(article.image_url or ""),
+        )
+        if not article.image_url or not os.path.exists(image_path):
+            print(f"FAILED: No image saved ({article.image_url}).")
+            sys.exit(1)
+        with open(image_path, "rb") as f:
+            if not f.read(8).startswith(b"\x89PNG"):
+                print("FAILED: Saved image is not a PNG.")
+                sys.exit(1)
+        print("SUCCESS: Fake image generated and saved.")
+    finally:
+        session.close()
+
+
+def verify_fake_provider():
+    print("Starting Fake Provider Verification...")
+
+    # 1. Latency distributions are seeded and reproducible
+    a = LatencyDistribution("lognormal:100:0.5", seed=7)
+    b = LatencyDistribution("lognormal:100:0.5", seed=7)
+    samples = [a.sample() for _ in range(5)]
+    if samples != [b.sample() for _ in range(5)] or min(samples) < 0:
+        print(f"FAILED: Latency samples not reproducible {samples}.")
+        sys.exit(1)
+    if LatencyDistribution("0").sample() != 0:
+        print("FAILED: Zero latency spec should not sleep.")
+        sys.exit(1)
+    print("SUCCESS: Latency distributions are deterministic.")
+
+    world_name = "TestWorld_FakeProvider"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+
+    try:
+        asyncio.run(generate_offline(world_name))
+
+        # 2. Usage is reported like a real provider
+        usage = llm_service.usage_stats()
+        if usage["requests"] < 3 or usage["total_tokens"] <= 0:
+            print(f"FAILED: Unexpected usage {usage}.")
+            sys.exit(1)
+        print(f"SUCCESS: Usage recorded {usage}.")
+    finally:
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Fake Provider Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_fake_provider()
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Real connections against a local server, not the in-process fake provider
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+import openai
+
+from app.core import http_client
+from app.core.http_client import client_requests, create_http_client, prewarm
+from app.core.llm import llm_service
+from app.core.image_gen import image_gen_service
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body: bytes = b"ok"):
+        Handler.requests.append((self.command, self.path))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._reply()
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "/slow/" in self.path:
+            time.sleep(2)
+        self._reply(b"{}")
+
+
+async def sequential_requests(url: str, count: int):
+    async with create_http_client("test") as client:
+        for _ in range(count):
+            await client.get(url)
+
+
+async def prewarm_then_request(url: str):
+    warmed = await prewarm(connections=2)
+    await http_client.provider_http_client().get(url)
+    return warmed
+
+
+async def slow_completion(base_url: str) -> float:
+    original = llm_service.client
+    llm_service.client = original.with_options(base_url=base_url, max_retries=0)
+    started = time.perf_counter()
+    try:
+        await llm_service.generate_text("hello", model="m", timeout_seconds=0.3)
+    except openai.APITimeoutError:
+        return time.perf_counter() - started
+    finally:
+        llm_service.client = original
+    return None
+
+
+def verify_http_client():
+    print("Starting HTTP Client Verification...")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        # 1. Pooled connections are reused and counted
+        asyncio.run(sequential_requests(f"{base}/ping", 3))
+        new = client_requests.value(client="test", connection="new")
+        reused = client_requests.value(client="test", connection="reused")
+        if (new, reused) != (1, 2):
+            print(
+                f"FAILED: Expected 1 new and 2 reused connections, got {new}/{reused}."
+            )
+            sys.exit(1)
+        print("SUCCESS: Keep-alive connection reused and counted.")
+
+        # 2. The LLM and image clients share one pool with their own timeouts
+        settings = http_client.settings
+        if llm_service.client._client is not image_gen_service.client._client:
+            print("FAILED: Provider clients don't share a connection pool.")
+            sys.exit(1)
+        if (
+            llm_service.client.timeout.read != settings.LLM_TIMEOUT_SECONDS
+            or image_gen_service.client.timeout.read != settings.IMAGE_TIMEOUT_SECONDS
+        ):
+            print("FAILED: Per-client timeouts not applied.")
+            sys.exit(1)
+        print("SUCCESS: Shared pool with per-client timeouts.")
+
+        # 3. Prewarmed connections serve the first real request
+        settings.OPENAI_BASE_URL = settings.IMAGE_GEN_BASE_URL = f"{base}/v1"
+        Handler.requests.clear()
+        warmed = asyncio.run(prewarm_then_request(f"{base}/v1/models"))
+        heads = [r for r in Handler.requests if r[0] == "HEAD"]
+        first_reused = client_requests.value(client="provider", connection="reused")
+        if warmed != 2 or len(heads) != 2 or first_reused < 1:
+            print(f"FAILED: Prewarm ({warmed}, {heads}, reused={first_reused}).")
+            sys.exit(1)
+        print("SUCCESS: Prewarmed connection reused by the first request.")
+
+        # 4. Quick checks get a short per-request timeout
+        elapsed = asyncio.run(slow_completion(f"{base}/slow/v1"))
+        if elapsed is None or elapsed > 1.5:
+            print(f"FAILED: Short timeout not applied ({elapsed}).")
+            sys.exit(1)
+        print(f"SUCCESS: Quick call timed out after {elapsed:.1f}s.")
+    finally:
+        server.shutdown()
+
+    print("HTTP Client Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_http_client()
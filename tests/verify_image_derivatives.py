@@ -0,0 +1,157 @@
+import io
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlmodel import select
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.images import ImageDerivativeService, image_derivatives
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+from scripts.export_static import export_static
+
+
+async def generate(world_name: str, title: str):
+    session = next(get_session(world_name))
+    try:
+        await generator_service.generate_article(world_name, title, session)
+    finally:
+        session.close()
+
+
+def verify_image_derivatives():
+    print("Starting Image Derivatives Verification...")
+
+    world_name = "TestWorld_Derivatives"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(
+        WorldConfig(name=world_name, llm_model="fake-llm", generate_images=True)
+    )
+    create_db_and_tables(world_name)
+    images_dir = world_manager.get_images_path(world_name)
+    output_dir = tempfile.mkdtemp()
+
+    try:
+        # 1. Saving an image writes every variant
+        asyncio.run(generate(world_name, "Glass Tower"))
+        session = next(get_session(world_name))
+        try:
+            article = session.exec(
+                select(Article).where(Article.title == "Glass Tower")
+            ).first()
+        finally:
+            session.close()
+        filename = article.image_url.rsplit("/", 1)[1]
+        missing = [
+            (width, fmt)
+            for width in image_derivatives.widths
+            for fmt in image_derivatives.formats
+            if not os.path.exists(
+                image_derivatives.derivative_path(images_dir, filename, width, fmt)
+            )
+        ]
+        if missing:
+            print(f"FAILED: Variants not created at save time: {missing}.")
+            sys.exit(1)
+        print("SUCCESS: Variants created when the image was saved.")
+
+        # 2. The article page offers them through srcset
+        client = TestClient(app)
+        html = client.get(f"/world/{world_name}/wiki/Glass Tower").text
+        encoding = image_derivatives.encoding
+        srcset = (
+            f"/world/{world_name}/images/derived/{encoding}/320/{filename}.webp 320w"
+        )
+        if "<picture>" not in html or srcset not in html:
+            print("FAILED: Article page has no srcset.")
+            sys.exit(1)
+        print("SUCCESS: Article page lists the variants in srcset.")
+
+        # Other encoder settings must not reuse the immutable URLs
+        requality = ImageDerivativeService(quality=image_derivatives.quality - 1)
+        if requality.sources(article.image_url) == image_derivatives.sources(
+            article.image_url
+        ):
+            print("FAILED: Variant URLs don't change with the quality.")
+            sys.exit(1)
+        print("SUCCESS: Variant URLs include the encoder settings.")
+
+        # 3. Older images get their variants on first request, downscaled
+        Image.new("RGB", (1200, 900), (200, 40, 40)).save(
+            os.path.join(images_dir, "Old_Map.png")
+        )
+        resp = client.get(
+            f"/world/{world_name}/images/derived/{encoding}/320/Old_Map.png.webp"
+        )
+        if resp.status_code != 200 or resp.headers["content-type"] != "image/webp":
+            print(f"FAILED: Lazy variant returned {resp.status_code}.")
+            sys.exit(1)
+        size = Image.open(io.BytesIO(resp.content)).size
+        if size != (320, 240):
+            print(f"FAILED: Variant has size {size}.")
+            sys.exit(1)
+        print("SUCCESS: Missing variant created on request.")
+
+        # 4. Unknown widths, formats and images are not generated
+        for path in [
+            f"derived/{encoding}/333/Old_Map.png.webp",
+            f"derived/{encoding}/320/Old_Map.png.gif",
+            f"derived/{encoding}/320/Nothing.png.webp",
+            f"derived/{encoding}/320/..%2F..%2Fconfig.json.webp",
+            "derived/q1/320/Old_Map.png.webp",
+            "derived/320/Old_Map.png.webp",
+        ]:
+            if client.get(f"/world/{world_name}/images/{path}").status_code != 404:
+                print(f"FAILED: {path} should not exist.")
+                sys.exit(1)
+        print("SUCCESS: Only configured variants of existing images are served.")
+
+        # 5. The static export ships the variants, backfilling missing ones
+        shutil.rmtree(os.path.join(images_dir, "derived"))
+        export_static(output_dir, only_worlds=[world_name], workers=1)
+        exported = os.path.join(
+            output_dir,
+            "world",
+            world_name,
+            "images",
+            "derived",
+            encoding,
+            "640",
+            "Old_Map.png.webp",
+        )
+        if not os.path.exists(exported):
+            print("FAILED: Static export is missing the variants.")
+            sys.exit(1)
+        if os.path.exists(os.path.join(images_dir, "derived")):
+            print("FAILED: Static export wrote variants into the world.")
+            sys.exit(1)
+        export_static(output_dir, only_worlds=[world_name], workers=1)
+        if not os.path.exists(exported):
+            print("FAILED: Incremental export removed the variants.")
+            sys.exit(1)
+        print("SUCCESS: Static export includes the variants.")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Image Derivatives Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_image_derivatives()
@@ -0,0 +1,133 @@
+import os
+import sys
+import base64
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.image_gen import image_gen_service
+from app.core.images import ImageTooLarge, ingest_base64, ingest_url
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+
+def leftovers(directory: str):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+async def generate_with_urls(world_name: str, article_id: int):
+    """Image generation against a provider that only returns URLs."""
+    real = image_gen_service.generate_image
+
+    async def url_only(prompt, model=None, response_format="url"):
+        return await real(prompt, model=model, response_format="url")
+
+    with patch.object(image_gen_service, "generate_image", side_effect=url_only):
+        return await generator_service.generate_and_save_image(
+            world_name, article_id, "A tower", world_manager.get_config(world_name)
+        )
+
+
+async def expect_too_large(images_dir: str, url: str):
+    try:
+        await ingest_url(images_dir, url, max_bytes=10)
+    except ImageTooLarge:
+        return True
+    return False
+
+
+def verify_image_ingest():
+    print("Starting Image Ingest Verification...")
+
+    images_dir = tempfile.mkdtemp()
+    world_name = "TestWorld_ImageIngest"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+
+    try:
+        # 1. Base64 is decoded in chunks, never as one decoded copy
+        data = b"\x89PNG\r\n\x1a\n" + os.urandom(4 * 1024 * 1024)
+        payload = base64.b64encode(data).decode("ascii")
+        tracemalloc.start()
+        digest, filename = ingest_base64(images_dir, payload)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(os.path.join(images_dir, filename), "rb") as f:
+            stored = f.read()
+        if stored != data or digest != hashlib.sha256(data).hexdigest():
+            print("FAILED: Decoded image differs from the payload.")
+            sys.exit(1)
+        if peak > len(data) // 4:
+            print(f"FAILED: Decoding peaked at {peak} bytes for {len(data)}.")
+            sys.exit(1)
+        print(f"SUCCESS: 4 MB decoded with a {peak // 1024} KB peak.")
+
+        # 2. Oversized payloads are rejected without leaving files behind
+        before = set(os.listdir(images_dir))
+        try:
+            ingest_base64(images_dir, payload, max_bytes=1024 * 1024)
+            print("FAILED: Oversized image accepted.")
+            sys.exit(1)
+        except ImageTooLarge:
+            pass
+        if set(os.listdir(images_dir)) != before or leftovers(images_dir):
+            print("FAILED: Rejected image left files behind.")
+            sys.exit(1)
+        print("SUCCESS: Size limit enforced atomically.")
+
+        # 3. URL results are downloaded into the store
+        world_manager.create_world(
+            WorldConfig(name=world_name, llm_model="fake-llm", generate_images=True)
+        )
+        create_db_and_tables(world_name)
+        session = next(get_session(world_name))
+        try:
+            article = Article(title="Glass Tower", summary="s", content="c")
+            session.add(article)
+            session.commit()
+            article_id = article.id
+        finally:
+            session.close()
+
+        image_url = asyncio.run(generate_with_urls(world_name, article_id))
+        world_images = world_manager.get_images_path(world_name)
+        if not image_url or not os.path.exists(
+            os.path.join(world_images, image_url.rsplit("/", 1)[1])
+        ):
+            print(f"FAILED: URL image not stored ({image_url}).")
+            sys.exit(1)
+        print("SUCCESS: Image URL downloaded into the image store.")
+
+        # 4. Downloads respect the size limit too
+        image = asyncio.run(
+            image_gen_service.generate_image("A second tower", response_format="url")
+        )
+        if not asyncio.run(expect_too_large(world_images, image)):
+            print("FAILED: Oversized download accepted.")
+            sys.exit(1)
+        if leftovers(world_images):
+            print("FAILED: Aborted download left a temp file.")
+            sys.exit(1)
+        print("SUCCESS: Download size limit enforced.")
+    finally:
+        shutil.rmtree(images_dir, ignore_errors=True)
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Image Ingest Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_image_ingest()
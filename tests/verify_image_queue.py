@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+from unittest.mock import patch
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.image_gen import image_gen_service
+from app.core.image_queue import image_queue
+from app.core.residency import residency_manager
+from app.core.warmup import warmup_service
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+from app.models.image_job import ImageJob
+
+
+def get_job(world_name: str, title: str):
+    session = next(get_session(world_name))
+    try:
+        article = session.exec(select(Article).where(Article.title == title)).first()
+        job = session.exec(
+            select(ImageJob).where(ImageJob.article_id == article.id)
+        ).first()
+        return article, job
+    finally:
+        session.close()
+
+
+def wait_for_job(world_name: str, title: str, timeout: float = 10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        article, job = get_job(world_name, title)
+        if job.status in ("done", "failed"):
+            return article, job
+        time.sleep(0.05)
+    return get_job(world_name, title)
+
+
+async def generate(world_name: str, title: str):
+    session = next(get_session(world_name))
+    try:
+        await generator_service.generate_article(world_name, title, session)
+    finally:
+        session.close()
+
+
+def flaky_generate_image(failures: int):
+    """generate_image that fails `failures` times before delegating."""
+    real = image_gen_service.generate_image
+    calls = {"n": 0}
+
+    async def wrapper(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] <= failures:
+            return None
+        return await real(*args, **kwargs)
+
+    return wrapper
+
+
+def verify_image_queue():
+    print("Starting Image Queue Verification...")
+
+    world_name = "TestWorld_ImageQueue"
+    idle_world = "TestWorld_ImageQueue_Idle"
+    world_path = world_manager.get_world_path(world_name)
+    for path in (world_path, world_manager.get_world_path(idle_world)):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+    world_manager.create_world(
+        WorldConfig(name=world_name, llm_model="fake-llm", generate_images=True)
+    )
+    create_db_and_tables(world_name)
+
+    image_queue.retry_backoff = 0.05
+    try:
+        # 1. Without a pool (scripts, tests) the job runs inline
+        asyncio.run(generate(world_name, "Inline Tower"))
+        article, job = get_job(world_name, "Inline Tower")
+        if image_queue.running or job.status != "done" or not article.image_url:
+            print(f"FAILED: Inline job ended as '{job.status}'.")
+            sys.exit(1)
+        print("SUCCESS: Inline fallback generated the image.")
+
+        # 2. Exhausted retries mark the job failed and keep the error
+        image_queue.max_attempts = 2
+        with patch.object(
+            image_gen_service, "generate_image", side_effect=flaky_generate_image(5)
+        ):
+            asyncio.run(generate(world_name, "Cursed Tower"))
+        article, job = get_job(world_name, "Cursed Tower")
+        if job.status != "failed" or job.attempts != 2 or not job.last_error:
+            print(f"FAILED: Expected a failed job, got {job}.")
+            sys.exit(1)
+        print("SUCCESS: Job failed after max attempts.")
+        image_queue.max_attempts = 3
+
+        # 3. A job interrupted mid-run is resumed at startup
+        session = next(get_session(world_name))
+        try:
+            orphan = Article(title="Orphan Tower", summary="s", content="c")
+            session.add(orphan)
+            session.flush()
+            session.add(
+                ImageJob(
+                    article_id=orphan.id, prompt="A tower", status="running", attempts=1
+                )
+            )
+            # The article of this job was deleted
+            session.add(ImageJob(article_id=orphan.id + 100, prompt="Gone"))
+            session.commit()
+        finally:
+            session.close()
+        # A world without unfinished jobs isn't opened by the recovery
+        world_manager.create_world(WorldConfig(name=idle_world))
+        create_db_and_tables(idle_world)
+        residency_manager.evict(idle_world)
+
+        # Warm-up is off: it would open the most recent worlds itself
+        with patch.object(warmup_service, "enabled", False), TestClient(app) as client:
+            article, job = wait_for_job(world_name, "Orphan Tower")
+            if job.status != "done" or job.attempts != 2 or not article.image_url:
+                print(f"FAILED: Interrupted job not recovered ({job}).")
+                sys.exit(1)
+            session = next(get_session(world_name))
+            try:
+                deleted = session.exec(
+                    select(ImageJob).where(ImageJob.prompt == "Gone")
+                ).one()
+            finally:
+                session.close()
+            if (deleted.status, deleted.attempts) != ("failed", 0):
+                print(f"FAILED: Job of a deleted article retried ({deleted}).")
+                sys.exit(1)
+            if residency_manager.is_resident(idle_world):
+                print("FAILED: World without image jobs opened at startup.")
+                sys.exit(1)
+            print("SUCCESS: Interrupted job recovered at startup.")
+
+            # 4. Requests return before the image; the pool retries failures
+            with patch.object(
+                image_gen_service,
+                "generate_image",
+                side_effect=flaky_generate_image(1),
+            ):
+                resp = client.post(f"/api/world/{world_name}/generate/Pool Tower")
+                if resp.status_code != 200:
+                    print(f"FAILED: Generation returned {resp.status_code}.")
+                    sys.exit(1)
+                article, job = wait_for_job(world_name, "Pool Tower")
+            if job.status != "done" or job.attempts != 2 or not article.image_url:
+                print(f"FAILED: Pool job ended as {job}.")
+                sys.exit(1)
+
+            stats = client.get("/api/system/images").json()
+            if not stats["running"] or stats["retried"] < 1:
+                print(f"FAILED: Unexpected queue stats {stats}.")
+                sys.exit(1)
+        print("SUCCESS: Worker pool retried and completed the job.")
+
+        if image_queue.running:
+            print("FAILED: Workers still running after shutdown.")
+            sys.exit(1)
+        print("SUCCESS: Workers stopped on shutdown.")
+    finally:
+        for path in (world_path, world_manager.get_world_path(idle_world)):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    print("Image Queue Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_image_queue()
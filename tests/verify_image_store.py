@@ -0,0 +1,143 @@
+import os
+import sys
+import shutil
+import sqlite3
+import asyncio
+import hashlib
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.images import image_derivatives
+from app.database import create_db_and_tables, dispose_engine, get_session
+from app.models.article import Article
+from scripts.migrate_image_store import migrate_world
+
+
+async def generate(world_name: str, titles):
+    session = next(get_session(world_name))
+    try:
+        for title in titles:
+            await generator_service.generate_article(world_name, title, session)
+    finally:
+        session.close()
+
+
+def get_article(world_name: str, title: str) -> Article:
+    session = next(get_session(world_name))
+    try:
+        return session.exec(select(Article).where(Article.title == title)).first()
+    finally:
+        session.close()
+
+
+def verify_image_store():
+    print("Starting Image Store Verification...")
+
+    world_name = "TestWorld_ImageStore"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(
+        WorldConfig(name=world_name, llm_model="fake-llm", generate_images=True)
+    )
+    create_db_and_tables(world_name)
+    images_dir = world_manager.get_images_path(world_name)
+
+    try:
+        # 1. Titles that used to map to the same filename keep separate images
+        asyncio.run(generate(world_name, ["Glass Tower", "Glass_Tower"]))
+        first = get_article(world_name, "Glass Tower")
+        second = get_article(world_name, "Glass_Tower")
+        if not first.image_hash or first.image_url == second.image_url:
+            print("FAILED: Images are not stored per content.")
+            sys.exit(1)
+        filename = first.image_url.rsplit("/", 1)[1]
+        with open(os.path.join(images_dir, filename), "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if digest != first.image_hash or not filename.startswith(digest):
+            print(f"FAILED: {filename} does not match its hash {digest}.")
+            sys.exit(1)
+        print("SUCCESS: Images stored under their content hash.")
+
+        # 2. Immutable caching, strong ETag, conditional and range requests
+        client = TestClient(app)
+        resp = client.get(first.image_url)
+        etag = resp.headers.get("etag")
+        if etag != f'"{digest}"' or "immutable" not in resp.headers["cache-control"]:
+            print(f"FAILED: Unexpected headers {dict(resp.headers)}.")
+            sys.exit(1)
+        cached = client.get(first.image_url, headers={"If-None-Match": etag})
+        ranged = client.get(first.image_url, headers={"Range": "bytes=0-7"})
+        if cached.status_code != 304 or cached.content:
+            print(f"FAILED: Conditional request returned {cached.status_code}.")
+            sys.exit(1)
+        if ranged.status_code != 206 or ranged.content != resp.content[:8]:
+            print(f"FAILED: Range request returned {ranged.status_code}.")
+            sys.exit(1)
+        print("SUCCESS: Immutable, ETag, 304 and Range handled.")
+
+        # 3. Databases created before the column existed get it added
+        dispose_engine(world_name)
+        db_path = world_manager.get_paths(world_name)["db"].replace("sqlite:///", "")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("ALTER TABLE article DROP COLUMN image_hash")
+        if get_article(world_name, "Glass Tower").image_hash is not None:
+            print("FAILED: Column was not re-added empty.")
+            sys.exit(1)
+        print("SUCCESS: Missing column added to an existing database.")
+
+        # 4. Legacy title-named files are revalidated, then migrated
+        shutil.copy(
+            os.path.join(images_dir, filename), os.path.join(images_dir, "Old_Map.png")
+        )
+        session = next(get_session(world_name))
+        try:
+            article = session.get(Article, first.id)
+            article.image_url = f"/world/{world_name}/images/Old_Map.png"
+            session.add(article)
+            session.commit()
+        finally:
+            session.close()
+        legacy = client.get(f"/world/{world_name}/images/Old_Map.png")
+        if legacy.headers.get("cache-control") != "no-cache":
+            print("FAILED: Legacy image should be revalidated.")
+            sys.exit(1)
+        image_derivatives.create(images_dir, "Old_Map.png")
+        legacy_variants = image_derivatives.variant_paths(images_dir, "Old_Map.png")
+        # A variant in the layout from before the encoding was part of the path
+        old_layout = os.path.join(images_dir, "derived", "320", "Old_Map.png.webp")
+        os.makedirs(os.path.dirname(old_layout))
+        shutil.copy(legacy_variants[0], old_layout)
+        legacy_variants.append(old_layout)
+
+        stats = migrate_world(world_name)
+        migrated = get_article(world_name, "Glass Tower")
+        if (
+            stats["migrated"] != 1
+            or migrated.image_url != first.image_url
+            or migrated.image_hash != digest
+            or os.path.exists(os.path.join(images_dir, "Old_Map.png"))
+            or any(os.path.exists(path) for path in legacy_variants)
+        ):
+            print(f"FAILED: Legacy image not migrated ({stats}).")
+            sys.exit(1)
+        print("SUCCESS: Legacy image migrated to the content-addressed store.")
+    finally:
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Image Store Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_image_store()
@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import subprocess
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+# Generous for slow CI machines, importing app.main takes ~0.8s locally
+IMPORT_BUDGET_SECONDS = 1.5
+LAZY_MODULES = ("chromadb", "openai", "networkx", "markdown", "keyring")
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+loaded = [m for m in {lazy} if m in sys.modules]
+{first_use}
+print(json.dumps({{"elapsed": elapsed, "loaded": loaded, "used": sorted(sys.modules)}}))
+"""
+
+
+def probe(env_overrides: dict, first_use: str = "") -> dict:
+    """Imports app.main in a fresh interpreter, like a CLI script or test run."""
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    env.update(env_overrides)
+    code = PROBE.format(lazy=repr(LAZY_MODULES), first_use=first_use)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        cwd=os.getcwd(),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if result.returncode != 0:
+        print(f"FAILED: Import failed:\n{result.stderr}")
+        sys.exit(1)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def verify_import_time():
+    print("Starting Import Time Verification...")
+
+    # 1. Heavy dependencies and the keyring are not touched at import, even
+    # for a real provider whose key would come from the keyring, or when the
+    # provider itself is picked from the keyring ("auto")
+    for provider in ("openai", "auto"):
+        result = probe({"AI_PROVIDER": provider})
+        if result["loaded"]:
+            print(f"FAILED: Imported eagerly ({provider}): {result['loaded']}.")
+            sys.exit(1)
+    print("SUCCESS: No heavy imports or keyring lookups at startup.")
+
+    # 2. Within the budget (best of three, the first run may fill caches)
+    elapsed = min(
+        probe({"AI_PROVIDER": "fake"})["elapsed"],
+        probe({"AI_PROVIDER": "fake"})["elapsed"],
+        probe({"AI_PROVIDER": "fake"})["elapsed"],
+    )
+    if elapsed > IMPORT_BUDGET_SECONDS:
+        print(f"FAILED: Importing app.main took {elapsed:.2f}s.")
+        sys.exit(1)
+    print(f"SUCCESS: app.main imported in {elapsed:.2f}s.")
+
+    # 3. Deferred services are built on first use
+    result = probe(
+        {"AI_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test"},
+        first_use="from app.core.llm import llm_service; llm_service.client",
+    )
+    if "openai" not in result["used"] or "keyring" in result["used"]:
+        print("FAILED: LLM client not created on first use (or keyring consulted).")
+        sys.exit(1)
+    print("SUCCESS: LLM client created on first use, env key skips the keyring.")
+
+    print("Import Time Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_import_time()
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+# Offline, in a scratch data directory
+os.environ["AI_PROVIDER"] = "fake"
+os.environ["WORLD_DATA_DIR"] = tempfile.mkdtemp()
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.generator import generator_service
+from app.core.graph import graph_service
+from app.core.indexes import index_service
+from app.core.rag import rag_service
+from app.core.world import world_manager, WorldConfig
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+WORLD_NAME = "TestWorld_Indexes"
+
+
+async def seed():
+    session = next(get_session(WORLD_NAME))
+    try:
+        for title in ("Lighthouse", "Harbor"):
+            await generator_service.generate_article(WORLD_NAME, title, session)
+    finally:
+        session.close()
+
+
+def drift() -> dict:
+    """Changes the database behind the indexes' back, like an edit or a crash would."""
+    session = next(get_session(WORLD_NAME))
+    try:
+        edited = session.exec(select(Article).where(Article.title == "Harbor")).one()
+        edited.content = "The harbor was rebuilt in glass."
+        unindexed = Article(
+            title="Drowned Archive",
+            summary="An archive under the sea.",
+            content="The drowned archive keeps the oldest maps.",
+            related_entities_json=json.dumps(
+                [
+                    {
+                        "name": "Cartographers",
+                        "type": "Organization",
+                        "relation": "kept by",
+                    }
+                ]
+            ),
+        )
+        session.add(edited)
+        session.add(unindexed)
+        session.commit()
+        ids = {"stale": edited.id, "missing": unindexed.id}
+    finally:
+        session.close()
+    rag_service.add_article(WORLD_NAME, "Ghost", "A deleted article", 999)
+    return ids
+
+
+def check_drift(report: dict, ids: dict, label: str):
+    rag, graph = report["rag"], report["graph"]
+    expected = (
+        rag["missing"] == [ids["missing"]]
+        and rag["stale"] == [ids["stale"]]
+        and rag["orphaned"] == ["999"]
+        and graph["missing_nodes"] == ["Drowned Archive"]
+        and graph["missing_edges"] == [["Drowned Archive", "Cartographers"]]
+        and not report["consistent"]
+    )
+    if not expected:
+        print(f"FAILED: {label} drift not reported ({report}).")
+        sys.exit(1)
+
+
+def verify_indexes():
+    print("Starting Index Verification...")
+
+    world_manager.create_world(
+        WorldConfig(name=WORLD_NAME, llm_model="fake-llm", generate_images=False)
+    )
+    create_db_and_tables(WORLD_NAME)
+    asyncio.run(seed())
+
+    try:
+        with TestClient(app) as client:
+            # 1. A freshly generated world is consistent
+            report = client.get(f"/api/world/{WORLD_NAME}/indexes").json()
+            if not report["consistent"] or report["articles"] != 2:
+                print(f"FAILED: Fresh world reported inconsistent ({report}).")
+                sys.exit(1)
+            print("SUCCESS: Fresh world is consistent.")
+
+            # 2. Missing, stale and orphaned entries are reported
+            ids = drift()
+            check_drift(
+                client.get(f"/api/world/{WORLD_NAME}/indexes").json(), ids, "API"
+            )
+            print("SUCCESS: Missing, stale and orphaned entries reported.")
+
+            # 3. A background rebuild repairs them, with progress reporting
+            response = client.post(f"/api/world/{WORLD_NAME}/indexes/rebuild")
+            if response.status_code != 202 or response.json()["status"] != "running":
+                print(f"FAILED: Rebuild not started ({response.text}).")
+                sys.exit(1)
+            deadline = time.time() + 30
+            while time.time() < deadline:
+                job = client.get("/api/system/indexes").json()[WORLD_NAME]
+                if job["status"] != "running":
+                    break
+                time.sleep(0.05)
+            if job["status"] != "done" or job["result"]["rag"] != {
+                "embedded": 2,
+                "removed": 1,
+            }:
+                print(f"FAILED: Rebuild job {job}.")
+                sys.exit(1)
+            if job["result"]["graph"] != {"nodes_added": 2, "edges_added": 1}:
+                print(f"FAILED: Graph repair {job['result']['graph']}.")
+                sys.exit(1)
+            report = client.get(f"/api/world/{WORLD_NAME}/indexes").json()
+            if not report["consistent"]:
+                print(f"FAILED: Still inconsistent after the rebuild ({report}).")
+                sys.exit(1)
+            graph = graph_service.get_graph(WORLD_NAME)
+            if graph.nodes["Cartographers"]["type"] != "Organization":
+                print("FAILED: Related entity not added with its type.")
+                sys.exit(1)
+            print("SUCCESS: Rebuild job repaired the RAG index and the graph.")
+
+            # 4. Unknown worlds and indexes are rejected
+            if client.get("/api/world/NoSuchWorld/indexes").status_code != 404:
+                print("FAILED: Unknown world not rejected.")
+                sys.exit(1)
+            response = client.post(
+                f"/api/world/{WORLD_NAME}/indexes/rebuild?index=search"
+            )
+            if response.status_code != 400:
+                print("FAILED: Unknown index not rejected.")
+                sys.exit(1)
+            print("SUCCESS: Unknown worlds and indexes rejected.")
+
+        # 5. Switching to the NumPy backend: everything is missing, a bulk
+        # rebuild fills the store and removes orphans
+        with patch.object(rag_service, "backend", "numpy"):
+            report = index_service.verify(WORLD_NAME)
+            if len(report["rag"]["missing"]) != 3 or report["rag"]["indexed"] != 0:
+                print(f"FAILED: Empty vector store not reported ({report['rag']}).")
+                sys.exit(1)
+            rag_service.add_article(WORLD_NAME, "Ghost", "A deleted article", 999)
+            progress = []
+            results = index_service.rebuild_worlds(
+                [WORLD_NAME],
+                indexes=("rag",),
+                on_progress=lambda *args: progress.append(args),
+            )
+            if results[WORLD_NAME]["rag"] != {"embedded": 3, "removed": 1}:
+                print(f"FAILED: Vector store rebuild {results}.")
+                sys.exit(1)
+            if progress[-1] != (WORLD_NAME, "rag", 3, 3):
+                print(f"FAILED: Progress not reported ({progress}).")
+                sys.exit(1)
+            if not index_service.verify(WORLD_NAME)["consistent"]:
+                print("FAILED: Vector store inconsistent after the rebuild.")
+                sys.exit(1)
+            results = rag_service.query_context(WORLD_NAME, "drowned archive maps", 1)
+            if results != ["The drowned archive keeps the oldest maps."]:
+                print(f"FAILED: Rebuilt store query returned {results}.")
+                sys.exit(1)
+        print("SUCCESS: Vector store rebuilt in bulk, orphans removed.")
+    finally:
+        rag_service.close_client(WORLD_NAME)
+        shutil.rmtree(world_manager.base_path, ignore_errors=True)
+
+    print("Index Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_indexes()
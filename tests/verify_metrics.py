@@ -0,0 +1,159 @@
+import os
+import re
+import sys
+import shutil
+import asyncio
+
+# Chroma embeds offline with the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.graph import graph_service
+from app.core.metrics import metrics_registry
+from app.core.rag import rag_service
+from app.core.telemetry import track_background, background_tasks
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+
+def metric_value(text: str, name: str, **labels) -> float:
+    """Sum of the samples of `name` whose labels include `labels`."""
+    total = 0.0
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ""))
+        if all(found.get(k) == v for k, v in labels.items()):
+            total += float(match.group(3))
+    return total
+
+
+async def verify_background_gauge():
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def job():
+        started.set()
+        await release.wait()
+
+    task = asyncio.create_task(track_background("test", job)())
+    await started.wait()
+    running = background_tasks.value(kind="test")
+    release.set()
+    await task
+    return running, background_tasks.value(kind="test")
+
+
+def verify_metrics():
+    print("Starting Metrics Verification...")
+
+    world_name = "TestWorld_Metrics"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+
+    session = next(get_session(world_name))
+    try:
+        session.add(
+            Article(title="Harbor", summary="The harbor.", content="By the Tower.")
+        )
+        session.commit()
+    finally:
+        session.close()
+    graph_service.add_entity(world_name, "Tower", "Location")
+    rag_service.add_article(world_name, "Harbor", "By the Tower.", 1)
+    rag_service.query_context(world_name, "harbor")
+    awkward = 'C:\\worlds\n"quoted"'
+    metrics_registry.counter(
+        "wiki_test_escaping", "Label values that need escaping.", ("path",)
+    ).inc(path=awkward)
+
+    try:
+        with TestClient(app) as client:
+            for _ in range(3):
+                client.get(f"/world/{world_name}/wiki/Harbor")
+            client.get("/static/favicon.png")
+            text = client.get("/metrics").text
+
+        # 1. Latency per route template, not per concrete path
+        route = "/world/{world_name}/wiki/{title}"
+        count = metric_value(
+            text,
+            "wiki_http_request_duration_seconds_count",
+            route=route,
+            status="200",
+        )
+        static = metric_value(
+            text, "wiki_http_request_duration_seconds_count", route="/static"
+        )
+        if count != 3 or static != 1 or "Harbor" in text:
+            print(f"FAILED: Route histogram wrong ({count}, {static}).")
+            sys.exit(1)
+        print("SUCCESS: Request latency recorded per route template.")
+
+        # 2. SQL statements counted per request
+        queries = metric_value(text, "wiki_http_db_queries_sum", route=route)
+        if not 3 <= queries <= 3 * 10:
+            print(f"FAILED: Unexpected query count {queries}.")
+            sys.exit(1)
+        print(f"SUCCESS: {queries / 3:.0f} queries per article page.")
+
+        # 3. Graph flushes, Chroma calls and resident worlds
+        flushes = metric_value(text, "wiki_graph_flush_seconds_count")
+        flushed_bytes = metric_value(text, "wiki_graph_flush_bytes_sum")
+        chroma = metric_value(
+            text, "wiki_span_duration_seconds_count", span="chroma.query"
+        )
+        resident = metric_value(text, "wiki_resident_worlds")
+        if flushes < 1 or flushed_bytes <= 0 or chroma < 1 or resident < 1:
+            print(
+                f"FAILED: Missing metrics (flushes={flushes}, bytes={flushed_bytes}, "
+                f"chroma={chroma}, resident={resident})."
+            )
+            sys.exit(1)
+        print("SUCCESS: Graph flush, Chroma and residency metrics exported.")
+
+        # 4. Background task gauge
+        running, after = asyncio.run(verify_background_gauge())
+        if running != 1 or after != 0:
+            print(f"FAILED: Background gauge {running} -> {after}.")
+            sys.exit(1)
+        print("SUCCESS: Background tasks tracked.")
+
+        # 5. The exposition parses as Prometheus text format
+        families = {f.name: f for f in text_string_to_metric_families(text)}
+        escaped = [s.labels["path"] for s in families["wiki_test_escaping"].samples]
+        buckets = [
+            s
+            for s in families["wiki_http_request_duration_seconds"].samples
+            if s.name.endswith("_bucket") and s.labels["route"] == route
+        ]
+        counts = [s.value for s in buckets]
+        if (
+            escaped != [awkward]
+            or buckets[-1].labels["le"] != "+Inf"
+            or counts != sorted(counts)
+            or counts[-1] != count
+        ):
+            print(f"FAILED: Unparseable exposition ({escaped}, {buckets[-1:]}).")
+            sys.exit(1)
+        print("SUCCESS: /metrics parses with the Prometheus text parser.")
+    finally:
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Metrics Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_metrics()
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import threading
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.graph import graph_service
+from app.core.generator import generator_service
+from app.core.llm import llm_rate_limiter
+from app.core.prefetch import prefetch_service, PrefetchService
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+generated = []
+# Red link clicked in test 4; its prefetch stays mid-generation until the
+# click waits for it
+CLICKED = "Tower"
+click_waiting = threading.Event()
+
+
+# Mock generation: two "LLM calls" through the limiter, so prefetches meet its
+# background gate like real ones
+async def mock_generate_article(world_name, title, session, *args, **kwargs):
+    for call in range(2):
+        async with llm_rate_limiter.slot():
+            await asyncio.sleep(0.15)
+        while call == 0 and title == CLICKED and not click_waiting.is_set():
+            await asyncio.sleep(0.01)
+    article = Article(title=title, summary="Prefetched.", content=f"About {title}.")
+    session.add(article)
+    session.commit()
+    session.refresh(article)
+    generated.append(title)
+    return article
+
+
+generator_service.generate_article = mock_generate_article
+wait_for_prefetch = prefetch_service.wait_for
+
+
+async def mock_wait_for(world_name, title):
+    click_waiting.set()
+    return await wait_for_prefetch(world_name, title)
+
+
+prefetch_service.wait_for = mock_wait_for
+
+
+async def verify_scheduler(world_name: str):
+    service = PrefetchService(enabled=True, top_k=2, budget_per_hour=3)
+    related = [
+        {"name": "Lighthouse", "exists": False},
+        {"name": "Old Fort", "exists": False},
+        {"name": "Market", "exists": False},
+        {"name": "Harbor", "exists": True},
+    ]
+
+    # 1. Top-K unresolved entities, best connected first
+    if service.candidates(world_name, related) != ["Old Fort", "Market", "Lighthouse"]:
+        print(f"FAILED: Ranking {service.candidates(world_name, related)}.")
+        sys.exit(1)
+
+    # 2. Prefetch waits while a foreground generation runs
+    async with service.foreground():
+        queued = service.schedule(world_name, related)
+        await asyncio.sleep(0.05)
+        if queued != ["Old Fort", "Market"] or service.stats()["running"]:
+            print(f"FAILED: Prefetch did not yield to foreground ({queued}).")
+            sys.exit(1)
+    print("SUCCESS: Top-K queued by degree and paused during foreground work.")
+
+    # 3. Per-world budget
+    more = service.schedule(world_name, [{"name": "Lighthouse", "exists": False}])
+    extra = service.schedule(world_name, [{"name": "Bakery", "exists": False}])
+    if more != ["Lighthouse"] or extra:
+        print(f"FAILED: Budget not enforced ({more}, {extra}).")
+        sys.exit(1)
+    print("SUCCESS: Per-world budget enforced.")
+
+    # Queued foreground request takes over instead of waiting
+    if await service.wait_for(world_name, "Lighthouse"):
+        print("FAILED: Queued prefetch should be handed to the caller.")
+        sys.exit(1)
+    while service.stats()["queued"] or service.stats()["running"]:
+        await asyncio.sleep(0.05)
+    if sorted(generated) != ["Market", "Old Fort"]:
+        print(f"FAILED: Unexpected prefetches {generated}.")
+        sys.exit(1)
+    print("SUCCESS: Queued prefetch handed over to the foreground request.")
+
+
+def verify_prefetch():
+    print("Starting Prefetch Verification...")
+
+    world_name = "TestWorld_Prefetch"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+
+    graph_service.add_entity(world_name, "Harbor", "Location")
+    for name in ["Old Fort", "Market", "Lighthouse"]:
+        graph_service.add_entity(world_name, name, "Location")
+    graph_service.add_relationship(world_name, "Harbor", "Old Fort", "near")
+    graph_service.add_relationship(world_name, "Market", "Old Fort", "near")
+    graph_service.add_relationship(world_name, "Harbor", "Market", "near")
+    graph_service.add_relationship(world_name, "Old Fort", "Lighthouse", "near")
+
+    session = next(get_session(world_name))
+    try:
+        session.add(
+            Article(
+                title="Harbor",
+                summary="The harbor.",
+                content="The harbor.",
+                related_entities_json=json.dumps(
+                    [{"name": "Tower", "type": "Location", "relation": "near"}]
+                ),
+            )
+        )
+        session.commit()
+    finally:
+        session.close()
+
+    try:
+        asyncio.run(verify_scheduler(world_name))
+
+        # 4. Viewing a page prefetches its red links; clicking one waits for it
+        generated.clear()
+        prefetch_service.enabled = True
+        llm_rate_limiter.background_gate = prefetch_service.wait_until_idle
+        with TestClient(app) as client:
+            resp = client.get(f"/world/{world_name}/wiki/Harbor")
+            if resp.status_code != 200:
+                print(f"FAILED: Article page returned {resp.status_code}.")
+                sys.exit(1)
+            # The click must not hold prefetching up while it waits for it
+            responses = []
+            started = time.monotonic()
+            click = threading.Thread(
+                target=lambda: responses.append(
+                    client.get(f"/world/{world_name}/wiki/{CLICKED}")
+                ),
+                daemon=True,
+            )
+            click.start()
+            click.join(timeout=10)
+            waited = time.monotonic() - started
+            if not responses:
+                # Leaving the TestClient would wait for the stuck request
+                print("FAILED: Click deadlocked waiting for its prefetch.", flush=True)
+                os._exit(1)
+            resp = responses[0]
+            if resp.status_code != 200 or generated != [CLICKED]:
+                print(f"FAILED: Click did not reuse the prefetch ({generated}).")
+                sys.exit(1)
+            print(f"SUCCESS: Click served from in-flight prefetch in {waited:.2f}s.")
+
+            stats = client.get("/api/system/prefetch").json()
+            if stats["generated"] != 1:
+                print(f"FAILED: Unexpected prefetch stats {stats}.")
+                sys.exit(1)
+
+            # 5. Every content request is foreground work, system ones aren't
+            def probe():
+                return {"foreground": prefetch_service.stats()["foreground"]}
+
+            app.add_api_route("/world/{world_name}/probe", probe)
+            app.add_api_route("/api/system/probe", probe)
+            content = client.get(f"/world/{world_name}/probe").json()
+            system = client.get("/api/system/probe").json()
+            after = prefetch_service.stats()["foreground"]
+            if content["foreground"] != 1 or system["foreground"] != 0 or after:
+                print(f"FAILED: Foreground gate {content}, {system}, {after}.")
+                sys.exit(1)
+            print("SUCCESS: Content requests pause prefetching until answered.")
+    finally:
+        prefetch_service.enabled = False
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Prefetch Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_prefetch()
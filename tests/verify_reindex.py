@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+# Offline, in a scratch data directory
+os.environ["AI_PROVIDER"] = "fake"
+os.environ["WORLD_DATA_DIR"] = tempfile.mkdtemp()
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.generator import generator_service
+from app.core.graph import graph_service
+from app.core.indexes import index_service
+from app.core.rag import rag_service
+from app.core.reindex import ReindexQueue, reindex_queue
+from app.core.world import world_manager, WorldConfig
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+
+WORLD_NAME = "TestWorld_Reindex"
+
+
+async def seed():
+    session = next(get_session(WORLD_NAME))
+    try:
+        for title in ("Lighthouse", "Harbor"):
+            await generator_service.generate_article(WORLD_NAME, title, session)
+    finally:
+        session.close()
+
+
+def set_content(title: str, content: str) -> int:
+    session = next(get_session(WORLD_NAME))
+    try:
+        article = session.exec(select(Article).where(Article.title == title)).one()
+        article.content = content
+        session.add(article)
+        session.commit()
+        return article.id
+    finally:
+        session.close()
+
+
+def stale_ids():
+    articles = index_service.load_articles(WORLD_NAME)
+    return index_service.verify_rag(WORLD_NAME, articles)["stale"]
+
+
+async def edit_burst(queue: ReindexQueue):
+    # Three quick edits of one article count once and are embedded together
+    for i in range(3):
+        article_id = set_content("Harbor", f"The harbor, rebuilt {i} times.")
+        queue.enqueue(WORLD_NAME, article_id)
+        await asyncio.sleep(0.02)
+    stale_before = stale_ids()
+    await asyncio.sleep(0.5)
+    return article_id, stale_before
+
+
+async def steady_edits(queue: ReindexQueue):
+    # Edits every 50ms never leave the world quiet for the debounce delay
+    started = time.monotonic()
+    while queue.reindexed == 0 and time.monotonic() - started < 2:
+        queue.enqueue(WORLD_NAME, set_content("Lighthouse", f"Tower {time.time()}"))
+        await asyncio.sleep(0.05)
+    return time.monotonic() - started
+
+
+def verify_reindex():
+    print("Starting Reindex Verification...")
+
+    world_manager.create_world(
+        WorldConfig(name=WORLD_NAME, llm_model="fake-llm", generate_images=False)
+    )
+    create_db_and_tables(WORLD_NAME)
+    asyncio.run(seed())
+
+    try:
+        # 1. Rapid edits are coalesced and reindexed after the debounce delay
+        queue = ReindexQueue(debounce_seconds=0.2, max_delay_seconds=5)
+        article_id, stale_before = asyncio.run(edit_burst(queue))
+        if stale_before != [article_id]:
+            print(f"FAILED: Reindexed before the debounce delay ({stale_before}).")
+            sys.exit(1)
+        stats = queue.stats()
+        if (stats["enqueued"], stats["coalesced"], stats["batches"]) != (3, 2, 1):
+            print(f"FAILED: Edits not coalesced ({stats}).")
+            sys.exit(1)
+        if stale_ids() or rag_service.query_context(WORLD_NAME, "harbor", 1) != [
+            "The harbor, rebuilt 2 times."
+        ]:
+            print("FAILED: RAG entry not updated after the debounce delay.")
+            sys.exit(1)
+        print("SUCCESS: 3 rapid edits reindexed once, after the debounce delay.")
+
+        # 2. A steady stream of edits is still reindexed after max_delay
+        queue = ReindexQueue(debounce_seconds=0.2, max_delay_seconds=0.4)
+        elapsed = asyncio.run(steady_edits(queue))
+        if queue.reindexed == 0 or elapsed > 1:
+            print(f"FAILED: Not reindexed within max_delay ({elapsed:.2f}s).")
+            sys.exit(1)
+        print(f"SUCCESS: Continuous edits reindexed after {elapsed:.2f}s.")
+
+        # 3. Edit requests enqueue and return; shutdown flushes what's pending
+        graph_service.get_graph(WORLD_NAME).remove_node("Harbor")
+        with patch.object(reindex_queue, "debounce", 60):
+            with TestClient(app) as client:
+                started = time.perf_counter()
+                response = client.post(
+                    f"/world/{WORLD_NAME}/wiki/Harbor/edit",
+                    data={"content": "The harbor froze over.", "action": "force"},
+                    follow_redirects=False,
+                )
+                elapsed = time.perf_counter() - started
+                pending = client.get("/api/system/reindex").json()["pending"]
+                if response.status_code != 303 or pending != {WORLD_NAME: [article_id]}:
+                    print(
+                        f"FAILED: Edit not queued ({response.status_code}, {pending})."
+                    )
+                    sys.exit(1)
+        report = index_service.verify(WORLD_NAME)
+        if not report["consistent"] or reindex_queue.pending():
+            print(f"FAILED: Pending edit not flushed on shutdown ({report}).")
+            sys.exit(1)
+        print(
+            f"SUCCESS: Edit returned in {elapsed * 1000:.0f}ms, "
+            "reindexed on shutdown (graph node restored)."
+        )
+
+        # 4. Without an event loop (scripts) articles are reindexed inline,
+        # deleted ones are dropped from the index
+        article_id = set_content("Lighthouse", "The lighthouse went dark.")
+        reindex_queue.enqueue(WORLD_NAME, article_id)
+        if stale_ids():
+            print("FAILED: Inline reindex did not update the RAG entry.")
+            sys.exit(1)
+        rag_service.add_article(WORLD_NAME, "Ghost", "A deleted article", 999)
+        reindex_queue.enqueue(WORLD_NAME, 999)
+        if "999" in rag_service.indexed_documents(WORLD_NAME):
+            print("FAILED: Deleted article kept in the index.")
+            sys.exit(1)
+        print("SUCCESS: Inline reindex without an event loop, deletions dropped.")
+    finally:
+        rag_service.close_client(WORLD_NAME)
+        shutil.rmtree(world_manager.base_path, ignore_errors=True)
+
+    print("Reindex Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_reindex()
@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import shutil
+import threading
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.revisions import RevisionService, revision_service
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article, ArticleRevision
+
+
+def verify_revisions():
+    print("Starting Revision History Verification...")
+
+    world_name = "TestWorld_Revisions"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+
+    paragraphs = [f"Paragraph {i} about the ancient harbor.\n" for i in range(40)]
+    versions = ["".join(paragraphs)]
+
+    session = next(get_session(world_name))
+    try:
+        article = Article(title="Harbor", summary="v0", content=versions[0])
+        session.add(article)
+        session.commit()
+        session.refresh(article)
+
+        # 1. Record 25 small edits
+        for i in range(1, 26):
+            lines = versions[-1].splitlines(keepends=True)
+            lines[i % len(lines)] = f"Edited line in revision {i}.\n"
+            versions.append("".join(lines))
+            revision_service.record_update(
+                session, article, versions[-1], new_summary=f"v{i}"
+            )
+            session.commit()
+
+        # 2. Current version is the article itself
+        if article.content != versions[-1]:
+            print("FAILED: Current content not stored on article.")
+            sys.exit(1)
+
+        # 3. Every old version reconstructs exactly
+        for number in range(1, 26):
+            content, summary = revision_service.get_revision(session, article, number)
+            if content != versions[number - 1] or summary != f"v{number - 1}":
+                print(f"FAILED: Revision {number} reconstructed incorrectly.")
+                sys.exit(1)
+        print("SUCCESS: All revisions reconstructed exactly.")
+
+        # 4. Deltas keep storage well below full copies
+        rows = session.exec(
+            select(ArticleRevision).where(ArticleRevision.article_id == article.id)
+        ).all()
+        stored = sum(len(r.data) for r in rows)
+        full = sum(len(v.encode("utf-8")) for v in versions[:-1])
+        snapshots = [r.revision for r in rows if r.is_snapshot]
+        print(
+            f"Stored {stored} bytes for {full} bytes of history (snapshots at {snapshots})"
+        )
+        if stored * 5 > full:
+            print("FAILED: Revision storage is not compact.")
+            sys.exit(1)
+        print("SUCCESS: Revisions stored compactly.")
+    finally:
+        session.close()
+
+    client = TestClient(app)
+    try:
+        # 5. Listing API
+        resp = client.get(f"/api/world/{world_name}/article/Harbor/revisions")
+        if resp.status_code != 200 or len(resp.json()) != 25:
+            print(f"FAILED: Revision listing ({resp.status_code}).")
+            sys.exit(1)
+        if resp.json()[0]["revision"] != 25:
+            print("FAILED: Revisions not listed newest first.")
+            sys.exit(1)
+        print("SUCCESS: Revision listing API.")
+
+        # 6. Rollback archives the current version and restores the old one
+        resp = client.post(
+            f"/world/{world_name}/wiki/Harbor/revisions/3/restore",
+            follow_redirects=False,
+        )
+        if resp.status_code != 303:
+            print(f"FAILED: Restore returned {resp.status_code}.")
+            sys.exit(1)
+        resp = client.get(f"/api/world/{world_name}/article/Harbor")
+        if resp.json()["content"] != versions[2]:
+            print("FAILED: Restore did not bring back revision 3.")
+            sys.exit(1)
+        resp = client.get(f"/api/world/{world_name}/article/Harbor/revisions/26")
+        if resp.json()["content"] != versions[-1]:
+            print("FAILED: Pre-rollback content not archived.")
+            sys.exit(1)
+        print("SUCCESS: Rollback restored revision and archived current content.")
+    finally:
+        client.close()
+
+    try:
+        # 7. Two concurrent edits get consecutive revisions, no constraint error
+        session = next(get_session(world_name))
+        try:
+            article = session.exec(select(Article)).one()
+            before = article.content
+            latest = revision_service.latest_revision(session, article.id)
+        finally:
+            session.close()
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def edit(content: str):
+            session = next(get_session(world_name))
+            try:
+                article = session.exec(select(Article)).one()
+                barrier.wait()
+                revision_service.record_update(session, article, content)
+                time.sleep(0.1)
+                session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+
+        threads = [
+            threading.Thread(target=edit, args=(f"Concurrent edit {i}.\n",))
+            for i in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        session = next(get_session(world_name))
+        try:
+            article = session.exec(select(Article)).one()
+            first, _ = revision_service.get_revision(session, article, latest + 1)
+            second, _ = revision_service.get_revision(session, article, latest + 2)
+        finally:
+            session.close()
+        if errors or first != before or second == before:
+            print(f"FAILED: Concurrent edits not serialized ({errors}).")
+            sys.exit(1)
+        print("SUCCESS: Concurrent edits numbered and chained one after the other.")
+
+        # 8. Reconstruction doesn't depend on the current snapshot interval
+        session = next(get_session(world_name))
+        try:
+            article = session.exec(select(Article)).one()
+            sparse = RevisionService(snapshot_interval=1000)
+            history = [article.content]
+            for i in range(5):
+                history.append(f"Sparse edit {i}.\n")
+                sparse.record_update(session, article, history[-1])
+                session.commit()
+            first = sparse.latest_revision(session, article.id) - 4
+            content, _ = RevisionService(snapshot_interval=2).get_revision(
+                session, article, first
+            )
+        finally:
+            session.close()
+        if content != history[0]:
+            print("FAILED: Revision reconstructed wrongly after an interval change.")
+            sys.exit(1)
+        print("SUCCESS: Revisions reconstructed after a snapshot interval change.")
+    finally:
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Revision History Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_revisions()
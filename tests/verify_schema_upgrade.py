@@ -0,0 +1,65 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+# A fresh process against a copy of a committed world, created before
+# Article.image_hash existed; nothing touches it through the sync engine first
+os.environ["AI_PROVIDER"] = "fake"
+os.environ["WARMUP_ENABLED"] = "false"
+os.environ["WORLD_DATA_DIR"] = tempfile.mkdtemp()
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.world import world_manager
+
+SOURCE_WORLD = os.path.join("worlds", "ruhr-neon-depths")
+
+
+def article_columns(db_path: str) -> set:
+    with sqlite3.connect(db_path) as conn:
+        return {row[1] for row in conn.execute("PRAGMA table_info(article)")}
+
+
+def verify_schema_upgrade():
+    print("Starting Schema Upgrade Verification...")
+
+    world_name = os.path.basename(SOURCE_WORLD)
+    world_path = world_manager.get_world_path(world_name)
+    shutil.copytree(SOURCE_WORLD, world_path)
+    db_path = os.path.join(world_path, "database.db")
+    if "image_hash" in article_columns(db_path):
+        print("FAILED: The committed world already has the new schema.")
+        sys.exit(1)
+    with sqlite3.connect(db_path) as conn:
+        title = conn.execute("SELECT title FROM article LIMIT 1").fetchone()[0]
+
+    try:
+        with TestClient(app) as client:
+            # 1. Async routes upgrade the schema before their first query
+            for path in [
+                f"/world/{world_name}",
+                f"/world/{world_name}/wiki/{title}",
+                f"/api/world/{world_name}/article/{title}",
+            ]:
+                resp = client.get(path)
+                if resp.status_code != 200:
+                    print(f"FAILED: {path} returned {resp.status_code}.")
+                    sys.exit(1)
+        if "image_hash" not in article_columns(db_path):
+            print("FAILED: Article.image_hash was not added.")
+            sys.exit(1)
+        print("SUCCESS: Old world DB upgraded on first async use.")
+    finally:
+        shutil.rmtree(os.environ["WORLD_DATA_DIR"], ignore_errors=True)
+
+    print("Schema Upgrade Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_schema_upgrade()
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.llm import llm_service, RateLimiter
+from app.database import create_db_and_tables
+from app.models.article import Article
+from scripts.seed_wiki import WikiCrawler
+
+generated_titles = []
+active = {"now": 0, "peak": 0}
+limiters = set()
+
+
+# Mock generation: every article links to two new entities
+async def mock_generate_article(world_name, title, session, **kwargs):
+    active["now"] += 1
+    active["peak"] = max(active["peak"], active["now"])
+    limiters.add(llm_service.limiter)
+    await asyncio.sleep(0.01)
+    active["now"] -= 1
+
+    llm_service.record_usage(SimpleNamespace(usage=SimpleNamespace(total_tokens=100)))
+    related = [
+        {"name": f"{title}/A", "type": "Concept", "relation": "has"},
+        {"name": f"{title}/B", "type": "Concept", "relation": "has"},
+    ]
+    article = Article(
+        title=title,
+        summary="Summary",
+        content=f"About {title}.",
+        related_entities_json=json.dumps(related),
+    )
+    session.add(article)
+    session.commit()
+    session.refresh(article)
+    generated_titles.append(title)
+    return article
+
+
+generator_service.generate_article = mock_generate_article
+
+
+async def verify_rate_limiter():
+    limiter = RateLimiter(max_concurrency=2, requests_per_minute=600)
+    state = {"now": 0, "peak": 0}
+
+    async def call():
+        async with limiter.slot():
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+            await asyncio.sleep(0.01)
+            state["now"] -= 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(call() for _ in range(5)))
+    elapsed = time.monotonic() - started
+
+    if state["peak"] > 2:
+        print(f"FAILED: Rate limiter allowed {state['peak']} concurrent calls.")
+        sys.exit(1)
+    # 600/min = one start every 0.1s -> the 5th call starts after ~0.4s
+    if elapsed < 0.35:
+        print(f"FAILED: Rate limiter did not space requests ({elapsed:.2f}s).")
+        sys.exit(1)
+    print("SUCCESS: Rate limiter caps concurrency and requests per minute.")
+
+
+def verify_seed_crawler():
+    print("Starting Seed Crawler Verification...")
+    asyncio.run(verify_rate_limiter())
+
+    world_name = "TestWorld_Crawler"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+
+    try:
+        # 1. Breadth-first crawl bounded by max_articles and depth
+        server_limiter = llm_service.limiter
+        crawler = WikiCrawler(world_name, max_articles=5, max_depth=2, concurrency=3)
+        stats = asyncio.run(crawler.run("Root"))
+        if stats["generated"] != 5 or len(generated_titles) != 5:
+            print(f"FAILED: Expected 5 articles, got {stats['generated']}.")
+            sys.exit(1)
+        if generated_titles[0] != "Root" or set(generated_titles[1:3]) != {
+            "Root/A",
+            "Root/B",
+        }:
+            print(f"FAILED: Crawl was not breadth-first: {generated_titles}")
+            sys.exit(1)
+        if active["peak"] > 3:
+            print(f"FAILED: Concurrency limit exceeded ({active['peak']}).")
+            sys.exit(1)
+        # The crawl limits provider calls itself, only while it runs; the
+        # server default is unlimited
+        if (
+            limiters != {crawler.limiter}
+            or llm_service.limiter is not server_limiter
+            or (
+                crawler.limiter.max_concurrency,
+                RateLimiter().max_concurrency,
+            )
+            != (4, 0)
+        ):
+            print("FAILED: Crawler limiter not installed.")
+            sys.exit(1)
+        if stats["tokens_per_article"] != 100:
+            print(f"FAILED: Unexpected tokens/article {stats['tokens_per_article']}.")
+            sys.exit(1)
+        print(
+            f"SUCCESS: Crawled {stats['generated']} articles BFS "
+            f"({stats['articles_per_minute']} articles/min)."
+        )
+
+        # 2. The frontier is checkpointed, never deeper than max_depth
+        with open(crawler.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if not checkpoint["frontier"] or any(
+            depth > 2 for _, depth in checkpoint["frontier"]
+        ):
+            print(f"FAILED: Bad checkpoint frontier {checkpoint['frontier']}.")
+            sys.exit(1)
+        print(f"SUCCESS: Checkpointed {len(checkpoint['frontier'])} queued titles.")
+
+        # 3. A new crawler resumes from the checkpoint without repeating work
+        generated_titles.clear()
+        resumed = WikiCrawler(world_name, max_articles=10, max_depth=2, concurrency=2)
+        stats = asyncio.run(resumed.run())
+        # Depth <= 2 from one root with two links each: 1 + 2 + 4 articles
+        if stats["generated"] != 2 or "Root" in generated_titles:
+            print(f"FAILED: Resume generated {generated_titles}.")
+            sys.exit(1)
+        with open(resumed.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["frontier"] or checkpoint["generated"] != 7:
+            print(f"FAILED: Unexpected final checkpoint {checkpoint}.")
+            sys.exit(1)
+        print("SUCCESS: Resumed crawl finished the frontier.")
+    finally:
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Seed Crawler Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_seed_crawler()
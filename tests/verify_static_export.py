@@ -0,0 +1,251 @@
+import os
+import sys
+import gzip
+import hashlib
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+import brotli
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core import pages
+from app.core.graph import graph_service
+from app.database import create_db_and_tables, get_session
+from app.models.article import Article
+from scripts.export_static import export_static, MANIFEST_NAME
+
+
+def tree_digests(root: str) -> dict:
+    digests = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, "rb") as f:
+                digests[os.path.relpath(path, root)] = hashlib.sha256(
+                    f.read()
+                ).hexdigest()
+    return digests
+
+
+def verify_static_export():
+    print("Starting Static Export Verification...")
+
+    world_name = "TestWorld_Export"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+
+    world_manager.create_world(WorldConfig(name=world_name, generate_images=False))
+    create_db_and_tables(world_name)
+    # A committed world with the schema from before Article.image_hash
+    old_world = "TestWorld_Export_Old"
+    old_world_path = world_manager.get_world_path(old_world)
+    if os.path.exists(old_world_path):
+        shutil.rmtree(old_world_path)
+    shutil.copytree(world_manager.get_world_path("ruhr-neon-depths"), old_world_path)
+
+    session = next(get_session(world_name))
+    try:
+        session.add(
+            Article(
+                title="Harbor",
+                summary="The harbor.",
+                content="The Harbor is guarded by the Lighthouse.",
+            )
+        )
+        session.add(Article(title="Lighthouse", summary="A light.", content="Light."))
+        session.add(Article(title="Old Fort", summary="Ruins.", content="Stones."))
+        session.commit()
+    finally:
+        session.close()
+    for name in ["Harbor", "Lighthouse", "Old Fort"]:
+        graph_service.add_entity(world_name, name, "Location")
+
+    images_path = world_manager.get_images_path(world_name)
+    os.makedirs(images_path, exist_ok=True)
+    with open(os.path.join(images_path, "Harbor.png"), "wb") as f:
+        f.write(b"\x89PNG fake image")
+
+    output_dir = tempfile.mkdtemp(prefix="static_export_")
+    world_dir = os.path.join(output_dir, "world", world_name)
+
+    def export(**kwargs):
+        return export_static(
+            output_dir=output_dir,
+            base_url="/wiki-test",
+            workers=2,
+            only_worlds=[world_name],
+            **kwargs,
+        )
+
+    try:
+        # 1. Full export renders every page
+        stats = export()
+        for path in [
+            os.path.join(world_dir, "index.html"),
+            os.path.join(world_dir, "visualizers", "index.html"),
+            os.path.join(world_dir, "wiki", "Harbor", "index.html"),
+            os.path.join(output_dir, "api", "world", world_name, "graph_data"),
+            os.path.join(output_dir, MANIFEST_NAME),
+        ]:
+            if not os.path.exists(path):
+                print(f"FAILED: Missing export output {path}.")
+                sys.exit(1)
+        with open(os.path.join(world_dir, "wiki", "Harbor", "index.html")) as f:
+            page = f.read()
+        if (
+            f"/world/{world_name}/wiki/Lighthouse" not in page
+            or "/wiki-test/" not in page
+        ):
+            print("FAILED: Article page not auto-linked or base_url missing.")
+            sys.exit(1)
+        print(f"SUCCESS: Full export rendered {stats['rendered']} files.")
+
+        # 2. Images are hard linked, not copied
+        src = os.stat(os.path.join(images_path, "Harbor.png"))
+        dest = os.stat(os.path.join(world_dir, "images", "Harbor.png"))
+        if stats["copied"] == 0 and src.st_ino != dest.st_ino:
+            print("FAILED: Image was not hard linked.")
+            sys.exit(1)
+        print("SUCCESS: Images hard linked.")
+
+        # 3. Nothing changed -> nothing re-rendered
+        stats = export()
+        if stats["rendered"] != 0 or stats["unchanged"] == 0:
+            print(f"FAILED: Unchanged export re-rendered {stats['rendered']} files.")
+            sys.exit(1)
+        print("SUCCESS: Unchanged export skipped every page.")
+
+        # 4. Editing one article re-renders only it (plus the world pages)
+        session = next(get_session(world_name))
+        try:
+            article = session.exec(
+                select(Article).where(Article.title == "Old Fort")
+            ).first()
+            article.content = "Crumbling stones."
+            session.add(article)
+            session.commit()
+        finally:
+            session.close()
+        stats = export()
+        # 1 article + home, visualizers, graph_data, timeline_data + search index
+        search_dir = os.path.join(output_dir, "api", "world", world_name, "search")
+        expected = 5 + len(os.listdir(search_dir))
+        if stats["rendered"] != expected:
+            print(
+                f"FAILED: Expected {expected} files re-rendered, got {stats['rendered']}."
+            )
+            sys.exit(1)
+        print("SUCCESS: Only the changed article was re-rendered.")
+
+        # 5. Deleted articles disappear from the export
+        session = next(get_session(world_name))
+        try:
+            session.delete(
+                session.exec(select(Article).where(Article.title == "Old Fort")).first()
+            )
+            session.commit()
+        finally:
+            session.close()
+        stats = export()
+        if os.path.exists(os.path.join(world_dir, "wiki", "Old Fort")):
+            print("FAILED: Page of deleted article was not removed.")
+            sys.exit(1)
+        print(f"SUCCESS: Stale pages removed ({stats['removed']} files).")
+
+        # 6. Search index sharded by first letter
+        with open(os.path.join(search_dir, "index")) as f:
+            index = json.load(f)
+        with open(os.path.join(search_dir, "l")) as f:
+            shard = json.load(f)
+        found = [index["docs"][i][0] for i in shard.get("lighthouse", [])]
+        if found != ["Lighthouse"] or "light" not in shard:
+            print(f"FAILED: Unexpected search shard {shard}.")
+            sys.exit(1)
+        if os.path.exists(os.path.join(search_dir, "o")):
+            print("FAILED: Shard of deleted article still exported.")
+            sys.exit(1)
+        client = TestClient(app)
+        try:
+            resp = client.get(f"/api/world/{world_name}/search/l")
+            if resp.status_code != 200 or resp.json() != shard:
+                print("FAILED: Live search route differs from the export.")
+                sys.exit(1)
+            # The index is built once per database state, not per shard
+            with patch.object(pages, "search_index", wraps=pages.search_index) as build:
+                client.get(f"/api/world/{world_name}/search/index")
+                client.get(f"/api/world/{world_name}/search/h")
+                session = next(get_session(world_name))
+                try:
+                    harbor = session.exec(
+                        select(Article).where(Article.title == "Harbor")
+                    ).one()
+                    harbor.summary = "The quay."
+                    session.add(harbor)
+                    session.commit()
+                finally:
+                    session.close()
+                resp = client.get(f"/api/world/{world_name}/search/q")
+            if build.call_count != 1 or "quay" not in resp.json():
+                print(f"FAILED: Search index built {build.call_count} times.")
+                sys.exit(1)
+        finally:
+            client.close()
+        print("SUCCESS: Search index exported and served live, cached per edit.")
+
+        # 7. --compress minifies JSON and writes .gz/.br siblings
+        export(compress=True)
+        graph_path = os.path.join(output_dir, "api", "world", world_name, "graph_data")
+        page_path = os.path.join(world_dir, "wiki", "Harbor", "index.html")
+        with open(graph_path, "rb") as f:
+            graph_bytes = f.read()
+        if b"\n" in graph_bytes:
+            print("FAILED: JSON not minified.")
+            sys.exit(1)
+        for path in [graph_path, page_path]:
+            with open(path, "rb") as f:
+                original = f.read()
+            with open(path + ".gz", "rb") as f:
+                gz = gzip.decompress(f.read())
+            with open(path + ".br", "rb") as f:
+                br = brotli.decompress(f.read())
+            if gz != original or br != original:
+                print(f"FAILED: Precompressed siblings of {path} differ.")
+                sys.exit(1)
+        print("SUCCESS: Precompressed .gz/.br siblings written.")
+
+        # 8. Turning compression off removes the siblings again
+        export()
+        if os.path.exists(page_path + ".gz"):
+            print("FAILED: Stale .gz sibling kept.")
+            sys.exit(1)
+        print("SUCCESS: Siblings removed when exporting without --compress.")
+
+        # 9. Exporting leaves the world untouched, even with an old schema
+        before = tree_digests(old_world_path)
+        export_static(output_dir=output_dir, workers=2, only_worlds=[old_world])
+        old_world_dir = os.path.join(output_dir, "world", old_world)
+        pages_written = os.listdir(os.path.join(old_world_dir, "wiki"))
+        if not pages_written or tree_digests(old_world_path) != before:
+            print("FAILED: Export failed or modified the world it read.")
+            sys.exit(1)
+        print("SUCCESS: World databases opened read-only.")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        for path in [world_path, old_world_path]:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    print("Static Export Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_static_export()
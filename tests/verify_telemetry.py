@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+import shutil
+import asyncio
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+import app.core.telemetry as telemetry
+from app.main import app
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.database import create_db_and_tables, get_session
+
+
+def metric_value(text: str, name: str, **labels) -> float:
+    """Sum of the samples of `name` whose labels include `labels`."""
+    total = 0.0
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ""))
+        if all(found.get(k) == v for k, v in labels.items()):
+            total += float(match.group(3))
+    return total
+
+
+async def generate(world_name: str):
+    session = next(get_session(world_name))
+    try:
+        await generator_service.generate_article(world_name, "The Glass Tower", session)
+    finally:
+        session.close()
+
+
+def verify_telemetry():
+    print("Starting Telemetry Verification...")
+
+    world_name = "TestWorld_Telemetry"
+    world_path = world_manager.get_world_path(world_name)
+    if os.path.exists(world_path):
+        shutil.rmtree(world_path)
+    world_manager.create_world(
+        WorldConfig(name=world_name, llm_model="fake-llm", generate_images=False)
+    )
+    create_db_and_tables(world_name)
+
+    # Mirror spans into memory instead of a collector
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    telemetry._otel_tracer = provider.get_tracer("test")
+
+    try:
+        asyncio.run(generate(world_name))
+
+        with TestClient(app) as client:
+            resp = client.get("/metrics")
+        if resp.status_code != 200 or not resp.headers["content-type"].startswith(
+            "text/plain"
+        ):
+            print(f"FAILED: /metrics returned {resp.status_code}.")
+            sys.exit(1)
+        text = resp.text
+
+        # 1. One duration sample per stage
+        for stage in ["generate_article", "plan", "write", "validate", "save"]:
+            count = metric_value(
+                text, "wiki_span_duration_seconds_count", span=stage, status="ok"
+            )
+            if count != 1:
+                print(f"FAILED: Expected one '{stage}' span, got {count}.")
+                sys.exit(1)
+        print("SUCCESS: Stage durations exported.")
+
+        # 2. Token usage attributed to stages and the model
+        plan_tokens = metric_value(
+            text, "wiki_llm_tokens_total", stage="plan", model="fake-llm"
+        )
+        write_tokens = metric_value(
+            text,
+            "wiki_llm_tokens_total",
+            stage="write",
+            model="fake-llm",
+            kind="completion",
+        )
+        if plan_tokens <= 0 or write_tokens <= 0:
+            print(f"FAILED: Token usage missing ({plan_tokens}, {write_tokens}).")
+            sys.exit(1)
+        print(f"SUCCESS: Token usage by stage ({plan_tokens:.0f} planning tokens).")
+
+        # 3. OpenTelemetry spans form one trace with LLM calls under their stage
+        spans = {s.name: s for s in exporter.get_finished_spans()}
+        root = spans.get("generate_article")
+        plan = spans.get("plan")
+        llm = [
+            s
+            for s in exporter.get_finished_spans()
+            if s.name == "llm.generate_json"
+            and s.parent.span_id == plan.context.span_id
+        ]
+        if root is None or plan.parent.span_id != root.context.span_id or not llm:
+            print("FAILED: OpenTelemetry spans are not nested.")
+            sys.exit(1)
+        if llm[0].attributes.get("llm.model") != "fake-llm":
+            print(f"FAILED: LLM span attributes {dict(llm[0].attributes)}.")
+            sys.exit(1)
+        print("SUCCESS: OpenTelemetry trace nested with token attributes.")
+    finally:
+        telemetry._otel_tracer = None
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Telemetry Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_telemetry()
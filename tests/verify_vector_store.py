@@ -0,0 +1,212 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from app.core.rag import rag_service
+from app.core.vector_store import VectorStore, normalize
+from app.core.world import world_manager, WorldConfig
+
+WORLD_NAME = "TestWorld_VectorStore"
+
+
+def clustered(rng, size, dimensions=64, topics=40):
+    centers = normalize(rng.standard_normal((topics, dimensions)))
+    vectors = centers[rng.integers(0, topics, size)]
+    return normalize(vectors + 0.08 * rng.standard_normal((size, dimensions)))
+
+
+def top_k(vectors, query, k):
+    return set(np.argsort(-(vectors @ query))[:k])
+
+
+def recall(store, vectors, queries, k=5):
+    hits = 0
+    for query in queries:
+        found = {int(id) for id in store.query(query, k)["ids"]}
+        hits += len(found & top_k(vectors, query, k))
+    return hits / (k * len(queries))
+
+
+def verify_vector_store():
+    print("Starting Vector Store Verification...")
+
+    rng = np.random.default_rng(0)
+    vectors = clustered(rng, 3000)
+    ids = [str(i) for i in range(len(vectors))]
+    queries = normalize(vectors[:50] + 0.05 * rng.standard_normal((50, 64)))
+    scratch = tempfile.mkdtemp()
+
+    try:
+        # 1. Exact search matches float32 brute force; int8 comes close
+        for dtype, minimum in (("float16", 0.98), ("int8", 0.95)):
+            path = os.path.join(scratch, dtype)
+            store = VectorStore(path, dtype=dtype, ann_threshold=0)
+            store.upsert(ids, vectors, documents=[f"doc {i}" for i in ids])
+            score = recall(store, vectors, queries)
+            if score < minimum or store.scanned != len(vectors):
+                print(f"FAILED: {dtype} recall {score:.3f} below {minimum}.")
+                sys.exit(1)
+            print(f"SUCCESS: {dtype} exact search, recall@5 {score:.3f}.")
+
+        # 2. The store reopens from disk; upserts replace rows in place
+        store = VectorStore(os.path.join(scratch, "float16"))
+        result = store.query(vectors[7], 1)
+        if len(store) != len(vectors) or result["ids"] != ["7"]:
+            print(f"FAILED: Reopened store returned {result['ids']}.")
+            sys.exit(1)
+        store.upsert(["7"], [-vectors[7]], documents=["moved"])
+        store.upsert(["new"], [vectors[7]], documents=["added"])
+        store.close()
+        store = VectorStore(os.path.join(scratch, "float16"))
+        result = store.query(vectors[7], 1)
+        if len(store) != len(vectors) + 1 or result["documents"] != ["added"]:
+            print(f"FAILED: Upserts not persisted ({result}).")
+            sys.exit(1)
+        if store.documents[7] != "moved" or store.stats()["dtype"] != "float16":
+            print("FAILED: Updated row not kept in place.")
+            sys.exit(1)
+        # Deleting moves the last row into the freed one, also after a reopen
+        store.delete(["7", "missing"])
+        store.close()
+        store = VectorStore(os.path.join(scratch, "float16"))
+        if len(store) != len(vectors) or "7" in store.ids:
+            print("FAILED: Deleted row still stored.")
+            sys.exit(1)
+        if store.query(vectors[7], 1)["documents"] != ["added"]:
+            print("FAILED: Moved row lost after a delete.")
+            sys.exit(1)
+        print("SUCCESS: Store persisted, upserts and deletes replayed.")
+
+        # A store used after close() maps its file again, rows stay intact
+        store.close()
+        store.upsert(["after-close"], [vectors[11]], documents=["late"])
+        if store.query(vectors[12], 1)["ids"] != ["12"]:
+            print("FAILED: Query after close() lost rows.")
+            sys.exit(1)
+        store.close()
+        store = VectorStore(os.path.join(scratch, "float16"))
+        result = store.query(vectors[12], 1)
+        if result["ids"] != ["12"] or result["scores"][0] < 0.99:
+            print(f"FAILED: Rows zeroed by an upsert after close() ({result}).")
+            sys.exit(1)
+        print("SUCCESS: Upsert after close() keeps the stored rows.")
+
+        # A delete interrupted before or while moving rows is finished on load
+        move_rows = VectorStore._move_rows
+        for done in (0, 1):
+
+            def crash(self, moves):
+                move_rows(self, moves[:done])
+                raise RuntimeError("crash")
+
+            doomed = [store.ids[20], store.ids[21]]
+            before = {
+                id: np.array(store._vectors[store._rows[id]])
+                for id in store.ids[-3:] + store.ids[18:20]
+            }
+            with patch.object(VectorStore, "_move_rows", crash):
+                try:
+                    store.delete(doomed)
+                except RuntimeError:
+                    pass
+            store = VectorStore(os.path.join(scratch, "float16"))
+            if any(id in store.ids for id in doomed) or any(
+                not np.array_equal(store._vectors[store._rows[id]], vector)
+                for id, vector in before.items()
+            ):
+                print(f"FAILED: Interrupted delete ({done} moves) left rows mixed up.")
+                sys.exit(1)
+        store.close()
+        print("SUCCESS: Interrupted deletes completed on reload.")
+
+        # 3. Above the threshold an IVF index limits the scan, rows added
+        # after the build are still found
+        path = os.path.join(scratch, "ivf")
+        store = VectorStore(path, ann_threshold=2000, probes=12)
+        store.upsert(ids[:2000], vectors[:2000])
+        store.upsert(ids[2000:2100], vectors[2000:2100])
+        stats = store.stats()
+        if stats["indexed"] != 2000 or stats["clusters"] != 44:
+            print(f"FAILED: IVF index not built ({stats}).")
+            sys.exit(1)
+        score = recall(store, vectors[:2100], queries)
+        if score < 0.9 or store.scanned >= 2100:
+            print(f"FAILED: IVF recall {score:.3f}, scanned {store.scanned}.")
+            sys.exit(1)
+        if store.query(vectors[2050], 1)["ids"] != ["2050"]:
+            print("FAILED: Row added after the index build not found.")
+            sys.exit(1)
+        if VectorStore(path).stats()["indexed"] != 2000:
+            print("FAILED: IVF index not reloaded.")
+            sys.exit(1)
+        # Deletes update the index in place instead of clustering again
+        with patch.object(store, "build_index") as build_index:
+            store.delete([str(i) for i in range(0, 2100, 20)] + ["2099"])
+        deleted = set(range(0, 2100, 20)) | {2099}
+        kept = np.array([i for i in range(2100) if i not in deleted])
+        _, order, offsets, indexed = store._index
+        rows = np.concatenate([np.arange(indexed, len(store)), order])
+        if build_index.called or sorted(rows) != list(range(len(store))):
+            print("FAILED: Index not updated in place after deletes.")
+            sys.exit(1)
+        expected = {str(i) for i in kept}
+        if set(store.ids) != expected or len(VectorStore(path).ids) != len(kept):
+            print("FAILED: Deleted rows still stored.")
+            sys.exit(1)
+        hits = 0
+        for query in queries:
+            found = {int(id) for id in store.query(query, 5)["ids"]}
+            nearest = kept[np.argsort(-(vectors[kept] @ query))[:5]]
+            hits += len(found & set(nearest))
+        if hits / (5 * len(queries)) < 0.9 or store.query(vectors[2050], 1)["ids"] != [
+            "2050"
+        ]:
+            print("FAILED: IVF search degraded after deletes.")
+            sys.exit(1)
+        print(
+            f"SUCCESS: IVF recall@5 {score:.3f}, "
+            f"scanning {store.scanned} of 2100 rows."
+        )
+
+        # 4. RAG_BACKEND="numpy" stores the world's vectors next to its database
+        world_path = world_manager.get_world_path(WORLD_NAME)
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+        world_manager.create_world(WorldConfig(name=WORLD_NAME, llm_model="fake-llm"))
+        with patch.object(rag_service, "backend", "numpy"):
+            rag_service.add_article(WORLD_NAME, "Harbor", "The harbor of brass", 1)
+            rag_service.add_article(WORLD_NAME, "Tower", "The tower of glass", 2)
+            results = rag_service.query_context(WORLD_NAME, "glass tower", 1)
+            if results != ["The tower of glass"]:
+                print(f"FAILED: Unexpected query results {results}.")
+                sys.exit(1)
+            for name in ("vectors.npy", "vectors.jsonl"):
+                if not os.path.exists(os.path.join(world_path, name)):
+                    print(f"FAILED: {name} missing.")
+                    sys.exit(1)
+            if os.path.exists(os.path.join(world_path, "chroma_db")):
+                print("FAILED: Chroma used with the numpy backend.")
+                sys.exit(1)
+        print("SUCCESS: numpy RAG backend stores vectors in the world folder.")
+    finally:
+        rag_service.close_client(WORLD_NAME)
+        shutil.rmtree(scratch, ignore_errors=True)
+        world_path = world_manager.get_world_path(WORLD_NAME)
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+
+    print("Vector Store Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_vector_store()
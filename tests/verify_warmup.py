@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+from unittest.mock import patch
+
+# Run the whole pipeline offline against the fake provider
+os.environ["AI_PROVIDER"] = "fake"
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from app.main import app, settings
+from app.core.world import world_manager, WorldConfig
+from app.core.generator import generator_service
+from app.core.graph import graph_service
+from app.core.rag import rag_service
+from app.core.residency import residency_manager
+from app.core.warmup import WarmupService, warmup_service
+from app import database
+from app.database import create_db_and_tables, get_session
+
+WORLDS = ["TestWorld_WarmupOld", "TestWorld_WarmupNew"]
+
+
+async def seed(world_name: str):
+    session = next(get_session(world_name))
+    try:
+        await generator_service.generate_article(world_name, "Lighthouse", session)
+    finally:
+        session.close()
+
+
+def set_last_written(world_name: str, timestamp: float):
+    world_path = world_manager.get_world_path(world_name)
+    for name in os.listdir(world_path):
+        os.utime(os.path.join(world_path, name), (timestamp, timestamp))
+
+
+def verify_warmup():
+    print("Starting Warm-up Verification...")
+
+    for world_name in WORLDS:
+        world_path = world_manager.get_world_path(world_name)
+        if os.path.exists(world_path):
+            shutil.rmtree(world_path)
+        world_manager.create_world(
+            WorldConfig(name=world_name, llm_model="fake-llm", generate_images=False)
+        )
+        create_db_and_tables(world_name)
+        asyncio.run(seed(world_name))
+    # Newer than anything else in the worlds directory
+    set_last_written(WORLDS[0], time.time() + 100)
+    set_last_written(WORLDS[1], time.time() + 200)
+
+    try:
+        # 1. The most recently written worlds are warmed, newest first
+        residency_manager.evict_all()
+        service = WarmupService(enabled=True, worlds=1)
+        asyncio.run(service.run())
+        if service.warmed != [WORLDS[1]] or service.errors:
+            print(f"FAILED: Unexpected warm-up {service.stats()}.")
+            sys.exit(1)
+        if (
+            WORLDS[1] not in graph_service._graphs
+            or WORLDS[1] not in rag_service._clients
+            or WORLDS[1] not in database._async_engines
+            or not residency_manager.is_resident(WORLDS[1])
+            or residency_manager.is_resident(WORLDS[0])
+        ):
+            print("FAILED: World resources were not loaded.")
+            sys.exit(1)
+        print("SUCCESS: Most recent world warmed (engines, graph, index).")
+
+        # 2. Never more than the residency limit
+        with patch.object(settings, "MAX_RESIDENT_WORLDS", 1):
+            if len(WarmupService(worlds=5).recent_worlds()) != 1:
+                print("FAILED: Warm-up exceeds MAX_RESIDENT_WORLDS.")
+                sys.exit(1)
+        print("SUCCESS: Warm-up capped by the residency limit.")
+
+        # 3. /health is live before startup, /ready once warm-up is done
+        residency_manager.evict_all()
+        client = TestClient(app)
+        if client.get("/health").status_code != 200:
+            print("FAILED: /health not live.")
+            sys.exit(1)
+        if client.get("/ready").status_code != 503:
+            print("FAILED: /ready before warm-up should be 503.")
+            sys.exit(1)
+        with patch.object(warmup_service, "worlds", 2), TestClient(app) as client:
+            deadline = time.monotonic() + 30
+            while client.get("/ready").status_code != 200:
+                if time.monotonic() > deadline:
+                    print("FAILED: Never became ready.")
+                    sys.exit(1)
+                time.sleep(0.05)
+            stats = client.get("/api/system/warmup").json()
+        if stats["worlds"] != WORLDS[::-1]:
+            print(f"FAILED: Unexpected startup warm-up {stats}.")
+            sys.exit(1)
+        print(f"SUCCESS: Ready after a {stats['seconds']}s background warm-up.")
+
+        # 4. Probes skip authentication, the details don't
+        with (
+            patch.object(settings, "AUTH_USERNAME", "admin"),
+            patch.object(settings, "AUTH_PASSWORD", "secret"),
+        ):
+            if (
+                client.get("/health").status_code != 200
+                or client.get("/ready").status_code != 200
+                or client.get("/api/system/warmup").status_code != 401
+            ):
+                print("FAILED: Probe authentication.")
+                sys.exit(1)
+        print("SUCCESS: Probes reachable without credentials.")
+    finally:
+        residency_manager.evict_all()
+        for world_name in WORLDS:
+            world_path = world_manager.get_world_path(world_name)
+            if os.path.exists(world_path):
+                shutil.rmtree(world_path)
+
+    print("Warm-up Verification Complete.")
+
+
+if __name__ == "__main__":
+    verify_warmup()